@@ -2,18 +2,23 @@ import { AppShell, Group, Stack, SimpleGrid, Box } from "@mantine/core";
 import { Global } from "@emotion/react";
 import bgImage from "./assets/background.jpg";
 import { notifications } from "@mantine/notifications";
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { api } from "./api";
 import { arrayMove } from "@dnd-kit/sortable";
-import type { Todo, List } from "./types";
+import type { Todo, List, Change } from "./types";
 import { SummaryCard } from "./components/SummaryCard";
 import { AddNewCard } from "./components/AddNewCard";
 import FileGallery from "./components/FileGallery";
 import { Boards } from "./components/Boards";
 import NotepadBoard from "./components/NotepadBoard";
-import { listContainerId } from "./helpers/dnd";
+import { listContainerId, moveTarget } from "./helpers/dnd";
 import WorkspaceDnDWithBoards from "./components/WorkspaceDnD";
 
+// Lisäys- ja siirtotapahtumista kootaan yksi board-haku tämän ajan sisällä
+const RELOAD_COALESCE_MS = 100;
+// 503 (palvelimen virtaraja) sulkee EventSourcen pysyvästi; uusi yritys tämän jälkeen
+const SSE_RETRY_MS = 10_000;
+
 function App() {
   const [lists, setLists] = useState<List[]>([]);
   const [listTodos, setListTodos] = useState<Record<number, Todo[]>>({});
@@ -29,14 +34,15 @@ function App() {
 
   async function loadListsAndTodos() {
     try {
-      const ls = await api.lists.all();
-      const np = (await api.notepad.all?.().catch?.(() => [])) || [];
-      setLists(ls);
-      const entries = await Promise.all(
-        ls.map(async (l) => [l.id, await api.todosByList.all(l.id)] as const)
+      const board = await api.board();
+      if (!board) return; // ei muutoksia
+      setLists(board.lists);
+      setListTodos(
+        Object.fromEntries(
+          board.lists.map((l) => [l.id, board.todos[String(l.id)] ?? []])
+        )
       );
-      setListTodos(Object.fromEntries(entries));
-      setNotepadTodos(np as Todo[]);
+      setNotepadTodos(board.notepad);
     } catch (e: any) {
       notifications.show({ color: "red", title: "Error", message: e.message });
     }
@@ -46,6 +52,69 @@ function App() {
     loadListsAndTodos();
   }, []);
 
+  const reloadTimer = useRef<number | null>(null);
+  function scheduleReload() {
+    if (reloadTimer.current !== null) return;
+    reloadTimer.current = window.setTimeout(() => {
+      reloadTimer.current = null;
+      loadListsAndTodos();
+    }, RELOAD_COALESCE_MS);
+  }
+
+  // Reaaliaikainen synkka: muutokset muista välilehdistä /api/changes -virrasta
+  function applyChange(c: Change) {
+    if (c.entity === "todos" && c.op === "delete") {
+      const drop = (arr: Todo[]) => arr.filter((t) => t.id !== c.data.id);
+      setListTodos((prev) =>
+        Object.fromEntries(
+          Object.entries(prev).map(([k, arr]) => [k, drop(arr)])
+        )
+      );
+      setNotepadTodos(drop);
+      return;
+    }
+    if (c.entity === "todos" && c.op === "update" && !c.data.moved) {
+      const patch = (arr: Todo[]) =>
+        arr.map((t) =>
+          t.id === c.data.id ? { ...t, title: c.data.title, done: c.data.done } : t
+        );
+      setListTodos((prev) =>
+        Object.fromEntries(
+          Object.entries(prev).map(([k, arr]) => [k, patch(arr)])
+        )
+      );
+      setNotepadTodos(patch);
+      return;
+    }
+    // Lisäykset ja siirrot tarvitsevat palvelimen järjestyksen (ETag-haku on halpa)
+    if (c.entity !== "files") scheduleReload();
+  }
+
+  useEffect(() => {
+    let es: EventSource;
+    let retry: number | undefined;
+    const connect = () => {
+      es = new EventSource("/api/changes");
+      es.addEventListener("change", (ev) =>
+        applyChange(JSON.parse((ev as MessageEvent).data))
+      );
+      es.addEventListener("reset", () => scheduleReload());
+      es.onerror = () => {
+        if (es.readyState !== EventSource.CLOSED) return; // selain yhdistää itse
+        retry = window.setTimeout(() => {
+          scheduleReload(); // katkon aikana tulleet muutokset
+          connect();
+        }, SSE_RETRY_MS);
+      };
+    };
+    connect();
+    return () => {
+      es.close();
+      window.clearTimeout(retry);
+      if (reloadTimer.current !== null) window.clearTimeout(reloadTimer.current);
+    };
+  }, []);
+
   // ----- Lists CRUD -----
   async function addListWith(name: string, color: string) {
     try {
@@ -124,10 +193,7 @@ function App() {
     setListTodos((s) => ({ ...s, [listId]: updated }));
 
     try {
-      await api.todosByList.reorder(
-        listId,
-        updated.map((t) => t.id)
-      );
+      await api.move(updated[toIndex].id, moveTarget(updated, toIndex));
     } catch (e: any) {
       notifications.show({
         color: "red",
@@ -186,8 +252,11 @@ function App() {
     }));
 
     try {
-      // Persist: siirrä listalle
-      const updated = await api.update(todo.id, { list_id: toListId });
+      // Persist: siirrä listalle (yksi rivi, ei koko listan reorderia)
+      const updated = await api.move(todo.id, {
+        list_id: toListId,
+        ...moveTarget(toArr, 0),
+      });
 
       // Syncaa kohdelista serverin versiolla
       setListTodos((prev) => {
@@ -196,18 +265,6 @@ function App() {
         if (i >= 0) arr[i] = updated;
         return { ...prev, [toListId]: arr };
       });
-
-      // Persist: järjestykset molemmille
-      await Promise.all([
-        api.todosByList.reorder(
-          toListId,
-          toArr.map((t) => t.id)
-        ),
-        api.todosByList.reorder(
-          fromListId,
-          fromArr.map((t) => t.id)
-        ),
-      ]);
     } catch (e: any) {
       notifications.show({
         color: "red",
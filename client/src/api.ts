@@ -1,4 +1,4 @@
-import type { List, Todo } from "./types";
+import type { Board, List, SearchHit, Todo } from "./types";
 
 async function request<T>(url: string, init: RequestInit = {}): Promise<T> {
   const res = await fetch(url, {
@@ -35,7 +35,21 @@ async function request<T>(url: string, init: RequestInit = {}): Promise<T> {
   }
 }
 
+let boardEtag: string | null = null;
+
+// Koko työtila yhdellä pyynnöllä; null = ei muutoksia edellisen haun jälkeen (304)
+async function fetchBoard(): Promise<Board | null> {
+  const res = await fetch("/api/board", {
+    headers: boardEtag ? { "If-None-Match": boardEtag } : {},
+  });
+  if (res.status === 304) return null;
+  if (!res.ok) throw new Error(`${res.status} ${res.statusText}`);
+  boardEtag = res.headers.get("ETag");
+  return (await res.json()) as Board;
+}
+
 export const api = {
+  board: fetchBoard,
   list: () => request<Todo[]>("/api/todos"),
   create: (title: string) =>
     request<Todo>("/api/todos", {
@@ -52,6 +66,31 @@ export const api = {
     }),
   remove: (id: number) =>
     request<void>(`/api/todos/${id}`, { method: "DELETE" }),
+  move: (
+    id: number,
+    target: { list_id?: number; after_id?: number; before_id?: number }
+  ) =>
+    request<Todo>(`/api/todos/${id}/move`, {
+      method: "POST",
+      body: JSON.stringify(target),
+    }),
+
+  batch: (ops: Record<string, unknown>[]) =>
+    request<{ ok: true; results: { op: string; id: number }[] }>("/api/batch", {
+      method: "POST",
+      body: JSON.stringify({ ops }),
+    }),
+
+  search: (
+    q: string,
+    filters: { type?: "todo" | "file"; list_id?: number; done?: boolean; limit?: number } = {}
+  ) => {
+    const params = new URLSearchParams({ q });
+    for (const [key, value] of Object.entries(filters)) {
+      if (value !== undefined) params.set(key, String(value));
+    }
+    return request<SearchHit[]>(`/api/search?${params}`);
+  },
 
   lists: {
     all: () => request<List[]>("/api/lists"),
@@ -93,10 +132,10 @@ export const api = {
 
 todosByList: {
   all: (listId: number) => request<Todo[]>(`/api/lists/${listId}/todos`),
-  create: (listId: number, title: string) =>
+  create: (listId: number, title: string, afterId?: number) =>
     request<Todo>(`/api/lists/${listId}/todos`, {
       method: 'POST',
-      body: JSON.stringify({ title }),
+      body: JSON.stringify({ title, after_id: afterId }),
     }),
   reorder: (listId: number, order: number[]) =>
     request<{ ok: true }>(`/api/lists/${listId}/todos/reorder`, {
@@ -69,7 +69,24 @@ async function listFiles(): Promise<FileRow[]> {
   return r.json();
 }
 
+// crypto.subtle ei osaa laskea tiivistettä paloittain, joten koko tiedosto
+// luettaisiin muistiin. Isommat tiedostot lähetetään suoraan; palvelin
+// tunnistaa kaksoiskappaleen itse.
+const CHECKSUM_PROBE_MAX_BYTES = 32 * 1024 * 1024;
+
+async function sha256Hex(file: File) {
+  const digest = await crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest))
+    .map((b) => b.toString(16).padStart(2, "0"))
+    .join("");
+}
+
 async function uploadFile(file: File) {
+  // Palvelimella jo oleva sisältö: ei lähetetä tavuja uudelleen
+  if (crypto?.subtle && file.size <= CHECKSUM_PROBE_MAX_BYTES) {
+    const probe = await fetch(`/api/files/by-checksum/${await sha256Hex(file)}`);
+    if (probe.ok) return probe.json();
+  }
   const fd = new FormData();
   fd.append("file", file);
   const r = await fetch("/api/files", { method: "POST", body: fd });
@@ -281,9 +298,13 @@ export default function FileGallery({
             >
               <Stack gap={8} style={{ flex: 1, minHeight: 0 }}>
                 {" "}
-                {f.mime === "image/png" ? (
+                {f.mime === "image/png" || f.mime === "image/jpeg" ? (
+                  // Palvelimen pikkukuva, ei koko alkuperäistä kuvaa. Ilman
+                  // Pillowia (404) näytetään alkuperäinen kuva.
                   <Image
-                    src={`/api/files/${f.id}?inline=1`}
+                    src={`/api/thumbnails/${f.checksum}/256`}
+                    fallbackSrc={`/api/files/${f.id}`}
+                    loading="lazy"
                     alt={f.name}
                     h={140}
                     fit="cover"
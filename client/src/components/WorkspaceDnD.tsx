@@ -13,7 +13,7 @@ import {
   rectIntersection,
 } from "@dnd-kit/core";
 import { restrictToHorizontalAxis } from "@dnd-kit/modifiers";
-import { listContainerId, parseListId } from "../helpers/dnd";
+import { listContainerId, moveTarget, parseListId } from "../helpers/dnd";
 import type { List, Todo } from "../types";
 import { useMemo, useState } from "react";
 import { arrayMove } from "@dnd-kit/sortable";
@@ -193,18 +193,15 @@ const onDragEnd = async (e: DragEndEvent) => {
       onApplyListTodos(toList,   toArr);
 
       try {
-        // päivitä list_id
-        const updated = await api.update(moved.id, { list_id: toList });
+        // siirrä kortti kohdelistaan pudotuskohtaan yhdellä kirjoituksella
+        const updated = await api.move(moved.id, {
+          list_id: toList,
+          ...moveTarget(toArr, insertAt),
+        });
 
         // korvaa kohdelistassa serverin versio
         const synced = toArr.map((t) => (t.id === updated.id ? updated : t));
         onApplyListTodos(toList, synced);
-
-        // persistoi järjestykset
-        await Promise.all([
-          api.todosByList.reorder(toList,   synced.map((t) => t.id)),
-          api.todosByList.reorder(fromList, fromArr.map((t) => t.id)),
-        ]);
       } catch {
         // revert halutessa (voi myös refetchailla)
         // const freshFrom = await api.todosByList.all(fromList);
@@ -11,3 +11,12 @@ export function parseListId(id: string): number | "notepad" | null {
   }
   return null; 
 }
+
+// Naapurikortti, jonka perään (tai eteen) siirretty kortti sijoitetaan
+export function moveTarget(arr: { id: number }[], index: number) {
+  return index > 0
+    ? { after_id: arr[index - 1].id }
+    : arr.length > 1
+      ? { before_id: arr[1].id }
+      : {};
+}
@@ -13,3 +13,23 @@ export type List = {
   color?: string;
   created_at: string;
 };
+
+export type Board = {
+  revision: number;
+  lists: List[];
+  todos: Record<string, Todo[]>;
+  notepad: Todo[];
+};
+
+export type Change = {
+  id: number;
+  entity: "todos" | "lists" | "files" | "workspace";
+  op: "insert" | "update" | "delete" | "import";
+  data: Record<string, any>;
+  created_at: string;
+};
+
+// score = null: uusimpien SEARCH_RANK_WINDOW osuman jälkeen tulevat vanhemmat osumat järjestämättä
+export type SearchHit =
+  | ({ type: "todo"; score: number | null } & Todo)
+  | { type: "file"; id: number; name: string; created_at: string; score: number | null };
@@ -1,19 +1,27 @@
-from flask import Flask, jsonify, request, g
-import os, hashlib, mimetypes
+from flask import Flask, jsonify, request, g, has_request_context, stream_with_context
+import os, base64, cProfile, functools, gzip, hashlib, json, mimetypes, re, shutil, tarfile, tempfile, threading, time, uuid
+import click
 from werkzeug.utils import secure_filename
 from flask import send_file, abort
-from db import init_files_table
+from db import DB_PATH, ConnectionPool, init_files_table
+import compression
+from cache import make_cache
+from changes import ChangeFeed
+from derivatives import DerivativeStore
+from fastjson import FastJSONProvider
+from jobs import JobQueue
+from metrics import Metrics
 import sqlite3
+from collections import deque
 from pathlib import Path
 
 # ------------------------
 # Constants and Configuration
 # ------------------------
-DB_PATH = Path(__file__).parent / "todo.db"
-BASE_DIR = Path(__file__).parent / "uploaded_files"
+BASE_DIR = Path(os.getenv("UPLOAD_ROOT") or Path(__file__).parent / "uploaded_files")
 UPLOAD_DIR = BASE_DIR / "uploads"
-
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+SESSION_DIR = BASE_DIR / "sessions"
+DERIVATIVE_DIR = BASE_DIR / "derivatives"
 
 ALLOWED_EXTS = {".txt", ".pdf", ".png", ".jpg", ".jpeg", ".docx", ".xlsx", ".pptx", ".zip", ".rar"}
 ALLOWED_MIME = {"text/plain", "application/pdf", "image/png", "image/jpeg",
@@ -27,21 +35,299 @@ ALLOWED_MIME = {"text/plain", "application/pdf", "image/png", "image/jpeg",
                }
 
 MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50 MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+UPLOAD_PART_SIZE = 8 * 1024 * 1024  # suggested part size for upload sessions
+MAX_UPLOAD_PARTS = 10000
+SHA256_RE = re.compile(r"[0-9a-f]{64}")
+
+# How downloads are delivered:
+#   direct     - Flask streams the file (Range/If-Range supported; WSGI servers with
+#                a wsgi.file_wrapper such as gunicorn use sendfile for full bodies)
+#   x-sendfile - Apache/lighttpd read the X-Sendfile header and send the file
+#   x-accel    - nginx serves X_ACCEL_PREFIX + <blob path> from an internal location
+FILE_SERVE_MODE = os.getenv("FILE_SERVE_MODE", "direct")
+X_ACCEL_PREFIX = os.getenv("X_ACCEL_PREFIX", "/protected-uploads/")
+
+# Image thumbnails / PDF previews (needs Pillow; PDFs also need pdftoppm),
+# rendered by a background job after upload and kept under a disk budget
+DERIVATIVE_CACHE_BYTES = int(os.getenv("DERIVATIVE_CACHE_BYTES", str(256 * 1024 * 1024)))
+derivatives = DerivativeStore(DERIVATIVE_DIR, DERIVATIVE_CACHE_BYTES)
 
 app = Flask(__name__)
+# orjson-backed when installed (pip install orjson), stdlib json otherwise
+app.json = FastJSONProvider(app)
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 
+def body_limit(max_bytes: int):
+    """Route decorator replacing MAX_CONTENT_LENGTH for one view.
+
+    The limit is also stored on the view, where asgi.py looks it up before
+    spooling the body.
+    """
+    def decorate(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            request.max_content_length = max_bytes
+            return view(*args, **kwargs)
+        wrapper.max_content_length = max_bytes
+        return wrapper
+    return decorate
+
+pool = ConnectionPool(DB_PATH, max_idle=int(os.getenv("DB_POOL_SIZE", "8")))
+change_feed = ChangeFeed(pool, dumps=app.json.dumps)
+SSE_KEEPALIVE_SECONDS = 15
+# Under a threaded WSGI server every /api/changes subscriber holds a thread
+# until it disconnects. SSE_MAX_STREAMS caps them per process (0: no cap) so
+# the rest of the API keeps its threads; gunicorn.conf.py sets it to half of
+# GUNICORN_THREADS. asgi.py serves the streams on its event loop instead.
+SSE_MAX_STREAMS = int(os.getenv("SSE_MAX_STREAMS", "0"))
+sse_slots = threading.BoundedSemaphore(SSE_MAX_STREAMS) if SSE_MAX_STREAMS else None
+
+# Post-upload processing and blob cleanup run as jobs from the `jobs` table.
+# Each process starts JOB_WORKERS threads on its first request; set it to 0 and
+# run `flask --app app run-jobs` to keep them out of the web workers.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+GC_INTERVAL_SECONDS = int(os.getenv("GC_INTERVAL_SECONDS", "3600"))
+GC_GRACE_SECONDS = 3600  # younger unreferenced files may belong to an upload in flight
+UPLOAD_SESSION_TTL = 24 * 3600
+jobs = JobQueue(pool)
+jobs.every("gc", GC_INTERVAL_SECONDS)
+
+# Per-process request metrics, scraped from /api/metrics. SERVER_TIMING=1 also
+# reports each request's DB and total time in a Server-Timing header.
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+metrics = Metrics()
+metrics.describe("requests_total", "counter", "HTTP requests by route and status.")
+metrics.describe("request_duration_seconds", "histogram", "Time from before_request to response, by route.")
+metrics.describe("sql_queries_total", "counter", "SQL statements executed on the request connection, by route.")
+metrics.describe("sql_seconds_total", "counter", "Time spent executing SQL on the request connection, by route.")
+metrics.describe("db_lock_wait_seconds_total", "counter", "Time spent in BEGIN IMMEDIATE waiting for the write lock, by route.")
+metrics.describe("upload_bytes_total", "counter", "Bytes received by file uploads and upload parts.")
+metrics.describe("upload_seconds_total", "counter", "Time spent receiving file uploads and upload parts.")
+metrics.describe("db_pool", "gauge", "Connection pool counters.")
+metrics.describe("response_cache", "gauge", "Response cache counters.")
+metrics.describe("derivatives", "gauge", "Thumbnail cache counters.")
+metrics.describe("job_queue", "gauge", "Jobs in the queue by status.")
+metrics.describe("jobs_processed", "gauge", "Jobs run by this process, by kind and outcome.")
+metrics.describe("job_seconds", "gauge", "Time this process spent running jobs, by kind.")
+metrics.describe("slow_queries_total", "counter", "Statements at or above SLOW_QUERY_MS, by route.")
+metrics.describe("compressed_responses_total", "counter", "Responses sent with a Content-Encoding, by encoding.")
+metrics.describe("compression_saved_bytes_total", "counter", "Response bytes saved by compression, by encoding.")
+
+# Serialized JSON of the hot list endpoints, invalidated per list from the
+# change log (see invalidate_cached). RESPONSE_CACHE_URL=redis://... shares one
+# cache between workers; RESPONSE_CACHE_BYTES=0 disables it.
+response_cache = make_cache(
+    os.getenv("RESPONSE_CACHE_URL", "memory://"),
+    max_bytes=int(os.getenv("RESPONSE_CACHE_BYTES", str(32 * 1024 * 1024))),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "60")),
+)
+
+# Text and JSON responses of at least COMPRESS_MIN_BYTES are sent zstd, br or
+# gzip, whichever the client accepts (zstd/br need the zstandard/brotli
+# packages). Cached payloads keep their compressed variants next to them.
+# COMPRESS_RESPONSES=0 leaves compression to a front-end proxy.
+COMPRESS_RESPONSES = os.getenv("COMPRESS_RESPONSES", "1") == "1"
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESSIBLE_MIMES = {"application/json", "application/javascript", "application/x-ndjson", "image/svg+xml"}
+
+# STORE_COMPRESSED=1 gzips compressible uploads in the file store after upload
+# (kept only when it saves at least STORE_COMPRESS_MIN_SAVING). Downloads pass
+# the gzip bytes through to clients that accept them and decompress otherwise.
+STORE_COMPRESSED = os.getenv("STORE_COMPRESSED", "0") == "1"
+STORE_COMPRESS_MIN_SAVING = 0.10
+STORE_COMPRESS_MIMES = {"text/plain",
+                        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+                       }
+
+# Diagnostics. SLOW_QUERY_MS logs request statements at or above the threshold
+# together with their query plan. PROFILE_DIR enables cProfile dumps (.prof,
+# readable with pstats/snakeviz/flameprof) for requests sent with
+# "X-Profile: 1", or for every request with PROFILE_ALL=1.
+SLOW_QUERY_MS = float(os.environ["SLOW_QUERY_MS"]) if os.getenv("SLOW_QUERY_MS") else None
+PROFILE_DIR = Path(os.environ["PROFILE_DIR"]) if os.getenv("PROFILE_DIR") else None
+PROFILE_ALL = os.getenv("PROFILE_ALL", "0") == "1"
+slow_queries = deque(maxlen=100)
+
 # ------------------------
 # Database Helpers
 # ------------------------
 def get_db():
     if "db" not in g:
-        g.db = sqlite3.connect(DB_PATH)
-        g.db.row_factory = sqlite3.Row
+        g.db = pool.acquire()
+        g.db.reset_counters()
+        g.db.set_trace_callback(g.db.count_statement)
+        g.db.slow_query_ms = SLOW_QUERY_MS
+        g.db.on_slow_query = log_slow_query
     return g.db
 
-def _sha256_bytes(buf: bytes) -> str:
-    return hashlib.sha256(buf).hexdigest()
+def log_slow_query(db, sql: str, params, elapsed: float):
+    try:
+        plan = db.explain(sql, params)
+    except sqlite3.Error:
+        plan = []
+    route = request.url_rule.rule if has_request_context() and request.url_rule else "none"
+    entry = {
+        "route": route,
+        "ms": round(elapsed * 1000, 2),
+        "sql": " ".join(sql.split()),
+        "params": repr(params)[:200],
+        "plan": plan,
+    }
+    slow_queries.append(entry)
+    metrics.inc("slow_queries_total", route=route)
+    app.logger.warning("slow query %.1f ms on %s: %s params=%s plan=%s",
+                       entry["ms"], route, entry["sql"], entry["params"], " | ".join(plan))
+
+def cached_json(key: str, build):
+    """JSON response for `key` from the response cache, calling build() on a miss.
+
+    build() returns the encoded body (see FastJSONProvider.encode_rows).
+    """
+    # Catch up on the change log first (one indexed query), so writes made by
+    # other worker processes invalidate this process's entries too
+    change_feed.publish()
+    encoding = compression.negotiate(request.accept_encodings) if COMPRESS_RESPONSES else None
+    variant = f"{key}|{encoding}"
+    if encoding:
+        # Taken before reading the plain body, which may be about to go stale
+        variant_version = response_cache.version(variant)
+    body = response_cache.get(key)
+    status = "HIT"
+    if body is None:
+        # Version first: a write landing during build() makes the set a no-op
+        version = response_cache.version(key)
+        body = build()
+        response_cache.set(key, body, version)
+        status = "MISS"
+    if encoding and len(body) >= COMPRESS_MIN_BYTES:
+        # Compressed once per cached payload and encoding, at a higher level
+        encoded = response_cache.get(variant)
+        if encoded is None:
+            encoded = compression.compress(body, encoding, cached=True)
+            response_cache.set(variant, encoded, variant_version)
+        resp = _encoded_response(encoded, encoding, len(body), mimetype=app.json.mimetype)
+    else:
+        resp = app.response_class(body, mimetype=app.json.mimetype)
+    resp.headers["X-Cache"] = status
+    return resp
+
+def _encoded_response(encoded: bytes, encoding: str, plain_size: int, **kwargs):
+    resp = app.response_class(encoded, **kwargs)
+    resp.headers["Content-Encoding"] = encoding
+    resp.vary.add("Accept-Encoding")
+    metrics.inc("compressed_responses_total", encoding=encoding)
+    metrics.inc("compression_saved_bytes_total", plain_size - len(encoded), encoding=encoding)
+    return resp
+
+def invalidate_cached(changes: list[dict]):
+    """Drop cached payloads touched by a batch of change-log rows."""
+    keys = set()
+    for change in changes:
+        data = change["data"]
+        if change["entity"] == "lists":
+            keys.add("lists")
+            if change["op"] == "delete":
+                keys.add(f"todos:{data['id']}")
+        elif change["entity"] == "todos":
+            keys.add(f"todos:{data['list_id']}")
+            if data.get("from_list_id") is not None:
+                keys.add(f"todos:{data['from_list_id']}")
+        elif change["entity"] == "files":
+            keys.add("files")
+        elif change["entity"] == "workspace":
+            response_cache.clear()  # bulk import
+            return
+    if keys:
+        response_cache.delete(*keys, *(f"{k}|{e}" for k in keys for e in compression.ENCODINGS))
+
+change_feed.add_listener(invalidate_cached)
+
+def _stream_to_temp(stream, directory: Path) -> tuple[Path, str, int]:
+    """Copy `stream` to a temp file in `directory` chunk by chunk, hashing as it goes."""
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".tmp")
+    started = time.perf_counter()
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := stream.read(UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                size += len(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+    metrics.inc("upload_bytes_total", size)
+    metrics.inc("upload_seconds_total", time.perf_counter() - started)
+    return Path(tmp_name), digest.hexdigest(), size
+
+def blob_path(checksum: str) -> Path:
+    # Content-addressed: identical bytes always map to the same file
+    return UPLOAD_DIR / checksum[:2] / checksum
+
+def _store_blob(tmp_path: Path, checksum: str) -> Path:
+    disk_path = blob_path(checksum)
+    if disk_path.exists():
+        tmp_path.unlink()
+        os.utime(disk_path)  # referenced again: keep it out of the GC grace window
+    else:
+        disk_path.parent.mkdir(exist_ok=True)
+        os.replace(tmp_path, disk_path)
+    return disk_path
+
+def compressed_blob_path(checksum: str) -> Path:
+    return UPLOAD_DIR / checksum[:2] / f"{checksum}.gz"
+
+FILE_ID_BY_CHECKSUM_SQL = "SELECT id FROM files WHERE checksum = ?"
+FILE_SELECT = "SELECT id, name, mime, size, checksum, created_at FROM files"
+FILE_ORDER = "ORDER BY created_at DESC, id DESC"
+
+def _register_file(db, safe_name: str, mime: str, size: int, disk_path: Path, checksum: str):
+    """Insert a files row; returns (file_id, created). A duplicate resolves to the stored row."""
+    try:
+        cur = db.execute(
+            "INSERT INTO files (name, mime, size, path, checksum) VALUES (?, ?, ?, ?, ?)",
+            (safe_name, mime, size, str(disk_path), checksum),
+        )
+        db.commit()
+        return cur.lastrowid, True
+    except sqlite3.IntegrityError:
+        row = db.execute(FILE_ID_BY_CHECKSUM_SQL, (checksum,)).fetchone()
+        return (int(row["id"]) if row else None), False
+
+def _uploaded_file_response(db, file_id: int | None):
+    """201 with the files row an upload resolved to, as GET /api/files lists it."""
+    row = db.execute(
+        "SELECT id, name, mime, size, checksum FROM files WHERE id = ?", (file_id,)
+    ).fetchone()
+    if row is None:
+        # Lost a race with a delete of the same bytes
+        return jsonify({"error": "File was deleted during upload, retry"}), 409
+    return jsonify({"ok": True, **dict(row)}), 201
+
+def _enqueue_processing(db, file_id: int, mime: str):
+    """Queue checksum verification, thumbnails and compression for a stored file."""
+    jobs.enqueue("verify_checksum", {"file_id": file_id}, db=db)
+    if derivatives.supports(mime):
+        jobs.enqueue("derivatives", {"file_id": file_id}, db=db)
+    if STORE_COMPRESSED and mime in STORE_COMPRESS_MIMES:
+        jobs.enqueue("compress_blob", {"file_id": file_id}, db=db)
+    db.commit()
+    jobs.notify()
+
+def _check_upload_name(filename: str, mimetype: str | None):
+    """Return (safe_name, mime, None) or (None, None, error response)."""
+    safe_name = secure_filename(filename)
+    ext = os.path.splitext(safe_name)[1].lower()
+    if ext not in ALLOWED_EXTS:
+        return None, None, (jsonify({"error": f"Extension not allowed: {ext}"}), 415)
+    mime = _detect_mime(safe_name, mimetype)
+    if mime not in ALLOWED_MIME:
+        return None, None, (jsonify({"error": f"Unsupported MIME: {mime}"}), 415)
+    return safe_name, mime, None
 
 def _detect_mime(filename: str, fallback: str) -> str:
     guessed = mimetypes.guess_type(filename)[0]
@@ -51,17 +337,22 @@ def _detect_mime(filename: str, fallback: str) -> str:
 def close_db(_):
     db = g.pop("db", None)
     if db:
-        db.close()
+        db.set_trace_callback(None)
+        db.slow_query_ms = None
+        pool.release(db)
+
+LIST_ID_BY_NAME_SQL = "SELECT id FROM lists WHERE name = ?"
+NOTEPAD_ID_SQL = "SELECT id FROM lists WHERE lower(name)='notepad'"
 
 def get_inbox_id(db: sqlite3.Connection) -> int:
-    row = db.execute("SELECT id FROM lists WHERE name = ?", ("Inbox",)).fetchone()
+    row = db.execute(LIST_ID_BY_NAME_SQL, ("Inbox",)).fetchone()
     if row:
         return int(row["id"])
     db.commit()
     return
 
 def get_notepad_id(db: sqlite3.Connection) -> int:
-    row = db.execute("SELECT id FROM lists WHERE name = ?", ("Notepad",)).fetchone()
+    row = db.execute(LIST_ID_BY_NAME_SQL, ("Notepad",)).fetchone()
     if row:
         return int(row["id"])
     cur = db.execute(
@@ -73,39 +364,196 @@ def get_notepad_id(db: sqlite3.Connection) -> int:
 
 
 def fetch_list_id(db, name: str) -> int | None:
-    row = db.execute("SELECT id FROM lists WHERE name = ?", (name,)).fetchone()
+    row = db.execute(LIST_ID_BY_NAME_SQL, (name,)).fetchone()
     return int(row["id"]) if row else None
 
 # ------------------------
-# Database Initialization and Migration
+# Todo Ordering
 # ------------------------
-def init_db():
-    db = get_db()
-    db.execute("PRAGMA foreign_keys = ON")
-    migrate_schema(db)
-    backfill_data(db)
-    init_files_table(db)
-    db.commit()
+# Todos are ordered by a sparse integer `rank`. New cards take a rank below the
+# first card, above the last, or halfway between two neighbours, so an insert
+# only writes the new row. The dense 0-based `position` the client sees is
+# derived at read time.
+RANK_GAP = 1 << 20
+
+TODO_SELECT = (
+    "SELECT id, title, done, created_at, list_id, "
+    "ROW_NUMBER() OVER (PARTITION BY list_id ORDER BY rank ASC, id DESC) - 1 AS position "
+    "FROM todos"
+)
+
+LIST_TODOS_SQL = f"{TODO_SELECT} WHERE list_id = ? ORDER BY rank ASC, id DESC"
+FETCH_TODO_SQL = (
+    "SELECT t.id, t.title, t.done, t.created_at, t.list_id, "
+    "(SELECT COUNT(*) FROM todos o WHERE o.list_id = t.list_id "
+    " AND (o.rank < t.rank OR (o.rank = t.rank AND o.id > t.id))) AS position "
+    "FROM todos t WHERE t.id = ?"
+)
+LIST_RANKS_SQL = "SELECT id, rank FROM todos WHERE list_id = ? ORDER BY rank ASC, id DESC"
+RANK_IN_LIST_SQL = "SELECT rank FROM todos WHERE id = ? AND list_id = ?"
+NEXT_RANK_SQL = "SELECT MIN(rank) FROM todos WHERE list_id = ? AND rank > ? AND id != ?"
+PREV_RANK_SQL = "SELECT MAX(rank) FROM todos WHERE list_id = ? AND rank < ? AND id != ?"
+TOP_RANK_SQL = "SELECT MIN(rank) FROM todos WHERE list_id = ? AND id != ?"
+DELETE_LIST_TODOS_SQL = "DELETE FROM todos WHERE list_id = ?"
+
+def fetch_todo(db, todo_id: int):
+    return db.execute(FETCH_TODO_SQL, (todo_id,)).fetchone()
+
+def rebalance_ranks(db, list_id: int):
+    rows = db.execute(LIST_RANKS_SQL, (list_id,)).fetchall()
+    db.executemany(
+        "UPDATE todos SET rank = ? WHERE id = ?",
+        [(pos * RANK_GAP, int(r["id"])) for pos, r in enumerate(rows)],
+    )
 
-    db.execute("""
-      CREATE TABLE IF NOT EXISTS lists (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        position INTEGER NOT NULL DEFAULT 0,
-        color TEXT,
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-      );
-    """)
+def rank_for_insert(
+    db,
+    list_id: int,
+    after_id: int | None = None,
+    before_id: int | None = None,
+    exclude_id: int | None = None,
+) -> int:
+    """Rank for a card placed after `after_id`, before `before_id`, or at the top.
+
+    `exclude_id` is the card being moved, so it never counts as its own neighbour.
+    """
+    skip = exclude_id if exclude_id is not None else -1
+    lo = hi = None
+    if after_id is not None:
+        row = db.execute(RANK_IN_LIST_SQL, (after_id, list_id)).fetchone()
+        if row is None:
+            raise LookupError(f"Todo {after_id} is not in list {list_id}")
+        lo = row["rank"]
+        hi = db.execute(NEXT_RANK_SQL, (list_id, lo, skip)).fetchone()[0]
+    elif before_id is not None:
+        row = db.execute(RANK_IN_LIST_SQL, (before_id, list_id)).fetchone()
+        if row is None:
+            raise LookupError(f"Todo {before_id} is not in list {list_id}")
+        hi = row["rank"]
+        lo = db.execute(PREV_RANK_SQL, (list_id, hi, skip)).fetchone()[0]
+    else:
+        hi = db.execute(TOP_RANK_SQL, (list_id, skip)).fetchone()[0]
+
+    if lo is None and hi is None:
+        return 0
+    if lo is None:
+        return hi - RANK_GAP
+    if hi is None:
+        return lo + RANK_GAP
+    if hi - lo > 1:
+        return (lo + hi) // 2
+
+    # Gap exhausted between these two neighbours: respace the list and retry
+    rebalance_ranks(db, list_id)
+    return rank_for_insert(db, list_id, after_id, before_id, exclude_id)
+
+def insert_todo(db, list_id: int, title: str, after_id: int | None = None) -> int:
+    cur = db.execute(
+        "INSERT INTO todos (title, done, list_id, rank) VALUES (?, ?, ?, ?)",
+        (title, 0, list_id, rank_for_insert(db, list_id, after_id)),
+    )
+    return int(cur.lastrowid)
 
-    db.execute("""
-      CREATE TABLE IF NOT EXISTS todos (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        done INTEGER NOT NULL DEFAULT 0,
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-        list_id INTEGER REFERENCES lists(id)
-      );
-    """)
+# ------------------------
+# Pagination
+# ------------------------
+# Keyset pagination: `cursor` encodes the sort key of the last row returned, so
+# every page is an index range scan no matter how deep. Without `limit` or
+# `cursor` the list endpoints keep returning the full array.
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+TODO_FIELDS = ("id", "title", "done", "created_at", "list_id", "position")
+FILE_FIELDS = ("id", "name", "mime", "size", "checksum", "created_at")
+
+def encode_cursor(*key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+def decode_cursor(cursor: str, types: tuple) -> list:
+    """Sort key from encode_cursor(); `types` is the accepted type (or types) of each element.
+
+    Cursors come from the client, so anything that is not exactly the shape
+    the caller binds into its query is rejected with ValueError.
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, list) or len(key) != len(types):
+        raise ValueError("Invalid cursor")
+    for value, expected in zip(key, types):
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise ValueError("Invalid cursor")
+    return key
+
+def page_args(allowed_fields: tuple[str, ...]):
+    """Parse ?limit=&cursor=&fields= into (limit or None, cursor or None, fields)."""
+    args = request.args
+    fields = [f for f in (args.get("fields") or "").split(",") if f]
+    unknown = set(fields) - set(allowed_fields)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    limit = args.get("limit")
+    cursor = args.get("cursor") or None
+    if limit is None and cursor is None:
+        return None, None, fields or list(allowed_fields)
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    return max(1, min(limit, MAX_PAGE_SIZE)), cursor, fields or list(allowed_fields)
+
+def page_response(items: list, next_cursor: str | None):
+    resp = jsonify(items)
+    if next_cursor:
+        resp.headers["X-Next-Cursor"] = next_cursor
+    return resp
+
+# ------------------------
+# Database Initialization and Migration
+# ------------------------
+def init_db():
+    """Bring the schema and upload folders up to date. Runs once per process."""
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    SESSION_DIR.mkdir(parents=True, exist_ok=True)
+    db = pool.acquire()
+    try:
+        return run_migrations(db)
+    finally:
+        pool.release(db)
+
+MIGRATION_LOCK_TIMEOUT = 600  # seconds to wait for another process's migration
+
+def run_migrations(db) -> int:
+    # PRAGMA user_version tracks the last applied step in MIGRATIONS
+    if db.execute("PRAGMA user_version").fetchone()[0] >= len(MIGRATIONS):
+        return len(MIGRATIONS)
+    for version, step in enumerate(MIGRATIONS, start=1):
+        # Each step is one write transaction (SQLite DDL is transactional), so
+        # processes starting together take turns and a step is applied once
+        _begin_migration(db)
+        try:
+            if db.execute("PRAGMA user_version").fetchone()[0] >= version:
+                db.rollback()  # applied by another process while we waited
+                continue
+            step(db)
+            db.execute(f"PRAGMA user_version = {version}")
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+    return len(MIGRATIONS)
+
+def _begin_migration(db):
+    deadline = time.monotonic() + MIGRATION_LOCK_TIMEOUT
+    while True:
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError as e:
+            # busy_timeout already waited; a long step (e.g. an index build) may take longer
+            if "locked" not in str(e) or time.monotonic() > deadline:
+                raise
 
 def ensure_default_lists_once(db):
     cnt = db.execute("SELECT COUNT(*) AS c FROM lists").fetchone()["c"]
@@ -118,7 +566,6 @@ def ensure_default_lists_once(db):
             "INSERT INTO lists (name, position, color, is_hidden) VALUES (?, ?, ?, ?)",
             ("Notepad", 1, "#e6fffb", 1), 
         )
-        db.commit()
 
 
 def migrate_schema(db):
@@ -155,12 +602,9 @@ def migrate_schema(db):
     if "position" not in cols_todos:
         db.execute("ALTER TABLE todos ADD COLUMN position INTEGER NOT NULL DEFAULT 0")
 
-    db.commit()
-
 def backfill_data(db):
     ensure_default_lists_once(db)
 
-    dirty = False
     null_cnt = db.execute("SELECT COUNT(*) AS c FROM todos WHERE list_id IS NULL").fetchone()["c"]
     if null_cnt > 0:
         inbox_id = fetch_list_id(db, "Inbox")
@@ -170,10 +614,8 @@ def backfill_data(db):
                 ("Inbox", 0, "#fffbe6"),
             )
             db.execute("UPDATE lists SET is_hidden = 1 WHERE name = 'Notepad'")
-            db.commit()
             inbox_id = fetch_list_id(db, "Inbox")
         db.execute("UPDATE todos SET list_id = ? WHERE list_id IS NULL", (inbox_id,))
-        dirty = True
 
     list_ids = [int(r["id"]) for r in db.execute("SELECT id FROM lists").fetchall()]
     for lid in list_ids:
@@ -189,7 +631,6 @@ def backfill_data(db):
         if not needs_fix:
             continue
 
-        dirty = True
         rows = db.execute(
             "SELECT id FROM todos WHERE list_id = ? ORDER BY created_at DESC, id DESC",
             (lid,),
@@ -197,9 +638,6 @@ def backfill_data(db):
         for pos, r in enumerate(rows):
             db.execute("UPDATE todos SET position = ? WHERE id = ?", (pos, int(r["id"])))
 
-    if dirty:
-        db.commit()
-
 def get_or_create_notepad_id(db: sqlite3.Connection) -> int:
     row = db.execute("SELECT id FROM lists WHERE name = 'Notepad'").fetchone()
     if row:
@@ -212,10 +650,377 @@ def get_or_create_notepad_id(db: sqlite3.Connection) -> int:
     return int(cur.lastrowid)
 
 
+def add_todo_rank(db):
+    cols_todos = [r[1] for r in db.execute("PRAGMA table_info(todos)")]
+    if "rank" not in cols_todos:
+        db.execute("ALTER TABLE todos ADD COLUMN rank INTEGER NOT NULL DEFAULT 0")
+    # The legacy `position` column is left in place but no longer written
+    db.execute("UPDATE todos SET rank = position * ?", (RANK_GAP,))
+    db.execute("CREATE INDEX IF NOT EXISTS idx_todos_list_rank ON todos(list_id, rank)")
+
+
+def create_upload_sessions(db):
+    db.execute("""
+      CREATE TABLE IF NOT EXISTS upload_sessions (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        mime TEXT NOT NULL,
+        size INTEGER,
+        checksum TEXT,
+        created_at TEXT NOT NULL DEFAULT (datetime('now'))
+      );
+    """)
+
+
+def content_address_blobs(db):
+    # Older uploads were stored as <checksum[:16]>_<name>; move them to blob_path()
+    for row in db.execute("SELECT id, path, checksum FROM files").fetchall():
+        old, new = Path(row["path"]), blob_path(row["checksum"])
+        if old == new:
+            continue
+        if old.exists() and not new.exists():
+            new.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(old, new)
+        db.execute("UPDATE files SET path = ? WHERE id = ?", (str(new), row["id"]))
+
+
+def add_listing_indexes(db):
+    # (list_id, rank, done) covers ordering, the done filter and position
+    # counts; the rowid (id) is part of every index entry.
+    db.execute("DROP INDEX IF EXISTS idx_todos_list_rank")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_todos_list_rank_done ON todos(list_id, rank, done)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_files_created ON files(created_at, id)")
+
+
+def add_lookup_indexes(db):
+    db.execute("CREATE INDEX IF NOT EXISTS idx_lists_name ON lists(name)")
+    # admin_hide_notepad matches with lower(name) = 'notepad'
+    db.execute("CREATE INDEX IF NOT EXISTS idx_lists_lower_name ON lists(lower(name))")
+
+
+def add_workspace_revision(db):
+    # Single-row counter bumped by triggers on every write to the board tables,
+    # so readers can tell "nothing changed" without looking at the data.
+    db.execute("""
+      CREATE TABLE IF NOT EXISTS workspace (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        revision INTEGER NOT NULL DEFAULT 0
+      );
+    """)
+    db.execute("INSERT OR IGNORE INTO workspace (id, revision) VALUES (1, 0)")
+    for table in ("lists", "todos", "files"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            db.execute(f"""
+              CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_revision
+              AFTER {event} ON {table}
+              BEGIN
+                UPDATE workspace SET revision = revision + 1 WHERE id = 1;
+              END;
+            """)
+
+
+CHANGE_PAYLOADS = {
+    "todos": "'id', {r}.id, 'title', {r}.title, 'done', {r}.done, 'list_id', {r}.list_id, "
+             "'rank', {r}.rank, 'created_at', {r}.created_at",
+    "lists": "'id', {r}.id, 'name', {r}.name, 'position', {r}.position, 'color', {r}.color, "
+             "'is_hidden', {r}.is_hidden, 'created_at', {r}.created_at",
+    "files": "'id', {r}.id, 'name', {r}.name, 'mime', {r}.mime, 'size', {r}.size, "
+             "'checksum', {r}.checksum, 'created_at', {r}.created_at",
+}
+
+def add_change_log(db):
+    # Every write to the board tables appends a row here; /api/changes streams them
+    db.execute("""
+      CREATE TABLE IF NOT EXISTS changes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        entity TEXT NOT NULL,
+        op TEXT NOT NULL,
+        data TEXT NOT NULL,
+        created_at TEXT NOT NULL DEFAULT (datetime('now'))
+      );
+    """)
+    for table, payload in CHANGE_PAYLOADS.items():
+        for event, ref in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            data = payload.format(r=ref)
+            if table == "todos" and event == "UPDATE":
+                data += ", 'moved', (NEW.rank != OLD.rank OR NEW.list_id IS NOT OLD.list_id)"
+            db.execute(f"""
+              CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_changes
+              AFTER {event} ON {table}
+              BEGIN
+                INSERT INTO changes (entity, op, data)
+                VALUES ('{table}', '{event.lower()}', json_object({data}));
+              END;
+            """)
+
+# External-content FTS5 indexes over todo titles and file names. The prefix
+# option keeps "abc*" queries on 2-3 character prefixes off a full term scan.
+SEARCH_INDEXES = {
+    "todos_fts": ("todos", "title"),
+    "files_fts": ("files", "name"),
+}
+
+def add_search_index(db):
+    for fts, (table, column) in SEARCH_INDEXES.items():
+        db.execute(f"""
+          CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {column}, content='{table}', content_rowid='id', prefix='2 3'
+          );
+        """)
+        db.execute(f"""
+          CREATE TRIGGER IF NOT EXISTS trg_{table}_insert_fts AFTER INSERT ON {table}
+          BEGIN
+            INSERT INTO {fts} (rowid, {column}) VALUES (NEW.id, NEW.{column});
+          END;
+        """)
+        db.execute(f"""
+          CREATE TRIGGER IF NOT EXISTS trg_{table}_delete_fts AFTER DELETE ON {table}
+          BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {column}) VALUES ('delete', OLD.id, OLD.{column});
+          END;
+        """)
+        # Only text edits touch the index; moves and done toggles don't
+        db.execute(f"""
+          CREATE TRIGGER IF NOT EXISTS trg_{table}_update_fts AFTER UPDATE OF {column} ON {table}
+          BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {column}) VALUES ('delete', OLD.id, OLD.{column});
+            INSERT INTO {fts} (rowid, {column}) VALUES (NEW.id, NEW.{column});
+          END;
+        """)
+        db.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+def add_change_source_list(db):
+    # Todo updates also record the list a card left, so both lists' caches go stale
+    data = CHANGE_PAYLOADS["todos"].format(r="NEW")
+    data += ", 'moved', (NEW.rank != OLD.rank OR NEW.list_id IS NOT OLD.list_id)"
+    data += ", 'from_list_id', OLD.list_id"
+    db.execute("DROP TRIGGER IF EXISTS trg_todos_update_changes")
+    db.execute(f"""
+      CREATE TRIGGER trg_todos_update_changes
+      AFTER UPDATE ON todos
+      BEGIN
+        INSERT INTO changes (entity, op, data)
+        VALUES ('todos', 'update', json_object({data}));
+      END;
+    """)
+
+def create_jobs(db):
+    # Background job queue (see jobs.py); times are Unix timestamps
+    db.execute("""
+      CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL DEFAULT '{}',
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        run_after REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        last_error TEXT,
+        created_at TEXT NOT NULL DEFAULT (datetime('now'))
+      );
+    """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after ON jobs(status, run_after)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_kind_status ON jobs(kind, status)")
+
+def add_file_encoding(db):
+    # NULL: the blob holds the file's bytes as uploaded; 'gzip': path is a .gz of them
+    cols_files = [r[1] for r in db.execute("PRAGMA table_info(files)")]
+    if "encoding" not in cols_files:
+        db.execute("ALTER TABLE files ADD COLUMN encoding TEXT")
+
+
+
+# Each step runs exactly once per database, in order. Append new steps, never reorder.
+MIGRATIONS = [
+    migrate_schema,
+    init_files_table,
+    backfill_data,
+    add_todo_rank,
+    create_upload_sessions,
+    content_address_blobs,
+    add_listing_indexes,
+    add_lookup_indexes,
+    add_workspace_revision,
+    add_change_log,
+    add_search_index,
+    add_change_source_list,
+    create_jobs,
+    add_file_encoding,
+]
+
+_db_ready = False
+_db_lock = threading.Lock()
+
+def prepare_database():
+    """Run migrations and start the change feed, once per process."""
+    global _db_ready
+    if not _db_ready:
+        with _db_lock:
+            if not _db_ready:
+                init_db()
+                change_feed.start()
+                _db_ready = True
+
+@app.before_request
+def start_profiler():
+    if PROFILE_DIR is None or not (PROFILE_ALL or request.headers.get("X-Profile") == "1"):
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return  # another request in this process is already being profiled
+    g.profiler = profiler
+
+@app.after_request
+def stop_profiler(resp):
+    # Registered first, so it runs last and includes the other after_request hooks
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return resp
+    profiler.disable()
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_")
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    path = PROFILE_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{slug}-{uuid.uuid4().hex[:6]}.prof"
+    profiler.dump_stats(path)
+    resp.headers["X-Profile-File"] = path.name
+    return resp
+
+@app.teardown_request
+def discard_profiler(_):
+    # Request failed before stop_profiler ran
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
 
 @app.before_request
 def ensure_db():
+    prepare_database()
+    jobs.start(JOB_WORKERS)
+    get_db()
+
+@app.after_request
+def record_request(resp):
+    # Registered before publish_changes, so it runs after it and times it too
+    started = g.pop("request_started", None)
+    if started is None:
+        return resp
+    elapsed = time.perf_counter() - started
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.inc("requests_total", method=request.method, route=route, status=resp.status_code)
+    metrics.observe("request_duration_seconds", elapsed, method=request.method, route=route)
+    db = g.get("db")
+    if db is not None:
+        metrics.inc("sql_queries_total", db.queries, route=route)
+        metrics.inc("sql_seconds_total", db.sql_time, route=route)
+        metrics.inc("db_lock_wait_seconds_total", db.lock_wait, route=route)
+    if SERVER_TIMING:
+        timings = [f"app;dur={elapsed * 1000:.2f}"]
+        if db is not None:
+            timings.insert(0, f'db;dur={db.sql_time * 1000:.2f};desc="{db.queries} queries"')
+        resp.headers["Server-Timing"] = ", ".join(timings)
+    return resp
+
+@app.after_request
+def publish_changes(resp):
+    # Wake /api/changes subscribers once per successful write request
+    if request.method in ("POST", "PUT", "PATCH", "DELETE") and resp.status_code < 400:
+        change_feed.publish()
+    return resp
+
+@app.after_request
+def compress_response(resp):
+    # Registered last, so it runs first and the metrics/profile include it
+    if not COMPRESS_RESPONSES or resp.direct_passthrough:
+        return resp  # files
+    if resp.is_streamed:
+        # Streamed JSON is compressed chunk by chunk; SSE must not be buffered
+        compressible = resp.mimetype in COMPRESSIBLE_MIMES
+    else:
+        compressible = resp.mimetype.startswith("text/") or resp.mimetype in COMPRESSIBLE_MIMES
+    if not compressible:
+        return resp
+    resp.vary.add("Accept-Encoding")
+    if "Content-Encoding" in resp.headers or "no-transform" in resp.headers.get("Cache-Control", ""):
+        return resp
+    if resp.status_code in (204, 206, 304):
+        return resp
+    if not resp.is_streamed and (resp.content_length or 0) < COMPRESS_MIN_BYTES:
+        return resp
+    encoding = compression.negotiate(request.accept_encodings)
+    if encoding is None:
+        return resp
+    if resp.is_streamed:
+        resp.response = compression.compress_stream(resp.response, encoding)
+        resp.headers["Content-Encoding"] = encoding
+        metrics.inc("compressed_responses_total", encoding=encoding)
+        return resp
+    body = resp.get_data()
+    encoded = compression.compress(body, encoding)
+    resp.set_data(encoded)
+    resp.headers["Content-Encoding"] = encoding
+    # The bytes differ from the identity representation: like nginx, keep the
+    # validator usable for If-None-Match by downgrading it to a weak ETag
+    etag, weak = resp.get_etag()
+    if etag and not weak:
+        resp.set_etag(etag, weak=True)
+    metrics.inc("compressed_responses_total", encoding=encoding)
+    metrics.inc("compression_saved_bytes_total", len(body) - len(encoded), encoding=encoding)
+    return resp
+
+@app.cli.command("init-db")
+def init_db_command():
+    """Apply pending schema migrations."""
+    version = init_db()
+    click.echo(f"Database at schema version {version}: {DB_PATH}")
+
+# Queries on the request hot path; each must be answered from an index. The
+# statements are the constants the handlers execute, with sample parameters.
+HOT_QUERIES = [
+    (LIST_ID_BY_NAME_SQL, ("Inbox",)),
+    (NOTEPAD_ID_SQL, ()),
+    (LIST_TODOS_SQL, (1,)),
+    (FETCH_TODO_SQL, (1,)),
+    (LIST_RANKS_SQL, (1,)),
+    (RANK_IN_LIST_SQL, (1, 1)),
+    (NEXT_RANK_SQL, (1, 0, -1)),
+    (PREV_RANK_SQL, (1, 0, -1)),
+    (TOP_RANK_SQL, (1, -1)),
+    (DELETE_LIST_TODOS_SQL, (1,)),
+    (FILE_ID_BY_CHECKSUM_SQL, ("",)),
+    (f"{FILE_SELECT} {FILE_ORDER} LIMIT ?", (10,)),
+]
+
+def full_scans(db) -> list[tuple[str, str]]:
+    """(query, plan step) for every hot query whose plan scans a whole table."""
+    found = []
+    for sql, params in HOT_QUERIES:
+        for row in db.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+            detail = row[3]
+            # "SCAN (subquery-N)" walks an already-filtered result, not a table
+            if detail.startswith("SCAN ") and " USING " not in detail and "(" not in detail:
+                found.append((sql, detail))
+    return found
+
+@app.cli.command("check-query-plans")
+def check_query_plans_command():
+    """Fail if a hot query falls back to a full table scan."""
     init_db()
+    db = pool.acquire()
+    try:
+        scans = full_scans(db)
+    finally:
+        pool.release(db)
+    for sql, detail in scans:
+        click.echo(f"FULL SCAN: {detail}\n  {sql}", err=True)
+    if scans:
+        raise SystemExit(1)
+    click.echo(f"{len(HOT_QUERIES)} hot queries use indexes")
 
 # ------------------------
 # General Routes
@@ -224,17 +1029,151 @@ def ensure_db():
 def health():
     return jsonify({"status": "ok"})
 
+def workspace_revision(db) -> int:
+    return db.execute("SELECT revision FROM workspace WHERE id = 1").fetchone()[0]
+
+@app.get("/api/board")
+def board_snapshot():
+    """Visible lists, their todos and the notepad in one response.
+
+    The ETag is the workspace revision, so an unchanged board revalidates with
+    a 304 after a single-row lookup.
+    """
+    db = get_db()
+    db.execute("BEGIN")  # one read snapshot for the revision and the data
+    try:
+        revision = workspace_revision(db)
+        etag = f"board-{revision}"
+        # Weak match: compressed responses carry W/"board-N"
+        if request.if_none_match.contains_weak(etag):
+            resp = app.response_class(status=304)
+            resp.set_etag(etag)
+            return resp
+
+        lists = db.execute(
+            "SELECT id, name, position, color, created_at "
+            "FROM lists WHERE COALESCE(is_hidden, 0) = 0 "
+            "ORDER BY position, id"
+        ).fetchall()
+        notepad_id = fetch_list_id(db, "Notepad")
+        todos = {str(l["id"]): [] for l in lists}
+        notepad = []
+        for r in db.execute(f"{TODO_SELECT} ORDER BY list_id, rank ASC, id DESC"):
+            if r["list_id"] == notepad_id:
+                notepad.append(dict(r))
+            elif str(r["list_id"]) in todos:
+                todos[str(r["list_id"])].append(dict(r))
+    finally:
+        db.commit()
+
+    resp = jsonify({
+        "revision": revision,
+        "lists": [dict(l) for l in lists],
+        "todos": todos,
+        "notepad": notepad,
+    })
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+@app.get("/api/changes")
+def change_stream():
+    """Server-sent events for every write, resumable with Last-Event-ID.
+
+    Events are `change` with the JSON row from the `changes` table. A client
+    that fell further behind than the retained log gets `reset` and should
+    reload /api/board.
+    """
+    last = request.headers.get("Last-Event-ID") or request.args.get("since")
+    try:
+        last = int(last) if last is not None else change_feed.latest_id()
+    except ValueError:
+        return jsonify({"error": "Last-Event-ID must be an integer"}), 400
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if request.environ.get("taskon.async_changes"):
+        # asgi.py sends these headers, then streams change_feed.astream(last)
+        # on its event loop without holding one of its threads
+        request.environ["taskon.changes_after"] = last
+        return app.response_class(iter(()), mimetype="text/event-stream", headers=headers)
+    if sse_slots is not None and not sse_slots.acquire(blocking=False):
+        resp = jsonify({"error": "Too many change streams, retry later"})
+        resp.status_code = 503
+        resp.headers["Retry-After"] = "10"
+        return resp
+    resp = app.response_class(
+        change_feed.stream(last, SSE_KEEPALIVE_SECONDS),
+        mimetype="text/event-stream",
+        headers=headers,
+    )
+    if sse_slots is not None:
+        resp.call_on_close(sse_slots.release)
+    return resp
+
 # ------------------------
 # Todo Routes (General)
 # ------------------------
 @app.get("/api/todos")
 def list_todos():
+    """All todos, or a keyset page with ?limit=&cursor=&fields=&list_id=&done=."""
+    try:
+        limit, cursor, fields = page_args(TODO_FIELDS)
+        list_id = request.args.get("list_id", type=int)
+        done = request.args.get("done")
+        done = None if done is None else int(done in ("1", "true", "True"))
+        key = decode_cursor(cursor, (int, int, int)) if cursor else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     db = get_db()
-    rows = db.execute(
-    "SELECT id, title, done, created_at, list_id, position "
-    "FROM todos ORDER BY list_id, position ASC, created_at DESC"
-).fetchall()
-    return jsonify([dict(r) for r in rows])
+    if limit is None and list_id is None and done is None:
+        # Unbounded: stream rows as they are fetched instead of building the list
+        cursor = db.execute(f"{TODO_SELECT} ORDER BY list_id, rank ASC, id DESC")
+        return app.response_class(
+            stream_with_context(app.json.stream_array(cursor, fields)), mimetype=app.json.mimetype
+        )
+
+    where, params = [], []
+    if list_id is not None:
+        where.append("list_id = ?")
+        params.append(list_id)
+    if done is not None:
+        where.append("done = ?")
+        params.append(done)
+    if key:
+        where.append(
+            "(list_id > ? OR (list_id = ? AND (rank > ? OR (rank = ? AND id < ?))))"
+        )
+        params += [key[0], key[0], key[1], key[1], key[2]]
+    sql = "SELECT id, title, done, created_at, list_id, rank FROM todos"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY list_id, rank ASC, id DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+    if "position" in fields:
+        # Positions count every card of a list, whatever `done` filtered out:
+        # number the lists on this page in one window pass, then keep the page
+        sql = (
+            f"WITH page AS ({sql}) "
+            "SELECT * FROM ("
+            "  SELECT id, title, done, created_at, list_id, rank, "
+            "  ROW_NUMBER() OVER (PARTITION BY list_id ORDER BY rank ASC, id DESC) - 1 AS position"
+            "  FROM todos WHERE list_id IN (SELECT list_id FROM page)"
+            ") WHERE id IN (SELECT id FROM page) "
+            "ORDER BY list_id, rank ASC, id DESC"
+        )
+    rows = db.execute(sql, params).fetchall()
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last["list_id"], last["rank"], last["id"])
+
+    items = [{f: r[f] for f in fields} for r in rows]
+    return page_response(items, next_cursor)
 
 @app.post("/api/todos")
 def create_todo():
@@ -249,17 +1188,9 @@ def create_todo():
         ensure_default_lists_once(db)
         inbox_id = fetch_list_id(db, "Inbox")
 
-    db.execute("UPDATE todos SET position = position + 1 WHERE list_id = ?", (inbox_id,))
-    cur = db.execute(
-        "INSERT INTO todos (title, done, list_id, position) VALUES (?, ?, ?, 0)",
-        (title, 0, inbox_id),
-    )
+    todo_id = insert_todo(db, inbox_id, title)
     db.commit()
-    row = db.execute(
-        "SELECT id, title, done, created_at, list_id, position FROM todos WHERE id = ?",
-        (cur.lastrowid,),
-    ).fetchone()
-    return jsonify(dict(row)), 201
+    return jsonify(dict(fetch_todo(db, todo_id))), 201
 
 
 @app.patch("/api/todos/<int:todo_id>")
@@ -277,22 +1208,25 @@ def update_todo(todo_id):
         fields.append("done = ?")
         values.append(done_val)
 
+    db = get_db()
     if "list_id" in data and data.get("list_id") is not None:
+        new_list_id = int(data.get("list_id"))
         fields.append("list_id = ?")
-        values.append(int(data.get("list_id")))
+        values.append(new_list_id)
+        # Moving across lists lands the card at the top of the target list
+        current = db.execute("SELECT list_id FROM todos WHERE id = ?", (todo_id,)).fetchone()
+        if current and current["list_id"] != new_list_id:
+            fields.append("rank = ?")
+            values.append(rank_for_insert(db, new_list_id))
 
     if not fields:
         return jsonify({"error": "No fields to update"}), 400
 
     values.append(todo_id)
-    db = get_db()
     db.execute(f"UPDATE todos SET {', '.join(fields)} WHERE id = ?", values)
     db.commit()
 
-    row = db.execute(
-        "SELECT id, title, done, created_at, list_id FROM todos WHERE id = ?",
-        (todo_id,),
-    ).fetchone()
+    row = fetch_todo(db, todo_id)
     if not row:
         return jsonify({"error": "Not found"}), 404
     return jsonify(dict(row))
@@ -306,18 +1240,149 @@ def delete_todo(todo_id):
         return jsonify({"error": "Not found"}), 404
     return "", 204
 
+MAX_BATCH_OPS = 1000
+
+def _int_or_none(value):
+    return int(value) if value is not None else None
+
+def _done_value(val) -> int:
+    return 1 if val in (True, 1, "1", "true", "True") else 0
+
+def _missing_todos(db, ids: list[int]) -> list[int]:
+    found = set()
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        marks = ",".join("?" * len(chunk))
+        found.update(r[0] for r in db.execute(f"SELECT id FROM todos WHERE id IN ({marks})", chunk))
+    return [i for i in ids if i not in found]
+
+def _update_keys(op: dict) -> list[str]:
+    return sorted(k for k in ("title", "done") if k in op)
+
+class BatchOpError(Exception):
+    def __init__(self, index: int, message: str):
+        super().__init__(message)
+        self.index = index
+
+    @classmethod
+    def from_exception(cls, index: int, e: Exception) -> "BatchOpError":
+        if isinstance(e, KeyError):
+            return cls(index, f"Missing field: {e.args[0]}")
+        return cls(index, str(e))
+
+BATCH_OP_ERRORS = (LookupError, ValueError, TypeError, sqlite3.IntegrityError)
+
+def _run_batch(db, ops: list[dict]) -> list[dict]:
+    results = []
+    i = 0
+    while i < len(ops):
+        try:
+            i = _run_batch_op(db, ops, i, results)
+        except BATCH_OP_ERRORS as e:
+            raise BatchOpError.from_exception(i, e)
+    return results
+
+def _run_batch_op(db, ops: list[dict], i: int, results: list[dict]) -> int:
+    """Apply ops[i] (or a run of similar ops starting there); return the next index."""
+    op = ops[i]
+    kind = op.get("op")
+
+    if kind in ("delete", "update"):
+        # Consecutive deletes, or updates touching the same fields, go out as
+        # a single executemany
+        fields = _update_keys(op) if kind == "update" else []
+        j = i
+        while j < len(ops) and ops[j].get("op") == kind and (kind == "delete" or _update_keys(ops[j]) == fields):
+            j += 1
+        if kind == "update" and not fields:
+            raise ValueError("No fields to update")
+        # Checked op by op, so an error names the op within the run
+        ids, rows = [], []
+        for index, o in enumerate(ops[i:j], start=i):
+            try:
+                todo_id = int(o["id"])
+                vals = []
+                if "done" in fields:
+                    vals.append(_done_value(o["done"]))
+                if "title" in fields:
+                    title = (o["title"] or "").strip()
+                    if not title:
+                        raise ValueError("Title is required")
+                    vals.append(title)
+            except BATCH_OP_ERRORS as e:
+                raise BatchOpError.from_exception(index, e)
+            ids.append(todo_id)
+            rows.append((*vals, todo_id))
+        missing = _missing_todos(db, ids)
+        if missing:
+            raise BatchOpError(i + ids.index(missing[0]), f"Todo {missing[0]} not found")
+        if kind == "delete":
+            db.executemany("DELETE FROM todos WHERE id = ?", [(t,) for t in ids])
+        else:
+            sets = ", ".join(f"{k} = ?" for k in fields)
+            db.executemany(f"UPDATE todos SET {sets} WHERE id = ?", rows)
+        results += [{"op": kind, "id": t} for t in ids]
+        return j
+
+    if kind == "create":
+        title = (op.get("title") or "").strip()
+        if not title:
+            raise ValueError("Title is required")
+        todo_id = insert_todo(db, int(op["list_id"]), title, _int_or_none(op.get("after_id")))
+    elif kind == "move":
+        todo_id = int(op["id"])
+        row = db.execute("SELECT list_id FROM todos WHERE id = ?", (todo_id,)).fetchone()
+        if not row:
+            raise LookupError(f"Todo {todo_id} not found")
+        target = _int_or_none(op.get("list_id")) or row["list_id"]
+        rank = rank_for_insert(
+            db, target, _int_or_none(op.get("after_id")),
+            _int_or_none(op.get("before_id")), exclude_id=todo_id,
+        )
+        db.execute("UPDATE todos SET list_id = ?, rank = ? WHERE id = ?", (target, rank, todo_id))
+    else:
+        raise ValueError(f"Unknown op: {kind!r}")
+    results.append({"op": kind, "id": todo_id})
+    return i + 1
+
+@app.post("/api/batch")
+def batch_todos():
+    """Run create/update/delete/move todo ops in order, in one transaction.
+
+    Either every op applies or none does; the error names the failing op.
+    """
+    data = request.get_json(force=True) or {}
+    ops = data.get("ops")
+    if not isinstance(ops, list) or not all(isinstance(o, dict) for o in ops):
+        return jsonify({"error": "ops must be an array of objects"}), 400
+    if len(ops) > MAX_BATCH_OPS:
+        return jsonify({"error": f"At most {MAX_BATCH_OPS} ops per batch"}), 400
+
+    db = get_db()
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        results = _run_batch(db, ops)
+        db.commit()
+    except BatchOpError as e:
+        db.rollback()
+        return jsonify({"ok": False, "error": str(e), "index": e.index}), 400
+    except Exception:
+        db.rollback()
+        raise
+    return jsonify({"ok": True, "results": results})
+
 # ------------------------
 # List Routes
 # ------------------------
 @app.get("/api/lists")
 def list_lists():
-    db = get_db()
-    rows = db.execute(
-        "SELECT id, name, position, color, created_at "
-        "FROM lists WHERE COALESCE(is_hidden, 0) = 0 "
-        "ORDER BY position, id"
-    ).fetchall()
-    return jsonify([dict(r) for r in rows])
+    def build():
+        return app.json.encode_rows(get_db().execute(
+            "SELECT id, name, position, color, created_at "
+            "FROM lists WHERE COALESCE(is_hidden, 0) = 0 "
+            "ORDER BY position, id"
+        ))
+    return cached_json("lists", build)
 
 
 @app.post("/api/lists")
@@ -379,7 +1444,7 @@ def update_list(list_id):
 @app.delete("/api/lists/<int:list_id>")
 def delete_list(list_id):
     db = get_db()
-    db.execute("DELETE FROM todos WHERE list_id = ?", (list_id,))
+    db.execute(DELETE_LIST_TODOS_SQL, (list_id,))
     cur = db.execute("DELETE FROM lists WHERE id = ?", (list_id,))
     db.commit()
     if cur.rowcount == 0:
@@ -391,13 +1456,10 @@ def delete_list(list_id):
 # ------------------------
 @app.get("/api/lists/<int:list_id>/todos")
 def list_todos_in_list(list_id):
-    db = get_db()
-    rows = db.execute(
-        "SELECT id, title, done, created_at, list_id, position "
-        "FROM todos WHERE list_id = ? ORDER BY position ASC, created_at DESC",
-        (list_id,),
-    ).fetchall()
-    return jsonify([dict(r) for r in rows])
+    return cached_json(f"todos:{list_id}", lambda: list_todos_json(get_db(), list_id))
+
+def list_todos_json(db, list_id: int) -> bytes:
+    return app.json.encode_rows(db.execute(LIST_TODOS_SQL, (list_id,)))
 
 @app.post("/api/lists/<int:list_id>/todos")
 def create_todo_for_list(list_id):
@@ -406,18 +1468,19 @@ def create_todo_for_list(list_id):
     if not title:
         return jsonify({"error": "Title is required"}), 400
 
+    after_id = data.get("after_id")
+    try:
+        after_id = int(after_id) if after_id is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "after_id must be an integer"}), 400
+
     db = get_db()
-    db.execute("UPDATE todos SET position = position + 1 WHERE list_id = ?", (list_id,))
-    cur = db.execute(
-        "INSERT INTO todos (title, done, list_id, position) VALUES (?, ?, ?, 0)",
-        (title, 0, list_id),
-    )
+    try:
+        todo_id = insert_todo(db, list_id, title, after_id)
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 400
     db.commit()
-    row = db.execute(
-        "SELECT id, title, done, created_at, list_id, position FROM todos WHERE id = ?",
-        (cur.lastrowid,),
-    ).fetchone()
-    return jsonify(dict(row)), 201
+    return jsonify(dict(fetch_todo(db, todo_id))), 201
 
 
 @app.post("/api/lists/<int:list_id>/todos/reorder")
@@ -432,20 +1495,66 @@ def reorder_todos_in_list(list_id: int):
         return jsonify({"error": "order must contain integers"}), 400
 
     db = get_db()
-    rows = db.execute("SELECT id FROM todos WHERE list_id = ?", (list_id,)).fetchall()
-    existing_ids = [int(r["id"]) for r in rows]
+    rows = db.execute(LIST_RANKS_SQL, (list_id,)).fetchall()
+    ranks = {int(r["id"]): r["rank"] for r in rows}
 
     # Suodata payloadista pois vieraiden listojen ID:t, lisää puuttuvat perään
-    filtered = [i for i in payload_ids if i in existing_ids]
-    rest = [i for i in existing_ids if i not in filtered]
-    final = filtered + rest
-
-    for pos, todo_id in enumerate(final):
-        db.execute("UPDATE todos SET position = ? WHERE id = ?", (pos, todo_id))
+    filtered = list(dict.fromkeys(i for i in payload_ids if i in ranks))
+    seen = set(filtered)
+    final = filtered + [i for i in ranks if i not in seen]
+
+    # Kirjoita vain rivit joiden rank oikeasti muuttuu
+    db.executemany(
+        "UPDATE todos SET rank = ? WHERE id = ?",
+        [(pos * RANK_GAP, todo_id) for pos, todo_id in enumerate(final)
+         if ranks[todo_id] != pos * RANK_GAP],
+    )
     db.commit()
     return jsonify({"ok": True})
 
 
+@app.post("/api/todos/<int:todo_id>/move")
+def move_todo(todo_id: int):
+    """Move one card after/before a neighbour, optionally into another list."""
+    data = request.get_json(force=True) or {}
+    try:
+        list_id = int(data["list_id"]) if data.get("list_id") is not None else None
+        after_id = int(data["after_id"]) if data.get("after_id") is not None else None
+        before_id = int(data["before_id"]) if data.get("before_id") is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "list_id, after_id and before_id must be integers"}), 400
+    if after_id is not None and before_id is not None:
+        return jsonify({"error": "Give either after_id or before_id, not both"}), 400
+    if todo_id in (after_id, before_id):
+        return jsonify({"error": "A todo cannot be moved relative to itself"}), 400
+
+    db = get_db()
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        row = db.execute("SELECT list_id FROM todos WHERE id = ?", (todo_id,)).fetchone()
+        if not row:
+            db.rollback()
+            return jsonify({"error": "Not found"}), 404
+        target = list_id if list_id is not None else row["list_id"]
+        if db.execute("SELECT 1 FROM lists WHERE id = ?", (target,)).fetchone() is None:
+            db.rollback()
+            return jsonify({"error": "List not found"}), 404
+
+        rank = rank_for_insert(db, target, after_id, before_id, exclude_id=todo_id)
+        db.execute(
+            "UPDATE todos SET list_id = ?, rank = ? WHERE id = ?", (target, rank, todo_id)
+        )
+        db.commit()
+    except LookupError as e:
+        db.rollback()
+        return jsonify({"error": str(e)}), 400
+    except Exception:
+        db.rollback()
+        raise
+
+    return jsonify(dict(fetch_todo(db, todo_id)))
+
+
 
 # ------------------------
 # File Routes
@@ -459,91 +1568,422 @@ def upload_file():
     if not file or not file.filename.strip():
         return jsonify({"error": "Invalid filename"}), 400
 
-    safe_name = secure_filename(file.filename)
-    ext = os.path.splitext(safe_name)[1].lower()
-    if ext not in ALLOWED_EXTS:
-        return jsonify({"error": f"Extension not allowed: {ext}"}), 415
+    safe_name, mime, error = _check_upload_name(file.filename, file.mimetype)
+    if error:
+        return error
 
-    buf = file.read()
-    if not buf:
+    # Never hold the whole upload in memory: stream it to disk in chunks
+    tmp_path, checksum, size = _stream_to_temp(file.stream, UPLOAD_DIR)
+    if size == 0:
+        tmp_path.unlink()
         return jsonify({"error": "Empty file"}), 400
 
-    checksum = _sha256_bytes(buf)
-    mime = _detect_mime(safe_name, file.mimetype)
-    if mime not in ALLOWED_MIME:
-        return jsonify({"error": f"Unsupported MIME: {mime}"}), 415
-
-    size = len(buf)
-    disk_name = f"{checksum[:16]}_{safe_name}"
-    disk_path = UPLOAD_DIR / disk_name
-
-    if not disk_path.exists():
-        with open(disk_path, "wb") as out:
-            out.write(buf)
-
+    disk_path = _store_blob(tmp_path, checksum)
     db = get_db()
-    try:
-        cur = db.execute(
-            "INSERT INTO files (name, mime, size, path, checksum) VALUES (?, ?, ?, ?, ?)",
-            (safe_name, mime, size, str(disk_path), checksum),
-        )
-        db.commit()
-        file_id = cur.lastrowid
-    except sqlite3.IntegrityError:
-        row = db.execute("SELECT id FROM files WHERE checksum=?", (checksum,)).fetchone()
-        file_id = int(row["id"]) if row else None
+    file_id, created = _register_file(db, safe_name, mime, size, disk_path, checksum)
+    if created:
+        _enqueue_processing(db, file_id, mime)
+    return _uploaded_file_response(db, file_id)
+
+@app.get("/api/files/by-checksum/<checksum>")
+def probe_file(checksum: str):
+    """Lets a client skip the upload when the server already has these bytes."""
+    checksum = checksum.lower()
+    if not SHA256_RE.fullmatch(checksum):
+        return jsonify({"error": "checksum must be a hex SHA-256"}), 400
+    row = get_db().execute(
+        "SELECT id, name, mime, size, checksum FROM files WHERE checksum = ?", (checksum,)
+    ).fetchone()
+    if not row:
+        return jsonify({"error": "Not found"}), 404
+    return jsonify({"ok": True, **dict(row)})
 
-    return jsonify({
-        "ok": True, "id": file_id, "name": safe_name, "mime": mime, "size": size, "checksum": checksum
-    }), 201
+@app.get("/api/thumbnails/<checksum>/<int:size>")
+def thumbnail(checksum: str, size: int):
+    """JPEG thumbnail (or PDF first page) no larger than the `size` bucket."""
+    row = get_db().execute("SELECT mime, path FROM files WHERE checksum = ?", (checksum,)).fetchone()
+    if not row or not derivatives.supports(row["mime"]):
+        return jsonify({"error": "Not found"}), 404
+    size = derivatives.bucket(size)
+    # Usually rendered at upload; evicted or older files are rendered on demand
+    path = derivatives.get(checksum, size) or derivatives.generate(Path(row["path"]), row["mime"], checksum, size)
+    if path is None:
+        return jsonify({"error": "Preview unavailable"}), 404
+    # The URL names the blob's content, so the bytes behind it never change
+    resp = send_file(path, mimetype="image/jpeg", conditional=True, etag=f"{checksum}-{size}", max_age=31536000)
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    return resp
 
 @app.get("/api/files")
 def list_files():
-    rows = get_db().execute(
-        "SELECT id, name, mime, size, checksum, created_at FROM files ORDER BY created_at DESC"
-    ).fetchall()
-    return jsonify([dict(r) for r in rows])
+    """All files, or a keyset page with ?limit=&cursor=&fields=."""
+    try:
+        limit, cursor, fields = page_args(FILE_FIELDS)
+        key = decode_cursor(cursor, (str, int)) if cursor else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if limit is None and list(fields) == list(FILE_FIELDS):
+        return cached_json("files", lambda: app.json.encode_rows(
+            get_db().execute(f"{FILE_SELECT} {FILE_ORDER}")
+        ))
+
+    sql = FILE_SELECT
+    params = []
+    if key:
+        sql += " WHERE created_at < ? OR (created_at = ? AND id < ?)"
+        params += [key[0], key[0], key[1]]
+    sql += f" {FILE_ORDER}"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+    rows = get_db().execute(sql, params).fetchall()
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return page_response([{f: r[f] for f in fields} for r in rows], next_cursor)
 
 @app.get("/api/files/<int:file_id>")
 def download_file(file_id: int):
     row = get_db().execute(
-        "SELECT name, mime, size, path, checksum FROM files WHERE id=?", (file_id,)
+        "SELECT name, mime, size, path, checksum, encoding FROM files WHERE id=?", (file_id,)
     ).fetchone()
     if not row:
         return jsonify({"error": "Not found"}), 404
 
     etag = row["checksum"]
-    if request.headers.get("If-None-Match") == etag:
-        return ("", 304)
-
-    resp = send_file(
-        row["path"],
-        mimetype=row["mime"],
-        as_attachment=True,
-        download_name=row["name"],
-        conditional=True,
-    )
-    resp.headers["ETag"] = etag
-    resp.headers["Content-Length"] = str(row["size"])
-    return resp
+    if row["encoding"] == "gzip":
+        return _download_gzip_blob(row)
+    if FILE_SERVE_MODE == "direct":
+        # send_file answers If-None-Match / Range / If-Range against the checksum ETag
+        return send_file(
+            row["path"],
+            mimetype=row["mime"],
+            as_attachment=True,
+            download_name=row["name"],
+            conditional=True,
+            etag=etag,
+        )
+
+    # Offloaded: the front-end server streams the bytes and handles ranges itself
+    resp = app.response_class(mimetype=row["mime"])
+    resp.headers.set("Content-Disposition", "attachment", filename=row["name"])
+    resp.set_etag(etag)
+    if FILE_SERVE_MODE == "x-accel":
+        rel = Path(row["path"]).relative_to(UPLOAD_DIR).as_posix()
+        resp.headers["X-Accel-Redirect"] = X_ACCEL_PREFIX + rel
+    else:
+        resp.headers["X-Sendfile"] = row["path"]
+    return resp.make_conditional(request)
+
+def _download_gzip_blob(row):
+    """Serve a blob stored gzipped, from the app in every FILE_SERVE_MODE."""
+    if request.accept_encodings["gzip"]:
+        # Pass the stored bytes through; a different representation needs its own ETag
+        resp = send_file(
+            row["path"],
+            mimetype=row["mime"],
+            as_attachment=True,
+            download_name=row["name"],
+            conditional=True,
+            etag=f"{row['checksum']}.gz",
+        )
+        resp.headers["Content-Encoding"] = "gzip"
+        resp.vary.add("Accept-Encoding")
+        return resp
+
+    def decompress():
+        with gzip.open(row["path"], "rb") as f:
+            while chunk := f.read(UPLOAD_CHUNK_SIZE):
+                yield chunk
+
+    # Decompressed on the fly: no Range support, but the length is known
+    resp = app.response_class(decompress(), mimetype=row["mime"], direct_passthrough=True)
+    resp.headers.set("Content-Disposition", "attachment", filename=row["name"])
+    resp.content_length = row["size"]
+    resp.set_etag(row["checksum"])
+    resp.vary.add("Accept-Encoding")
+    return resp.make_conditional(request)
 
 @app.delete("/api/files/<int:file_id>")
 def delete_file(file_id: int):
     db = get_db()
-    row = db.execute("SELECT path FROM files WHERE id=?", (file_id,)).fetchone()
+    row = db.execute("SELECT path, checksum FROM files WHERE id=?", (file_id,)).fetchone()
     if not row:
         return jsonify({"error": "Not found"}), 404
 
-    path = row["path"]
     db.execute("DELETE FROM files WHERE id=?", (file_id,))
+    # Committed together: the blob is removed (and retried on failure) by a job
+    jobs.enqueue("delete_blob", {"checksum": row["checksum"], "path": row["path"]}, db=db)
+    db.commit()
+    jobs.notify()
+    return "", 204
+
+# ------------------------
+# Upload Session Routes
+# ------------------------
+# Large files are sent as numbered parts (PUT, any order, retryable) and
+# assembled on completion, so a dropped connection only costs one part and the
+# total size is not limited by MAX_CONTENT_LENGTH.
+def fetch_upload_session(db, session_id: str):
+    return db.execute("SELECT * FROM upload_sessions WHERE id = ?", (session_id,)).fetchone()
+
+def _session_parts(session_id: str) -> dict[int, Path]:
+    parts = {}
+    for path in (SESSION_DIR / session_id).glob("[0-9]*.part"):
+        parts[int(path.stem)] = path
+    return parts
+
+def _drop_session(db, session_id: str):
+    db.execute("DELETE FROM upload_sessions WHERE id = ?", (session_id,))
+    db.commit()
+    shutil.rmtree(SESSION_DIR / session_id, ignore_errors=True)
+
+@app.post("/api/uploads")
+def create_upload_session():
+    data = request.get_json(force=True) or {}
+    name = (data.get("name") or "").strip()
+    if not name:
+        return jsonify({"error": "Invalid filename"}), 400
+    safe_name, mime, error = _check_upload_name(name, data.get("mime"))
+    if error:
+        return error
+
+    checksum = (data.get("checksum") or "").lower() or None
+    size = data.get("size")
+    try:
+        size = int(size) if size is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "size must be an integer"}), 400
+
+    session_id = uuid.uuid4().hex
+    db = get_db()
+    db.execute(
+        "INSERT INTO upload_sessions (id, name, mime, size, checksum) VALUES (?, ?, ?, ?, ?)",
+        (session_id, safe_name, mime, size, checksum),
+    )
     db.commit()
+    (SESSION_DIR / session_id).mkdir(parents=True, exist_ok=True)
+    return jsonify({
+        "id": session_id, "name": safe_name, "mime": mime,
+        "part_size": UPLOAD_PART_SIZE, "max_parts": MAX_UPLOAD_PARTS,
+    }), 201
+
+@app.get("/api/uploads/<session_id>")
+def get_upload_session(session_id: str):
+    row = fetch_upload_session(get_db(), session_id)
+    if not row:
+        return jsonify({"error": "Not found"}), 404
+    parts = _session_parts(session_id)
+    return jsonify({
+        **dict(row),
+        "parts": [{"number": n, "size": p.stat().st_size} for n, p in sorted(parts.items())],
+    })
+
+@app.put("/api/uploads/<session_id>/parts/<int:number>")
+def put_upload_part(session_id: str, number: int):
+    if not fetch_upload_session(get_db(), session_id):
+        return jsonify({"error": "Not found"}), 404
+    if not 1 <= number <= MAX_UPLOAD_PARTS:
+        return jsonify({"error": f"Part number must be 1..{MAX_UPLOAD_PARTS}"}), 400
+
+    part_dir = SESSION_DIR / session_id
+    tmp_path, checksum, size = _stream_to_temp(request.stream, part_dir)
+    expected = (request.headers.get("X-Part-Checksum") or "").lower()
+    if expected and expected != checksum:
+        tmp_path.unlink()
+        return jsonify({"error": "Part checksum mismatch", "checksum": checksum}), 400
+    if size == 0:
+        tmp_path.unlink()
+        return jsonify({"error": "Empty part"}), 400
+
+    # Re-sending a part simply replaces it
+    os.replace(tmp_path, part_dir / f"{number:06d}.part")
+    return jsonify({"number": number, "size": size, "checksum": checksum})
+
+@app.post("/api/uploads/<session_id>/complete")
+def complete_upload_session(session_id: str):
+    db = get_db()
+    session = fetch_upload_session(db, session_id)
+    if not session:
+        return jsonify({"error": "Not found"}), 404
+    parts = _session_parts(session_id)
+    if not parts:
+        return jsonify({"error": "No parts uploaded"}), 400
+    missing = sorted(set(range(1, max(parts) + 1)) - set(parts))
+    if missing:
+        return jsonify({"error": "Missing parts", "missing": missing}), 400
+
+    # Concatenate parts through the same chunked copy, hashing the whole file
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_name = tempfile.mkstemp(dir=UPLOAD_DIR, prefix=".upload-", suffix=".tmp")
+    tmp_path = Path(tmp_name)
     try:
-        if os.path.exists(path):
-            os.remove(path)
-    except OSError:
-        pass
+        with os.fdopen(fd, "wb") as out:
+            for n in sorted(parts):
+                with open(parts[n], "rb") as part:
+                    while chunk := part.read(UPLOAD_CHUNK_SIZE):
+                        digest.update(chunk)
+                        size += len(chunk)
+                        out.write(chunk)
+    except BaseException:
+        tmp_path.unlink()
+        raise
+    checksum = digest.hexdigest()
+
+    if session["size"] is not None and session["size"] != size:
+        tmp_path.unlink()
+        return jsonify({"error": "Size mismatch", "size": size}), 400
+    if session["checksum"] and session["checksum"] != checksum:
+        tmp_path.unlink()
+        return jsonify({"error": "Checksum mismatch", "checksum": checksum}), 400
+
+    existing = db.execute(FILE_ID_BY_CHECKSUM_SQL, (checksum,)).fetchone()
+    if existing:
+        tmp_path.unlink()
+        file_id = int(existing["id"])
+    else:
+        disk_path = _store_blob(tmp_path, checksum)
+        file_id, created = _register_file(db, session["name"], session["mime"], size, disk_path, checksum)
+        if created:
+            _enqueue_processing(db, file_id, session["mime"])
+    _drop_session(db, session_id)
+    return _uploaded_file_response(db, file_id)
+
+@app.delete("/api/uploads/<session_id>")
+def abort_upload_session(session_id: str):
+    db = get_db()
+    if not fetch_upload_session(db, session_id):
+        return jsonify({"error": "Not found"}), 404
+    _drop_session(db, session_id)
     return "", 204
 
+# ------------------------
+# Background Jobs
+# ------------------------
+def _job_file(file_id: int):
+    db = pool.acquire()
+    try:
+        return db.execute(
+            "SELECT path, mime, checksum, encoding FROM files WHERE id = ?", (file_id,)
+        ).fetchone()
+    finally:
+        pool.release(db)
+
+@jobs.handler("verify_checksum")
+def verify_checksum_job(payload: dict):
+    """Re-hash a stored blob; a mismatch fails the job (see /api/debug/jobs)."""
+    row = _job_file(payload["file_id"])
+    if row is None:
+        return  # deleted since
+    digest = hashlib.sha256()
+    opener = gzip.open if row["encoding"] == "gzip" else open
+    with opener(row["path"], "rb") as f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    if digest.hexdigest() != row["checksum"]:
+        raise ValueError(f"{row['path']} does not match checksum {row['checksum']}")
+
+@jobs.handler("derivatives")
+def derivatives_job(payload: dict):
+    row = _job_file(payload["file_id"])
+    if row is not None:
+        derivatives.generate_all(Path(row["path"]), row["mime"], row["checksum"])
+
+@jobs.handler("compress_blob")
+def compress_blob_job(payload: dict):
+    """Replace a file's blob with a gzipped copy if that saves enough space."""
+    row = _job_file(payload["file_id"])
+    if row is None or row["encoding"] is not None:
+        return
+    source, target = Path(row["path"]), compressed_blob_path(row["checksum"])
+    if not target.exists() and not _gzip_blob(source, target):
+        return  # e.g. .docx/.xlsx, which are already deflated zip archives
+    db = pool.acquire()
+    try:
+        db.execute(
+            "UPDATE files SET path = ?, encoding = 'gzip' WHERE id = ? AND encoding IS NULL",
+            (str(target), payload["file_id"]),
+        )
+        db.commit()
+    finally:
+        pool.release(db)
+    # The plain blob is unreferenced now; gc removes it
+
+def _gzip_blob(source: Path, target: Path) -> bool:
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=".gzip-", suffix=".tmp")
+    try:
+        with open(source, "rb") as src, os.fdopen(fd, "wb") as raw, \
+                gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) as out:
+            shutil.copyfileobj(src, out, UPLOAD_CHUNK_SIZE)
+        keep = os.path.getsize(tmp_name) <= source.stat().st_size * (1 - STORE_COMPRESS_MIN_SAVING)
+        if keep:
+            os.replace(tmp_name, target)
+        return keep
+    finally:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+
+@jobs.handler("delete_blob")
+def delete_blob_job(payload: dict):
+    db = pool.acquire()
+    try:
+        # The same bytes may have been uploaded again since the delete
+        if db.execute("SELECT 1 FROM files WHERE checksum = ?", (payload["checksum"],)).fetchone():
+            return
+    finally:
+        pool.release(db)
+    Path(payload["path"]).unlink(missing_ok=True)  # other OSErrors fail the job and retry
+    derivatives.discard(payload["checksum"])
+
+@jobs.handler("gc")
+def gc_job(_payload: dict):
+    """Mark-and-sweep the upload folders against the files / upload_sessions tables."""
+    db = pool.acquire()
+    try:
+        files = db.execute("SELECT path, checksum FROM files").fetchall()
+        stale = db.execute(
+            "SELECT id FROM upload_sessions WHERE created_at < datetime('now', ?)",
+            (f"-{UPLOAD_SESSION_TTL} seconds",),
+        ).fetchall()
+        for session in stale:
+            _drop_session(db, session["id"])
+        sessions = {r["id"] for r in db.execute("SELECT id FROM upload_sessions")}
+    finally:
+        pool.release(db)
+
+    # Only files older than the grace period: anything newer may be an upload
+    # between writing its blob and inserting its row
+    cutoff = time.time() - GC_GRACE_SECONDS
+    live = {Path(r["path"]).resolve() for r in files}
+    removed = 0
+    for path in UPLOAD_DIR.rglob("*"):
+        if path.is_file() and path.resolve() not in live and path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+            removed += 1
+    for path in SESSION_DIR.iterdir():
+        if path.name not in sessions and path.stat().st_mtime < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    removed += derivatives.sweep({r["checksum"] for r in files})
+    missing = [r["path"] for r in files if not os.path.exists(r["path"])]
+    for path in missing:
+        app.logger.warning("gc: blob missing for files row: %s", path)
+    jobs.prune(older_than=7 * 24 * 3600)
+    app.logger.info("gc: removed %d unreferenced files, %d stale sessions, %d missing blobs",
+                    removed, len(stale), len(missing))
+
+@app.cli.command("run-jobs")
+def run_jobs_command():
+    """Run background job workers in the foreground (for JOB_WORKERS=0 web processes)."""
+    init_db()
+    click.echo(f"Running jobs from {DB_PATH}")
+    jobs.work()
+
 # ------------------------
 # Notepad Routes
 # ------------------------
@@ -551,12 +1991,8 @@ def delete_file(file_id: int):
 def notepad_list():
     db = get_db()
     notepad_id = get_or_create_notepad_id(db)
-    rows = db.execute(
-        "SELECT id, title, done, created_at, list_id, position "
-        "FROM todos WHERE list_id = ? ORDER BY position ASC, created_at DESC",
-        (notepad_id,),
-    ).fetchall()
-    return jsonify([dict(r) for r in rows])
+    # Same payload as /api/lists/<notepad_id>/todos, so they share a cache entry
+    return cached_json(f"todos:{notepad_id}", lambda: list_todos_json(db, notepad_id))
 
 @app.post("/api/notepad")
 def notepad_create():
@@ -567,19 +2003,432 @@ def notepad_create():
     db = get_db()
     notepad_id = get_or_create_notepad_id(db)
 
-    db.execute("UPDATE todos SET position = position + 1 WHERE list_id = ?", (notepad_id,))
-    cur = db.execute(
-        "INSERT INTO todos (title, done, list_id, position) VALUES (?, ?, ?, 0)",
-        (title, 0, notepad_id),
-    )
+    todo_id = insert_todo(db, notepad_id, title)
     db.commit()
-    row = db.execute(
-        "SELECT id, title, done, created_at, list_id, position FROM todos WHERE id=?",
-        (cur.lastrowid,),
-    ).fetchone()
-    return jsonify(dict(row)), 201
+    return jsonify(dict(fetch_todo(db, todo_id))), 201
+
 
+# ------------------------
+# Search Routes
+# ------------------------
+SEARCH_TERM = re.compile(r"\w+", re.UNICODE)
+# bm25 is computed for every match, which dominates broad prefix queries on
+# large workspaces. Unfiltered searches rank only the newest matches; once
+# those are paged through, the older ones follow unranked (score null), newest
+# first, and the responses say so with an X-Search-Truncated header.
+SEARCH_RANK_WINDOW = 1000
+
+def fts_query(text: str) -> str | None:
+    """Turn free text into an FTS5 query: every word is a quoted prefix term, all must match."""
+    terms = SEARCH_TERM.findall(text)
+    return " ".join(f'"{t}"*' for t in terms) or None
+
+def _rank_floor(db, fts: str, match: str) -> int:
+    """Smallest rowid among the newest SEARCH_RANK_WINDOW matches, or 0 if no more match."""
+    rows = db.execute(
+        f"SELECT rowid FROM {fts} WHERE {fts} MATCH ? ORDER BY rowid DESC LIMIT 2 OFFSET ?",
+        (match, SEARCH_RANK_WINDOW - 1),
+    ).fetchall()
+    return rows[0][0] if len(rows) == 2 else 0
+
+def _search_sql(kind, list_id, done, match, floors, ranked: bool):
+    """UNION of the todo/file match queries: the ranked window (rowid >= floor) or the rest."""
+    bound = ">=" if ranked else "<"
+    score = "rank" if ranked else "NULL"
+    parts, params = [], []
+    if kind != "file":
+        where, extra = "", []
+        if list_id is not None:
+            where += " AND t.list_id = ?"
+            extra.append(list_id)
+        if done is not None:
+            where += " AND t.done = ?"
+            extra.append(done)
+        parts.append(f"""
+          SELECT 'todo' AS type, t.id, t.title AS text, t.done, t.list_id, t.created_at, m.score
+          FROM (SELECT rowid, {score} AS score FROM todos_fts WHERE todos_fts MATCH ? AND rowid {bound} ?) m
+          JOIN todos t ON t.id = m.rowid WHERE 1{where}
+        """)
+        params += [match, floors[0], *extra]
+    # Files belong to no list, so list/done filters limit results to todos
+    if kind != "todo" and list_id is None and done is None:
+        parts.append(f"""
+          SELECT 'file' AS type, f.id, f.name AS text, NULL, NULL, f.created_at, m.score
+          FROM (SELECT rowid, {score} AS score FROM files_fts WHERE files_fts MATCH ? AND rowid {bound} ?) m
+          JOIN files f ON f.id = m.rowid
+        """)
+        params += [match, floors[1]]
+    return "SELECT * FROM (" + " UNION ALL ".join(parts) + ")", params
+
+@app.get("/api/search")
+def search():
+    """Ranked todo (incl. notepad) and file matches for ?q=, with ?type=&list_id=&done=&limit=&cursor=."""
+    match = fts_query(request.args.get("q", ""))
+    if match is None:
+        return jsonify({"error": "q is required"}), 400
+    kind = request.args.get("type")
+    if kind not in (None, "todo", "file"):
+        return jsonify({"error": "type must be todo or file"}), 400
+    list_id = request.args.get("list_id", type=int)
+    done = request.args.get("done")
+    done = None if done is None else int(done in ("1", "true", "True"))
+    try:
+        limit = max(1, min(int(request.args.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+        cursor = request.args.get("cursor")
+        key = decode_cursor(cursor, ((int, float, type(None)), str, int, int, int)) if cursor else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # bm25 scores are negative; lower is a better match. (score, type, id) is
+    # a total order, so it doubles as the keyset cursor. The rank floors are
+    # taken on the first page and carried in the cursor, so every page of a
+    # query ranks the same window even while cards are added. Matches below
+    # the floors come after the window ordered by (type, id DESC); their
+    # cursors have a null score.
+    windowed = list_id is None and done is None
+    if kind == "file" and not windowed:
+        return page_response([], None)
+    db = get_db()
+    if key:
+        floors = (key[3], key[4])
+    else:
+        floors = (
+            _rank_floor(db, "todos_fts", match) if windowed and kind != "file" else 0,
+            _rank_floor(db, "files_fts", match) if windowed and kind != "todo" else 0,
+        )
+    in_window = key is None or key[0] is not None
+
+    rows = []
+    if in_window:
+        sql, params = _search_sql(kind, list_id, done, match, floors, ranked=True)
+        if key:
+            sql += " WHERE score > ? OR (score = ? AND (type > ? OR (type = ? AND id > ?)))"
+            params += [key[0], key[0], key[1], key[1], key[2]]
+        sql += " ORDER BY score, type, id LIMIT ?"
+        params.append(limit + 1)
+        rows = db.execute(sql, params).fetchall()
+    if len(rows) <= limit and any(floors):
+        # The ranked window is used up: continue with the older matches
+        sql, params = _search_sql(kind, list_id, done, match, floors, ranked=False)
+        if not in_window:
+            sql += " WHERE type > ? OR (type = ? AND id < ?)"
+            params += [key[1], key[1], key[2]]
+        sql += " ORDER BY type, id DESC LIMIT ?"
+        params.append(limit + 1 - len(rows))
+        rows += db.execute(sql, params).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last["score"], last["type"], last["id"], *floors)
+
+    items = []
+    for r in rows:
+        if r["type"] == "todo":
+            item = {"type": "todo", "id": r["id"], "title": r["text"], "done": r["done"],
+                    "list_id": r["list_id"], "created_at": r["created_at"]}
+        else:
+            item = {"type": "file", "id": r["id"], "name": r["text"], "created_at": r["created_at"]}
+        item["score"] = r["score"]
+        items.append(item)
+    resp = page_response(items, next_cursor)
+    if any(floors):
+        resp.headers["X-Search-Truncated"] = "1"  # older matches are listed unranked
+    return resp
+
+# ------------------------
+# Export / Import
+# ------------------------
+# One NDJSON record per line: a "meta" header, then every list, todo and file
+# (metadata only). ?blobs=1 wraps it in a tar with the file contents under
+# blobs/<sha256>, stored ahead of workspace.ndjson so an import can register
+# files as it reads their records.
+EXPORT_FORMAT_VERSION = 1
+EXPORT_QUERIES = (
+    "SELECT 'list' AS type, id, name, position, color, is_hidden, created_at FROM lists ORDER BY id",
+    "SELECT 'todo' AS type, id, list_id, title, done, rank, created_at FROM todos ORDER BY id",
+    "SELECT 'file' AS type, id, name, mime, size, checksum, created_at FROM files ORDER BY id",
+)
+IMPORT_BATCH_ROWS = 5000
+MAX_IMPORT_BYTES = int(os.getenv("MAX_IMPORT_BYTES", str(20 * 1024 ** 3)))
+TAR_BLOCK = 512
+TAR_RECORD = 20 * TAR_BLOCK
+
+def _export_records(db):
+    meta = {"type": "meta", "format": "taskon", "version": EXPORT_FORMAT_VERSION,
+            "exported_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+    yield app.json.dumps_bytes(meta) + b"\n"
+    for sql in EXPORT_QUERIES:
+        yield from app.json.stream_ndjson(db.execute(sql), batch_size=1000)
+
+def _tar_member(name: str, size: int, chunks):
+    info = tarfile.TarInfo(name)
+    info.size, info.mtime, info.mode = size, int(time.time()), 0o644
+    yield info.tobuf(tarfile.PAX_FORMAT)
+    for chunk in chunks:
+        yield chunk
+    yield b"\0" * (-size % TAR_BLOCK)
+
+def _read_chunks(f):
+    with f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            yield chunk
+
+def _export_tar(db):
+    written = 0
+    def counted(parts):
+        nonlocal written
+        for part in parts:
+            written += len(part)
+            yield part
+
+    rows = db.execute("SELECT path, size, checksum, encoding FROM files ORDER BY id")
+    for row in iter(rows.fetchone, None):
+        try:
+            f = gzip.open(row["path"], "rb") if row["encoding"] == "gzip" else open(row["path"], "rb")
+        except FileNotFoundError:
+            continue  # reported by gc; the record is still exported
+        yield from counted(_tar_member(f"blobs/{row['checksum']}", row["size"], _read_chunks(f)))
+
+    # A tar header needs the size up front, so the NDJSON is spooled to disk first
+    with tempfile.TemporaryFile() as spool:
+        for chunk in _export_records(db):
+            spool.write(chunk)
+        size = spool.tell()
+        spool.seek(0)
+        yield from counted(_tar_member("workspace.ndjson", size, iter(lambda: spool.read(UPLOAD_CHUNK_SIZE), b"")))
+    end = 2 * TAR_BLOCK
+    yield b"\0" * (end + -(written + end) % TAR_RECORD)
+
+@app.get("/api/export")
+def export_workspace():
+    """Stream the whole workspace as NDJSON, or as a tar with file blobs (?blobs=1)."""
+    db = get_db()
+    with_blobs = request.args.get("blobs") in ("1", "true")
+
+    def generate():
+        db.execute("BEGIN")  # one consistent snapshot for the whole download
+        try:
+            yield from _export_tar(db) if with_blobs else _export_records(db)
+        finally:
+            db.commit()
+
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    resp = app.response_class(
+        stream_with_context(generate()),
+        mimetype="application/x-tar" if with_blobs else "application/x-ndjson",
+    )
+    resp.headers.set("Content-Disposition", "attachment",
+                     filename=f"taskon-{stamp}.{'tar' if with_blobs else 'ndjson'}")
+    return resp
 
+def _iter_lines(stream):
+    """Split a byte stream into lines without reading it all (or byte by byte)."""
+    rest = b""
+    while chunk := stream.read(UPLOAD_CHUNK_SIZE):
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        yield from lines
+    if rest:
+        yield rest
+
+def _find_blob(checksum: str) -> tuple[Path | None, str | None]:
+    if blob_path(checksum).exists():
+        return blob_path(checksum), None
+    if compressed_blob_path(checksum).exists():
+        return compressed_blob_path(checksum), "gzip"
+    return None, None
+
+def _import_blob(name: str, fileobj, counts: dict):
+    checksum = name.lower()
+    if not SHA256_RE.fullmatch(checksum):
+        raise ValueError(f"unexpected tar member blobs/{name}")
+    existing, _ = _find_blob(checksum)
+    if existing is not None:
+        os.utime(existing)  # keep it out of the GC grace window until its row exists
+        counts["blobs_skipped"] += 1
+        return
+    tmp_path, actual, _ = _stream_to_temp(fileobj, UPLOAD_DIR)
+    if actual != checksum:
+        tmp_path.unlink()
+        raise ValueError(f"blob {name} does not match its checksum")
+    _store_blob(tmp_path, checksum)
+    counts["blobs"] += 1
+
+class _ImportBatch:
+    """Rows written in one BEGIN IMMEDIATE transaction of an import.
+
+    `pending` counts what the open transaction holds; it is added to `counts`
+    on commit, so a failed batch isn't reported as imported.
+    """
+
+    def __init__(self, db, counts: dict):
+        self.db = db
+        self.counts = counts
+        self.pending = dict.fromkeys(counts, 0)
+        self.size = 0
+        self.todos = []
+        self.files = []
+        self.mark = None
+
+    def begin(self):
+        if self.mark is None:
+            self.db.execute("BEGIN IMMEDIATE")
+            self.mark = self.db.execute("SELECT COALESCE(MAX(id), 0) FROM changes").fetchone()[0]
+
+    def commit(self):
+        if self.mark is None:
+            return
+        if self.todos:
+            self.db.executemany(
+                "INSERT INTO todos (list_id, title, done, rank, created_at) VALUES (?, ?, ?, ?, ?)", self.todos
+            )
+        # Drop the per-row change events; the import publishes one event at the end
+        self.db.execute("DELETE FROM changes WHERE id > ?", (self.mark,))
+        self.db.commit()
+        for file_id, mime in self.files:
+            _enqueue_processing(self.db, file_id, mime)
+        for key, n in self.pending.items():
+            self.counts[key] += n
+        self.pending = dict.fromkeys(self.counts, 0)
+        self.size, self.todos, self.files, self.mark = 0, [], [], None
+
+def _import_record(db, batch: _ImportBatch, record: dict, list_ids: dict):
+    kind = record.get("type")
+    if kind == "meta":
+        if record.get("format") != "taskon" or record.get("version") != EXPORT_FORMAT_VERSION:
+            raise ValueError("not a taskon export (or an unsupported version)")
+        return
+    batch.begin()
+    if kind == "list":
+        name = str(record.get("name") or "").strip()
+        if not name:
+            raise ValueError("list without a name")
+        # Inbox and Notepad are singletons looked up by name: merge into them
+        existing = fetch_list_id(db, name) if name.lower() in ("inbox", "notepad") else None
+        if existing is None:
+            existing = db.execute(
+                "INSERT INTO lists (name, position, color, is_hidden, created_at) "
+                "VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))",
+                (name, int(record.get("position") or 0), record.get("color"),
+                 int(bool(record.get("is_hidden"))), record.get("created_at")),
+            ).lastrowid
+            batch.pending["lists"] += 1
+        list_ids[record.get("id")] = existing
+    elif kind == "todo":
+        title = str(record.get("title") or "").strip()
+        if not title:
+            raise ValueError("todo without a title")
+        list_id = list_ids.get(record.get("list_id"))
+        if list_id is None:
+            # Its list wasn't in the export: keep the card in the Inbox,
+            # recreating it if the user deleted it
+            if None not in list_ids:
+                inbox_id = fetch_list_id(db, "Inbox")
+                if inbox_id is None:
+                    inbox_id = db.execute(
+                        "INSERT INTO lists (name, position, color) VALUES (?, ?, ?)",
+                        ("Inbox", 0, "#fffbe6"),
+                    ).lastrowid
+                    batch.pending["lists"] += 1
+                list_ids[None] = inbox_id
+            list_id = list_ids[None]
+        batch.todos.append((list_id, title, int(bool(record.get("done"))),
+                            int(record.get("rank") or 0), record.get("created_at")))
+        batch.pending["todos"] += 1
+    elif kind == "file":
+        checksum = str(record.get("checksum") or "").lower()
+        if not SHA256_RE.fullmatch(checksum):
+            raise ValueError("file without a valid checksum")
+        if db.execute("SELECT 1 FROM files WHERE checksum = ?", (checksum,)).fetchone():
+            batch.pending["files_existing"] += 1
+            return
+        safe_name, mime, error = _check_upload_name(str(record.get("name") or ""), record.get("mime"))
+        path, encoding = _find_blob(checksum)
+        if error or path is None:
+            batch.pending["files_skipped"] += 1  # disallowed type, or its blob wasn't sent
+            return
+        size = path.stat().st_size if encoding is None else int(record.get("size") or 0)
+        cur = db.execute(
+            "INSERT INTO files (name, mime, size, path, checksum, encoding, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, datetime('now')))",
+            (safe_name, mime, size, str(path), checksum, encoding, record.get("created_at")),
+        )
+        batch.files.append((cur.lastrowid, mime))
+        batch.pending["files"] += 1
+    else:
+        raise ValueError(f"unknown record type: {kind!r}")
+    batch.size += 1
+    if batch.size >= IMPORT_BATCH_ROWS:
+        batch.commit()
+
+def _import_ndjson(db, lines, counts: dict):
+    batch = _ImportBatch(db, counts)
+    list_ids = {}
+    header = False
+    # Each row fires several trigger statements; don't count them one by one
+    db.set_trace_callback(None)
+    try:
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = app.json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+                if not header and record.get("type") != "meta":
+                    raise ValueError("expected the export's meta header first")
+                header = True
+                _import_record(db, batch, record, list_ids)
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"line {number}: {e}") from None
+        if not header:
+            raise ValueError("empty export (no meta header)")
+        batch.commit()
+    finally:
+        if db.in_transaction:
+            db.rollback()  # the failed batch; earlier batches stay imported
+
+@app.post("/api/import")
+@body_limit(MAX_IMPORT_BYTES)
+def import_workspace():
+    """Add the lists, todos and files of an /api/export download to this workspace.
+
+    Takes NDJSON or, with Content-Type application/x-tar, the tar with blobs.
+    Rows are committed in batches of IMPORT_BATCH_ROWS, so a failed import
+    keeps what it committed before the bad record. Files are matched on
+    checksum and never imported twice.
+    """
+    db = get_db()
+    counts = dict.fromkeys(("lists", "todos", "files", "files_existing", "files_skipped", "blobs", "blobs_skipped"), 0)
+    started = time.perf_counter()
+    try:
+        if request.mimetype in ("application/x-tar", "application/tar"):
+            workspace = False
+            with tarfile.open(fileobj=request.stream, mode="r|") as tar:
+                for member in tar:
+                    if member.isfile() and member.name.startswith("blobs/"):
+                        _import_blob(member.name.removeprefix("blobs/"), tar.extractfile(member), counts)
+                    elif member.isfile() and member.name == "workspace.ndjson":
+                        _import_ndjson(db, _iter_lines(tar.extractfile(member)), counts)
+                        workspace = True
+            if not workspace:
+                raise ValueError("archive has no workspace.ndjson")
+        else:
+            _import_ndjson(db, _iter_lines(request.stream), counts)
+    except (ValueError, tarfile.TarError) as e:
+        error = {"error": f"Import failed: {e}", "imported": counts}
+        return jsonify(error), 400
+    finally:
+        if counts["lists"] or counts["todos"] or counts["files"]:
+            # Clients reload the board (and caches are cleared) on this one event
+            db.execute(
+                "INSERT INTO changes (entity, op, data) VALUES ('workspace', 'import', ?)",
+                (app.json.dumps(counts),),
+            )
+            db.commit()
+    return jsonify({"ok": True, **counts, "seconds": round(time.perf_counter() - started, 3)})
 
 # ------------------------
 # Test Routes
@@ -589,6 +2438,42 @@ def notepad_create():
 def debug_db_path():
     return jsonify({"db_path": str(DB_PATH.resolve())})
 
+@app.get("/api/debug/pool")
+def debug_pool():
+    return jsonify(pool.stats())
+
+@app.get("/api/debug/jobs")
+def debug_jobs():
+    rows = get_db().execute(
+        "SELECT id, kind, payload, status, attempts, last_error, created_at FROM jobs "
+        "WHERE status != 'done' ORDER BY id DESC LIMIT 100"
+    ).fetchall()
+    return jsonify({**jobs.stats(), "pending": [dict(r) for r in rows]})
+
+@app.get("/api/debug/slow-queries")
+def debug_slow_queries():
+    return jsonify(list(slow_queries))
+
+# ------------------------
+# Metrics
+# ------------------------
+@app.get("/api/metrics")
+def metrics_endpoint():
+    for key, value in pool.stats().items():
+        metrics.set("db_pool", value, stat=key)
+    for key, value in response_cache.stats().items():
+        metrics.set("response_cache", value, stat=key)
+    for key, value in derivatives.stats().items():
+        metrics.set("derivatives", value, stat=key)
+    job_stats = jobs.stats()
+    for status, count in job_stats["queue"].items():
+        metrics.set("job_queue", count, status=status)
+    for kind, counts in job_stats["processed"].items():
+        for outcome in ("done", "retried", "failed"):
+            metrics.set("jobs_processed", counts[outcome], kind=kind, outcome=outcome)
+        metrics.set("job_seconds", counts["seconds"], kind=kind)
+    return app.response_class(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 # ------------------------
 # Admin 
 # ------------------------
@@ -603,7 +2488,7 @@ def admin_hide_notepad():
         db.commit()
 
     # luo Notepad jos puuttuu, PIILOTETTUNA
-    row = db.execute("SELECT id FROM lists WHERE lower(name)='notepad'").fetchone()
+    row = db.execute(NOTEPAD_ID_SQL).fetchone()
     if not row:
         db.execute(
             "INSERT INTO lists (name, position, color, is_hidden) VALUES (?, ?, ?, ?)",
@@ -615,12 +2500,13 @@ def admin_hide_notepad():
         db.commit()
 
     # palauta pieni status + käytössä oleva DB-polku
-    db_path = (Path(__file__).parent / "todo.db").resolve()
+    db_path = DB_PATH.resolve()
     return jsonify({"ok": True, "db_path": str(db_path)})
 
 
 # ------------------------
 # Main Execution
 # ------------------------
+# Development server only; production runs gunicorn (gunicorn.conf.py) or asgi.py
 if __name__ == "__main__":
-    app.run(debug=True)
+    app.run(debug=os.getenv("FLASK_DEBUG", "1") == "1")
@@ -0,0 +1,213 @@
+"""ASGI entry point.
+
+    uvicorn asgi:application --workers 2
+
+The event loop receives request bodies and sends responses, so slow clients
+only cost a coroutine. The Flask app itself (DB work, hashing, file reads)
+runs on a bounded thread pool of ASGI_THREADS threads. Request bodies are
+spooled in memory up to ASGI_SPOOL_BYTES and then to a temp file, with the
+disk writes done off the loop. /api/changes streams are long-lived, so only
+their headers come from Flask; the events are sent from the loop.
+"""
+import asyncio
+import contextlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.exceptions import HTTPException
+from werkzeug.wsgi import FileWrapper
+
+from app import SSE_KEEPALIVE_SECONDS, app as flask_app, change_feed, prepare_database
+
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", "16"))
+ASGI_SPOOL_BYTES = int(os.getenv("ASGI_SPOOL_BYTES", str(1024 * 1024)))
+FILE_BLOCK_SIZE = 256 * 1024
+
+executor = ThreadPoolExecutor(max_workers=ASGI_THREADS, thread_name_prefix="asgi-wsgi")
+
+
+def _file_wrapper(file, block_size=FILE_BLOCK_SIZE):
+    # Larger blocks than Werkzeug's 8 KB: every chunk is a hop to the event loop
+    return FileWrapper(file, max(block_size, FILE_BLOCK_SIZE))
+
+
+def _body_limit(scope) -> int | None:
+    """MAX_CONTENT_LENGTH, or the matched view's own limit (see app.body_limit)."""
+    default = flask_app.config.get("MAX_CONTENT_LENGTH")
+    adapter = flask_app.url_map.bind("localhost", script_name=scope.get("root_path") or None)
+    try:
+        endpoint, _ = adapter.match(scope["path"], method=scope["method"])
+    except HTTPException:
+        return default  # 404/405/redirect: Flask answers without reading the body
+    return getattr(flask_app.view_functions.get(endpoint), "max_content_length", default)
+
+
+def _environ(scope, body, length: int) -> dict:
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1] or 80),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": open(os.devnull, "w"),
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+        "wsgi.file_wrapper": _file_wrapper,
+        "taskon.async_changes": True,  # see app.change_stream
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin1").upper().replace("-", "_")
+        value = raw_value.decode("latin1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name == "CONTENT_LENGTH":
+            environ["CONTENT_LENGTH"] = value
+        else:
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    # The body is fully spooled, so its size is known and wsgi.input ends at EOF
+    # even for chunked requests (otherwise Werkzeug reads them as empty)
+    environ["CONTENT_LENGTH"] = str(length)
+    environ["wsgi.input_terminated"] = True
+    return environ
+
+
+def _run_wsgi(scope, body, length, send, loop, disconnected: threading.Event):
+    """Runs on the thread pool; every send is handed back to the event loop.
+
+    Returns the change id to stream /api/changes events from, if the app
+    left that to the loop (the response is then still open).
+    """
+    def push(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = int(status.split(" ", 1)[0])
+        # The server adds its own Date header; Werkzeug sets one on
+        # conditional responses, which would send it twice
+        response["headers"] = [
+            (k.lower().encode("latin1"), v.encode("latin1")) for k, v in headers if k.lower() != "date"
+        ]
+
+    environ = _environ(scope, body, length)
+    result = flask_app(environ, start_response)
+    started = False
+    try:
+        for chunk in result:
+            if disconnected.is_set():
+                return
+            if not started:
+                push({"type": "http.response.start", "status": response["status"],
+                      "headers": response["headers"]})
+                started = True
+            if chunk:
+                push({"type": "http.response.body", "body": chunk, "more_body": True})
+        if not started:
+            push({"type": "http.response.start", "status": response["status"],
+                  "headers": response["headers"]})
+        if environ.get("taskon.changes_after") is not None:
+            return environ["taskon.changes_after"]
+        push({"type": "http.response.body", "body": b"", "more_body": False})
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+        environ["wsgi.errors"].close()
+
+
+async def _watch_disconnect(receive, disconnected: threading.Event):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            disconnected.set()
+            return
+
+
+async def _stream_changes(last: int, send, watcher: asyncio.Task):
+    """Send /api/changes events until the client disconnects (watcher finishes)."""
+    events = change_feed.astream(last, SSE_KEEPALIVE_SECONDS)
+    try:
+        while True:
+            pending = asyncio.ensure_future(anext(events))
+            await asyncio.wait({pending, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if not pending.done():
+                pending.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await pending
+                return
+            await send({"type": "http.response.body", "body": pending.result().encode(),
+                        "more_body": True})
+    finally:
+        await events.aclose()
+
+
+async def _lifespan(receive, send):
+    loop = asyncio.get_running_loop()
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Migrations run once here, before the first request is accepted
+            await loop.run_in_executor(executor, prepare_database)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            executor.shutdown(wait=False, cancel_futures=True)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    loop = asyncio.get_running_loop()
+    limit = _body_limit(scope)
+    body = tempfile.SpooledTemporaryFile(max_size=ASGI_SPOOL_BYTES)
+    try:
+        received = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunk = message.get("body", b"")
+            received += len(chunk)
+            if limit and received > limit:
+                await send({"type": "http.response.start", "status": 413,
+                            "headers": [(b"content-type", b"application/json")]})
+                await send({"type": "http.response.body",
+                            "body": b'{"error": "Request body too large"}'})
+                return
+            if received > ASGI_SPOOL_BYTES:
+                await loop.run_in_executor(None, body.write, chunk)
+            else:
+                body.write(chunk)
+            more_body = message.get("more_body", False)
+        body.seek(0)
+
+        disconnected = threading.Event()
+        watcher = asyncio.create_task(_watch_disconnect(receive, disconnected))
+        try:
+            changes_after = await loop.run_in_executor(
+                executor, _run_wsgi, scope, body, received, send, loop, disconnected
+            )
+            if changes_after is not None:
+                await _stream_changes(changes_after, send, watcher)
+        finally:
+            watcher.cancel()
+    finally:
+        body.close()
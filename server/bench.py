@@ -0,0 +1,540 @@
+"""API benchmark suite.
+
+Runs offline against a throwaway SQLite database through Flask's test client,
+or over HTTP against a running server:
+
+    python bench.py                                # in-process, default sizes
+    python bench.py --todos 10000 --out before.json
+    python bench.py --todos 10000 --baseline before.json   # exit 1 on regressions
+    python bench.py --serve                        # start a local threaded server
+    python bench.py --url http://127.0.0.1:8000 --scenarios slow_upload,sse_fanout
+
+Each scenario reports latency percentiles and throughput; results are written
+as JSON so two runs (e.g. two commits) can be diffed.
+"""
+import argparse
+import atexit
+import io
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from http.client import HTTPConnection
+from urllib.parse import urlsplit
+
+SCENARIOS = (
+    "health", "board", "board_304", "list_todos", "todos_all", "todos_page", "create", "move",
+    "reorder", "batch", "search", "search_prefix", "compression", "export", "import", "upload", "download",
+    "sse_fanout", "slow_upload",
+)
+HTTP_ONLY = {"sse_fanout", "slow_upload"}
+
+# Seeded card titles draw two words from this vocabulary, so a search for one
+# word matches roughly 2/len(WORDS) of the cards.
+_SYLLABLES = ["ka", "lo", "mi", "ne", "pu", "ra", "si", "to", "va", "ju", "he", "ko", "ta", "li"]
+WORDS = sorted({a + b + c for a in _SYLLABLES for b in _SYLLABLES for c in _SYLLABLES})
+
+
+# ------------------------
+# Clients
+# ------------------------
+class LocalClient:
+    """Flask test client against a temporary database and upload folder."""
+
+    def __init__(self):
+        self.tmp = tempfile.mkdtemp(prefix="taskon-bench-")
+        atexit.register(shutil.rmtree, self.tmp, ignore_errors=True)
+        os.environ["DB_PATH"] = os.path.join(self.tmp, "todo.db")
+        os.environ["UPLOAD_ROOT"] = os.path.join(self.tmp, "uploaded_files")
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from app import app
+
+        self.app = app
+        self.client = app.test_client()
+
+    def request(self, method, path, json_body=None, data=None, headers=None, files=None):
+        kwargs = {"headers": headers or {}}
+        if json_body is not None:
+            kwargs["json"] = json_body
+        if data is not None:
+            kwargs["data"] = data
+        if files is not None:
+            kwargs["data"] = files
+            kwargs["content_type"] = "multipart/form-data"
+        resp = self.client.open(path, method=method, **kwargs)
+        return resp.status_code, resp.get_data(), resp.headers
+
+
+class HttpClient:
+    """Keep-alive HTTP client against a running server."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.url = url.rstrip("/")
+        self._local = threading.local()
+
+    def _conn(self):
+        if not hasattr(self._local, "conn"):
+            self._local.conn = HTTPConnection(self.host, self.port, timeout=60)
+        return self._local.conn
+
+    def request(self, method, path, json_body=None, data=None, headers=None, files=None):
+        headers = dict(headers or {})
+        body = data
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers["Content-Type"] = "application/json"
+        if files is not None:
+            boundary = uuid.uuid4().hex
+            (name, (fh, filename)), = files.items()
+            body = (
+                f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"; "
+                f"filename=\"{filename}\"\r\nContent-Type: application/octet-stream\r\n\r\n"
+            ).encode() + fh.read() + f"\r\n--{boundary}--\r\n".encode()
+            headers["Content-Type"] = f"multipart/form-data; boundary={boundary}"
+        for attempt in (1, 2):
+            conn = self._conn()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+                return resp.status, resp.read(), resp.headers
+            except (ConnectionError, OSError):
+                conn.close()
+                del self._local.conn
+                if attempt == 2:
+                    raise
+
+
+def start_local_server():
+    """Serve the app on a free port with the threaded dev server; return its URL."""
+    local = LocalClient()
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, local.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+# ------------------------
+# Helpers
+# ------------------------
+def summarize(samples: list[float], extra: dict | None = None) -> dict:
+    samples = sorted(samples)
+    total = sum(samples)
+
+    def pct(p):
+        return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": samples[-1] * 1000,
+        "ops_per_s": len(samples) / total if total else None,
+        **(extra or {}),
+    }
+
+
+def timed(fn, iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def expect(status, body, *ok):
+    if status not in ok:
+        raise RuntimeError(f"unexpected HTTP {status}: {body[:200]!r}")
+    return json.loads(body) if body else None
+
+
+def seed(client, todos: int, lists: int) -> list[int]:
+    """Create `lists` lists holding `todos` cards in total, via /api/batch."""
+    list_ids = []
+    for i in range(lists):
+        body = expect(*client.request("POST", "/api/lists", {"name": f"Bench {i}"})[:2], 201)
+        list_ids.append(body["id"])
+    rng = random.Random(0)
+    ops = [
+        {"op": "create", "list_id": list_ids[i % lists], "title": f"Card {i} {rng.choice(WORDS)} {rng.choice(WORDS)}"}
+        for i in range(todos)
+    ]
+    for i in range(0, len(ops), 1000):
+        expect(*client.request("POST", "/api/batch", {"ops": ops[i:i + 1000]})[:2], 200)
+    return list_ids
+
+
+# ------------------------
+# Scenarios
+# ------------------------
+def run_scenario(name, client, ctx, args) -> dict:
+    n = args.iterations
+    big_list = ctx["lists"][0]
+
+    if name == "health":
+        return summarize(timed(lambda: client.request("GET", "/api/health"), n))
+
+    if name == "board":
+        return summarize(timed(lambda: client.request("GET", "/api/board"), max(5, n // 10)))
+
+    if name == "board_304":
+        _, _, headers = client.request("GET", "/api/board")
+        etag = headers.get("ETag")
+        return summarize(timed(
+            lambda: client.request("GET", "/api/board", headers={"If-None-Match": etag}), n))
+
+    if name == "list_todos":
+        return summarize(timed(
+            lambda: client.request("GET", f"/api/lists/{big_list}/todos"), max(5, n // 10)))
+
+    if name == "todos_all":
+        # Whole table in one unpaginated response (uncached)
+        return summarize(timed(lambda: client.request("GET", "/api/todos"), max(5, n // 10)))
+
+    if name == "todos_page":
+        return summarize(timed(lambda: client.request("GET", "/api/todos?limit=100"), n))
+
+    if name == "create":
+        return summarize(timed(
+            lambda: client.request("POST", f"/api/lists/{big_list}/todos", {"title": "bench"}), n))
+
+    if name == "move":
+        ids = [t["id"] for t in expect(*client.request("GET", f"/api/todos?list_id={big_list}")[:2], 200)]
+
+        def move():
+            a, b = random.sample(ids, 2)
+            client.request("POST", f"/api/todos/{a}/move", {"after_id": b})
+        return summarize(timed(move, n))
+
+    if name == "reorder":
+        ids = [t["id"] for t in expect(*client.request("GET", f"/api/todos?list_id={big_list}")[:2], 200)]
+
+        def reorder():
+            i = random.randrange(len(ids))
+            ids.insert(random.randrange(len(ids)), ids.pop(i))
+            client.request("POST", f"/api/lists/{big_list}/todos/reorder", {"order": ids})
+        return summarize(timed(reorder, max(5, n // 10)))
+
+    if name == "batch":
+        ids = [t["id"] for t in expect(*client.request("GET", f"/api/todos?list_id={big_list}&limit=200")[:2], 200)]
+        ops = [{"op": "update", "id": i, "done": True} for i in ids]
+        return summarize(timed(lambda: client.request("POST", "/api/batch", {"ops": ops}), max(5, n // 10)),
+                         {"ops_per_request": len(ops)})
+
+    if name == "search":
+        return summarize(timed(
+            lambda: client.request("GET", f"/api/search?q={random.choice(WORDS)}&limit=50"), n))
+
+    if name == "search_prefix":
+        return summarize(timed(
+            lambda: client.request("GET", f"/api/search?q={random.choice(WORDS)[:4]}&limit=50"), n))
+
+    if name == "compression":
+        return compression_scenario(client, big_list, n)
+
+    if name == "export":
+        sizes = []
+
+        def export():
+            _, body, _ = client.request("GET", "/api/export")
+            sizes.append(len(body))
+        samples = timed(export, max(3, n // 50))
+        rows = args.todos + args.lists
+        return summarize(samples, {
+            "mb": sizes[-1] / 1024 / 1024,
+            "rows_per_s": rows * len(samples) / sum(samples),
+        })
+
+    if name == "import":
+        # Re-imports the workspace into itself, so it runs once and doubles the data
+        _, body, _ = client.request("GET", "/api/export")
+        start = time.perf_counter()
+        result = expect(*client.request("POST", "/api/import", data=body,
+                                        headers={"Content-Type": "application/x-ndjson"})[:2], 200)
+        elapsed = time.perf_counter() - start
+        return summarize([elapsed], {
+            "mb": len(body) / 1024 / 1024,
+            "rows_per_s": (result["lists"] + result["todos"]) / elapsed,
+        })
+
+    if name == "upload":
+        size = args.file_mb * 1024 * 1024
+        samples = []
+        tracemalloc.start()
+        for _ in range(max(3, n // 20)):
+            payload = os.urandom(size)
+            start = time.perf_counter()
+            expect(*client.request("POST", "/api/files", files={"file": (io.BytesIO(payload), "bench.zip")})[:2], 201)
+            samples.append(time.perf_counter() - start)
+            del payload
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return summarize(samples, {
+            "file_mb": args.file_mb,
+            "mb_per_s": args.file_mb * len(samples) / sum(samples),
+            # Includes the client-side copy of the payload in local mode
+            "peak_traced_mb": peak / 1024 / 1024,
+        })
+
+    if name == "download":
+        payload = os.urandom(args.file_mb * 1024 * 1024)
+        body = expect(*client.request("POST", "/api/files", files={"file": (io.BytesIO(payload), "dl.zip")})[:2], 201)
+        samples = timed(lambda: client.request("GET", f"/api/files/{body['id']}"), max(5, n // 10))
+        return summarize(samples, {
+            "file_mb": args.file_mb,
+            "mb_per_s": args.file_mb * len(samples) / sum(samples),
+        })
+
+    if name == "sse_fanout":
+        return sse_fanout(client, args)
+
+    if name == "slow_upload":
+        return slow_upload(client, args)
+
+    raise ValueError(f"Unknown scenario {name}")
+
+
+def compression_scenario(client, list_id, n) -> dict:
+    """Bytes on the wire and latency per Accept-Encoding, plus codec CPU cost.
+
+    /api/lists/<id>/todos is served from the response cache (compressed once);
+    /api/todos?list_id= is compressed on every request.
+    """
+    import compression
+
+    encodings = ("identity",) + compression.ENCODINGS
+    per_encoding = {}
+    for encoding in encodings:
+        stats = {}
+        for label, path in (("cached", f"/api/lists/{list_id}/todos"), ("live", f"/api/todos?list_id={list_id}")):
+            _, body, _ = client.request("GET", path, headers={"Accept-Encoding": encoding})
+            samples = timed(lambda: client.request("GET", path, headers={"Accept-Encoding": encoding}), max(5, n // 10))
+            stats[f"{label}_bytes"] = len(body)
+            stats[f"{label}_p50_ms"] = summarize(samples)["p50_ms"]
+        per_encoding[encoding] = stats
+
+    # Codec cost on the same payload, measured in this process
+    _, plain, _ = client.request("GET", f"/api/todos?list_id={list_id}", headers={"Accept-Encoding": "identity"})
+    for encoding in compression.ENCODINGS:
+        for cached in (False, True):
+            start = time.process_time()
+            out = compression.compress(plain, encoding, cached=cached)
+            cpu = time.process_time() - start
+            key = "cached_level" if cached else "live_level"
+            per_encoding[encoding][f"{key}_cpu_ms"] = cpu * 1000
+            per_encoding[encoding][f"{key}_ratio"] = len(out) / len(plain)
+
+    best = compression.ENCODINGS[0]
+    samples = timed(lambda: client.request(
+        "GET", f"/api/todos?list_id={list_id}", headers={"Accept-Encoding": best}), max(5, n // 10))
+    return summarize(samples, {"encoding": best, "plain_bytes": len(plain), "encodings": per_encoding})
+
+
+def sse_fanout(client, args) -> dict:
+    """Latency from a write until every subscriber has received its event."""
+    received = []
+    lock = threading.Lock()
+    ready = threading.Barrier(args.subscribers + 1)
+
+    def subscriber():
+        conn = HTTPConnection(client.host, client.port, timeout=120)
+        conn.request("GET", "/api/changes")
+        resp = conn.getresponse()
+        resp.readline()
+        ready.wait()
+        while True:
+            line = resp.readline()
+            if not line:
+                return
+            if line.startswith(b"data:"):
+                with lock:
+                    received.append(time.perf_counter())
+
+    threads = [threading.Thread(target=subscriber, daemon=True) for _ in range(args.subscribers)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    time.sleep(0.5)
+
+    samples = []
+    for _ in range(args.writes):
+        with lock:
+            received.clear()
+        start = time.perf_counter()
+        client.request("POST", "/api/notepad", {"title": "fanout"})
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            with lock:
+                if len(received) >= args.subscribers:
+                    break
+            time.sleep(0.001)
+        with lock:
+            samples.append((max(received) if received else time.perf_counter()) - start)
+    return summarize(samples, {"subscribers": args.subscribers})
+
+
+def slow_upload(client, args) -> dict:
+    """Concurrent uploads trickled at --slow-kbps; measures /api/health latency meanwhile.
+
+    Run once against the WSGI server and once against the ASGI one to compare.
+    """
+    size = 256 * 1024
+    chunk = 4096
+    delay = chunk / (args.slow_kbps * 1024)
+    done = []
+
+    def trickle():
+        payload = os.urandom(size)
+        boundary = uuid.uuid4().hex
+        head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; "
+                f"filename=\"slow.zip\"\r\n\r\n").encode()
+        tail = f"\r\n--{boundary}--\r\n".encode()
+        body = head + payload + tail
+        sock = socket.create_connection((client.host, client.port))
+        sock.sendall((f"POST /api/files HTTP/1.1\r\nHost: {client.host}\r\n"
+                      f"Content-Type: multipart/form-data; boundary={boundary}\r\n"
+                      f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode())
+        start = time.perf_counter()
+        for i in range(0, len(body), chunk):
+            sock.sendall(body[i:i + chunk])
+            time.sleep(delay)
+        status = sock.recv(64)
+        sock.close()
+        if b" 201 " in status:
+            done.append(time.perf_counter() - start)
+
+    uploaders = [threading.Thread(target=trickle, daemon=True) for _ in range(args.slow_clients)]
+    start = time.perf_counter()
+    for t in uploaders:
+        t.start()
+    time.sleep(0.5)
+    health = []
+    while any(t.is_alive() for t in uploaders):
+        t0 = time.perf_counter()
+        client.request("GET", "/api/health")
+        health.append(time.perf_counter() - t0)
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    return summarize(health or [0.0], {
+        "slow_clients": args.slow_clients,
+        "completed_uploads": len(done),
+        "upload_throughput_kb_s": len(done) * size / 1024 / elapsed,
+    })
+
+
+# ------------------------
+# Main
+# ------------------------
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, stats in results["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old or not old.get("p50_ms") or "error" in stats:
+            continue
+        change = (stats["p50_ms"] - old["p50_ms"]) / old["p50_ms"]
+        print(f"  {name:<12} p50 {old['p50_ms']:9.3f} -> {stats['p50_ms']:9.3f} ms ({change:+.0%})")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--serve", action="store_true", help="start a local threaded server and benchmark over HTTP")
+    parser.add_argument("--scenarios", default=",".join(s for s in SCENARIOS if s not in HTTP_ONLY))
+    parser.add_argument("--todos", type=int, default=5000, help="cards to seed before measuring")
+    parser.add_argument("--lists", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--file-mb", type=int, default=8)
+    parser.add_argument("--subscribers", type=int, default=200)
+    parser.add_argument("--writes", type=int, default=20)
+    parser.add_argument("--slow-clients", type=int, default=32)
+    parser.add_argument("--slow-kbps", type=int, default=64)
+    parser.add_argument("--out", help="write JSON results here")
+    parser.add_argument("--baseline", help="compare p50s with an earlier JSON result")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed p50 slowdown vs baseline")
+    args = parser.parse_args(argv)
+
+    url = start_local_server() if args.serve else args.url
+    client = HttpClient(url) if url else LocalClient()
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+
+    seed_start = time.perf_counter()
+    ctx = {"lists": seed(client, args.todos, args.lists)}
+    print(f"seeded {args.todos} todos in {time.perf_counter() - seed_start:.1f}s", file=sys.stderr)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "mode": url or "in-process",
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "todos": args.todos,
+            "lists": args.lists,
+            "iterations": args.iterations,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": {},
+    }
+    for name in scenarios:
+        if name in HTTP_ONLY and not url:
+            results["results"][name] = {"error": "needs --url or --serve"}
+            continue
+        try:
+            stats = run_scenario(name, client, ctx, args)
+        except Exception as e:  # keep going; a broken scenario is a result too
+            stats = {"error": f"{type(e).__name__}: {e}"}
+        results["results"][name] = stats
+        if "error" in stats:
+            print(f"{name:<12} ERROR {stats['error']}", file=sys.stderr)
+        else:
+            print(f"{name:<12} p50 {stats['p50_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms  "
+                  f"{stats['ops_per_s'] or 0:9.1f} ops/s", file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(results, json.load(fh), args.threshold)
+        if regressions:
+            print(f"p50 regressions over {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
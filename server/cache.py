@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryCache:
+    """Byte-bounded LRU of serialized responses, with a TTL.
+
+    Keys are versioned so a reader that queried the database before a write
+    can't store its stale payload after the writer invalidated the key: take
+    version(key) before reading, pass it to set(), and the set is dropped if
+    the key was deleted in between.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, ttl: float = 60.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._bytes = 0
+        self._clock = 0
+        self._deleted_at: dict[str, int] = {}
+        self._cleared_at = 0
+        self._stats = {"hits": 0, "misses": 0, "sets": 0, "stale_sets": 0, "evictions": 0, "invalidations": 0}
+
+    def version(self, key: str) -> int:
+        with self._lock:
+            return self._clock
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def set(self, key: str, value: bytes, version: int | None = None):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if version is not None and max(self._deleted_at.get(key, 0), self._cleared_at) > version:
+                self._stats["stale_sets"] += 1
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._bytes += len(value)
+            self._stats["sets"] += 1
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def delete(self, *keys: str):
+        with self._lock:
+            self._clock += 1
+            for key in keys:
+                self._deleted_at[key] = self._clock
+                if key in self._entries:
+                    self._drop(key)
+            self._stats["invalidations"] += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._clock += 1
+            self._cleared_at = self._clock
+            self._deleted_at.clear()
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key: str):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+class RedisCache:
+    """Shared cache for multi-worker deployments (needs the `redis` package).
+
+    Same interface as MemoryCache; key versions live in Redis so invalidations
+    from one worker reach all of them. Hit/miss counters are per process.
+    """
+
+    def __init__(self, url: str, ttl: float = 60.0, prefix: str = "taskon:cache:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_URL is a redis:// URL but the redis package is not installed")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "sets": 0, "stale_sets": 0, "invalidations": 0}
+
+    def _count(self, key: str, delta: int = 1):
+        with self._lock:
+            self._stats[key] += delta
+
+    def version(self, key: str) -> int:
+        return int(self.client.get(f"{self.prefix}v:{key}") or 0)
+
+    def get(self, key: str) -> bytes | None:
+        value = self.client.get(self.prefix + key)
+        self._count("hits" if value is not None else "misses")
+        return value
+
+    def set(self, key: str, value: bytes, version: int | None = None):
+        if version is not None and self.version(key) != version:
+            self._count("stale_sets")
+            return
+        self.client.set(self.prefix + key, value, ex=max(1, int(self.ttl)))
+        self._count("sets")
+
+    def delete(self, *keys: str):
+        pipe = self.client.pipeline()
+        for key in keys:
+            pipe.incr(f"{self.prefix}v:{key}")
+            pipe.delete(self.prefix + key)
+        pipe.execute()
+        self._count("invalidations", len(keys))
+
+    def clear(self):
+        for key in self.client.scan_iter(f"{self.prefix}*"):
+            if not key.startswith(f"{self.prefix}v:".encode()):
+                self.client.delete(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+def make_cache(url: str, max_bytes: int, ttl: float):
+    """memory:// (default) keeps a per-process LRU; redis://... shares one across workers."""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCache(url, ttl=ttl)
+    if url in ("", "memory", "memory://"):
+        return MemoryCache(max_bytes=max_bytes, ttl=ttl)
+    raise ValueError(f"Unsupported RESPONSE_CACHE_URL: {url}")
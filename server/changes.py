@@ -0,0 +1,182 @@
+import asyncio
+import json
+import threading
+from collections import deque
+
+# How many change-log rows are kept for Last-Event-ID resumes. Older clients
+# get a "reset" event and reload the board instead.
+CHANGE_LOG_RETENTION = 10000
+
+
+def sse(event: str, data: str, event_id: int | None = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {data}\n\n"
+
+
+class ChangeFeed:
+    """In-process fan-out of rows from the `changes` table to SSE subscribers.
+
+    Writers call publish() after committing; it reads the new change rows once
+    and wakes every waiting subscriber, so a write costs one query no matter
+    how many clients are listening. Subscribers in other worker processes fall
+    back to polling the table when their wait times out.
+
+    stream() is the SSE body for threaded WSGI servers, where each subscriber
+    holds a thread; astream() is the same body for an asyncio event loop.
+    """
+
+    def __init__(self, pool, buffer_size: int = 1000, dumps=json.dumps):
+        self.pool = pool
+        self.dumps = dumps
+        self._cond = threading.Condition()
+        self._recent = deque(maxlen=buffer_size)
+        self._latest = 0
+        self._publishes = 0
+        self._listeners = []
+        self._async_waiters = set()  # (loop, future) pairs from wait_async()
+
+    def add_listener(self, callback):
+        """Call `callback(rows)` with each batch of change rows this process publishes."""
+        self._listeners.append(callback)
+
+    def start(self):
+        """Begin publishing from the current end of the change log."""
+        db = self.pool.acquire()
+        try:
+            latest = db.execute("SELECT COALESCE(MAX(id), 0) FROM changes").fetchone()[0]
+        finally:
+            self.pool.release(db)
+        with self._cond:
+            self._latest = max(self._latest, latest)
+
+    def latest_id(self) -> int:
+        with self._cond:
+            return self._latest
+
+    def publish(self):
+        while rows := self.read_after(self.latest_id()):
+            with self._cond:
+                fresh = [r for r in rows if r["id"] > self._latest]
+                if not fresh:
+                    return
+                self._recent.extend(fresh)
+                self._latest = fresh[-1]["id"]
+                self._publishes += 1
+                prune = self._publishes % 1000 == 0
+                self._cond.notify_all()
+                waiters, self._async_waiters = self._async_waiters, set()
+            for loop, future in waiters:
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(_wake, future)
+            for callback in self._listeners:
+                callback(fresh)
+            if prune:
+                self.prune()
+
+    def read_after(self, after_id: int, limit: int = 500) -> list[dict]:
+        db = self.pool.acquire()
+        try:
+            rows = db.execute(
+                "SELECT id, entity, op, data, created_at FROM changes "
+                "WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, limit),
+            ).fetchall()
+            return [{**dict(r), "data": json.loads(r["data"])} for r in rows]
+        finally:
+            self.pool.release(db)
+
+    def oldest_id(self) -> int:
+        db = self.pool.acquire()
+        try:
+            return db.execute("SELECT COALESCE(MIN(id), 0) FROM changes").fetchone()[0]
+        finally:
+            self.pool.release(db)
+
+    def events_after(self, after_id: int) -> list[dict] | None:
+        """Buffered events newer than `after_id`, or None if the buffer can't tell."""
+        with self._cond:
+            if not self._recent:
+                return None
+            if self._recent[0]["id"] > after_id + 1:
+                return None
+            return [e for e in self._recent if e["id"] > after_id]
+
+    def wait(self, after_id: int, timeout: float) -> bool:
+        """Block until something newer than `after_id` is published (or timeout)."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._latest > after_id, timeout)
+
+    async def wait_async(self, after_id: int, timeout: float) -> bool:
+        """wait() for coroutines: publish() wakes them without blocking the loop."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._cond:
+            if self._latest > after_id:
+                return True
+            self._async_waiters.add((loop, future))
+        try:
+            await asyncio.wait({future}, timeout=timeout)
+        finally:
+            with self._cond:
+                self._async_waiters.discard((loop, future))
+        return self.latest_id() > after_id
+
+    def stream(self, last: int, keepalive: float):
+        """SSE body from change `last` on; runs until the client goes away."""
+        yield "retry: 3000\n\n"
+        if last and last < self.oldest_id() - 1:
+            last = self.latest_id()
+            yield sse("reset", self.dumps({"id": last}), last)
+        while True:
+            events = self.events_after(last)
+            if events is None:
+                events = self.read_after(last)
+            for e in events:
+                last = e["id"]
+                yield sse("change", self.dumps(e), last)
+            if events:
+                continue
+            if not self.wait(last, keepalive):
+                # Timed out: keep the connection alive and pick up writes made
+                # by other worker processes straight from the table
+                yield ": keepalive\n\n"
+                for e in self.read_after(last):
+                    last = e["id"]
+                    yield sse("change", self.dumps(e), last)
+
+    async def astream(self, last: int, keepalive: float):
+        """stream() as an async generator. Its queries run in the default executor."""
+        yield "retry: 3000\n\n"
+        if last and last < await asyncio.to_thread(self.oldest_id) - 1:
+            last = self.latest_id()
+            yield sse("reset", self.dumps({"id": last}), last)
+        while True:
+            events = self.events_after(last)
+            if events is None:
+                events = await asyncio.to_thread(self.read_after, last)
+            for e in events:
+                last = e["id"]
+                yield sse("change", self.dumps(e), last)
+            if events:
+                continue
+            if not await self.wait_async(last, keepalive):
+                yield ": keepalive\n\n"
+                for e in await asyncio.to_thread(self.read_after, last):
+                    last = e["id"]
+                    yield sse("change", self.dumps(e), last)
+
+    def prune(self):
+        db = self.pool.acquire()
+        try:
+            db.execute(
+                "DELETE FROM changes WHERE id <= (SELECT MAX(id) FROM changes) - ?",
+                (CHANGE_LOG_RETENTION,),
+            )
+            db.commit()
+        finally:
+            self.pool.release(db)
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
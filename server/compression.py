@@ -0,0 +1,58 @@
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install zstandard
+    zstandard = None
+
+# Server preference when the client accepts several equally
+ENCODINGS = tuple(
+    name for name, available in (("zstd", zstandard), ("br", brotli), ("gzip", True)) if available
+)
+
+# (per-request level, level for payloads compressed once and cached)
+LEVELS = {"zstd": (3, 12), "br": (4, 9), "gzip": (6, 9)}
+
+
+def negotiate(accept_encodings) -> str | None:
+    """Best encoding we support from a werkzeug Accept-Encoding header, or None."""
+    return accept_encodings.best_match(ENCODINGS) if accept_encodings else None
+
+
+def compress(data: bytes, encoding: str, cached: bool = False) -> bytes:
+    level = LEVELS[encoding][cached]
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def compress_stream(chunks, encoding: str):
+    """Compress an iterable of byte chunks incrementally (for streamed responses)."""
+    level = LEVELS[encoding][False]
+    if encoding == "gzip":
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+        process, finish = compressor.compress, compressor.flush
+    elif encoding == "br":
+        compressor = brotli.Compressor(quality=level)
+        process, finish = compressor.process, compressor.finish
+    else:
+        compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        process, finish = compressor.compress, compressor.flush
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if out := process(chunk):
+                yield out
+        yield finish()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
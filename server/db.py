@@ -1,13 +1,150 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///todo.db")
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+DB_PATH = Path(os.getenv("DB_PATH") or Path(__file__).parent / "todo.db")
+
+# Applied to every new connection. WAL lets readers run while a write is in
+# progress; NORMAL sync is durable across app crashes in WAL mode.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",      # 16 MB page cache per connection
+    "PRAGMA mmap_size = 268435456",    # 256 MB
+)
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection that keeps counters for the request currently using it.
+
+    `queries` is fed by count_statement() installed as the trace callback, so
+    statements run by triggers are included. `sql_time` is the time spent in
+    execute()/executemany()/commit() (rows fetched afterwards are not timed);
+    `lock_wait` is the part of it spent in BEGIN IMMEDIATE waiting for the
+    write lock.
+
+    When `slow_query_ms` is set, statements passed to execute() that take at
+    least that long are reported to `on_slow_query(conn, sql, params, seconds)`.
+    """
+
+    slow_query_ms = None
+    on_slow_query = None
+
+    def reset_counters(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.lock_wait = 0.0
+
+    def count_statement(self, _sql):
+        self.queries += 1
+
+    def execute(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.sql_time += elapsed
+            if sql.startswith("BEGIN IMMEDIATE"):
+                self.lock_wait += elapsed
+            elif self.slow_query_ms is not None and elapsed * 1000 >= self.slow_query_ms:
+                self.on_slow_query(self, sql, args[0] if args else (), elapsed)
+
+    def explain(self, sql, params=()) -> list[str]:
+        """EXPLAIN QUERY PLAN details for `sql`, without timing or slow-query checks."""
+        rows = sqlite3.Connection.execute(self, "EXPLAIN QUERY PLAN " + sql, params).fetchall()
+        return [row[3] for row in rows]
+
+    def executemany(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, *args)
+        finally:
+            self.sql_time += time.perf_counter() - start
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            self.sql_time += time.perf_counter() - start
+
+
+class ConnectionPool:
+    """Reusable sqlite3 connections, handed out one per request.
+
+    Connections are created on demand and kept idle (up to `max_idle`) between
+    requests, so the connect + PRAGMA cost is paid once per connection rather
+    than once per request.
+    """
+
+    def __init__(self, path, max_idle: int = 8):
+        self.path = path
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "checkouts": 0, "reused": 0, "discarded": 0, "in_use": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, factory=TimedConnection)
+        conn.reset_counters()
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, delta in deltas.items():
+                self._stats[key] += delta
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            conn = self._idle.get_nowait()
+            self._count(checkouts=1, reused=1, in_use=1)
+        except queue.Empty:
+            conn = self._connect()
+            self._count(checkouts=1, created=1, in_use=1)
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        self._count(in_use=-1)
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put_nowait(conn)
+        except (queue.Full, sqlite3.Error):
+            conn.close()
+            self._count(discarded=1)
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "idle": self._idle.qsize(), "max_idle": self._idle.maxsize}
+
+
+def tuple_rows(cursor) -> tuple[str, ...]:
+    """Make an executed cursor return plain tuples instead of sqlite3.Row; returns the column names.
+
+    For row-heavy reads that only serialize the rows: tuples are cheaper to
+    build and hold than Row objects.
+    """
+    cursor.row_factory = None
+    return tuple(d[0] for d in cursor.description)
 
 
 def init_files_table(conn):
@@ -23,4 +160,3 @@ def init_files_table(conn):
       UNIQUE(checksum)
     );
     """)
-    conn.commit()
\ No newline at end of file
@@ -0,0 +1,170 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # thumbnails are optional: pip install Pillow
+    Image = None
+
+# Longest side of each thumbnail bucket; requests round up to the next one
+THUMBNAIL_SIZES = (128, 256, 512)
+IMAGE_MIMES = {"image/png", "image/jpeg"}
+PDF_MIME = "application/pdf"
+
+
+class DerivativeStore:
+    """Thumbnails and PDF first-page previews, cached on disk by blob checksum.
+
+    Files live at <root>/<sha[:2]>/<sha>-<size>.jpg. Since they derive from
+    content-addressed blobs they never change and can be cached forever by
+    clients. Reads bump the file mtime; when the cache grows past
+    `budget_bytes` the least recently used derivatives are deleted.
+    """
+
+    def __init__(self, root: Path, budget_bytes: int):
+        self.root = Path(root)
+        self.budget_bytes = budget_bytes
+        self._lock = threading.Lock()
+        self._bytes = None
+        self._stats = {"generated": 0, "failed": 0, "evicted": 0}
+
+    def supports(self, mime: str) -> bool:
+        if Image is None:
+            return False
+        return mime in IMAGE_MIMES or (mime == PDF_MIME and shutil.which("pdftoppm") is not None)
+
+    @staticmethod
+    def bucket(size: int) -> int:
+        return next((s for s in THUMBNAIL_SIZES if s >= size), THUMBNAIL_SIZES[-1])
+
+    def path(self, checksum: str, size: int) -> Path:
+        return self.root / checksum[:2] / f"{checksum}-{size}.jpg"
+
+    def get(self, checksum: str, size: int) -> Path | None:
+        path = self.path(checksum, size)
+        try:
+            os.utime(path)  # LRU clock
+        except FileNotFoundError:
+            return None
+        return path
+
+    def discard(self, checksum: str):
+        for size in THUMBNAIL_SIZES:
+            self.path(checksum, size).unlink(missing_ok=True)
+        with self._lock:
+            self._bytes = None  # recount on the next write
+
+    def sweep(self, live_checksums: set[str]) -> int:
+        """Delete derivatives whose source blob is gone; returns how many."""
+        removed = 0
+        for _, _, path in self._scan():
+            if path.stem.rsplit("-", 1)[0] not in live_checksums:
+                path.unlink(missing_ok=True)
+                removed += 1
+        if removed:
+            with self._lock:
+                self._bytes = None
+        return removed
+
+    def generate_all(self, source: Path, mime: str, checksum: str):
+        for size in THUMBNAIL_SIZES:
+            self.generate(source, mime, checksum, size)
+
+    def generate(self, source: Path, mime: str, checksum: str, size: int) -> Path | None:
+        """Render one derivative (no-op if it exists); None if it can't be made."""
+        path = self.path(checksum, size)
+        if path.exists():
+            return path
+        if not self.supports(mime):
+            return None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".thumb-", suffix=".tmp")
+        os.close(fd)
+        try:
+            if mime == PDF_MIME:
+                self._render_pdf(source, size, tmp_name)
+            else:
+                self._render_image(source, size, tmp_name)
+            os.replace(tmp_name, path)
+        except Exception:
+            os.unlink(tmp_name)
+            self._count(failed=1)
+            return None
+        self._count(generated=1)
+        self._added(path.stat().st_size)
+        return path
+
+    @staticmethod
+    def _render_image(source, size: int, out_name: str):
+        with Image.open(source) as img:
+            # JPEG draft mode decodes at reduced scale: big photos never load at full size
+            img.draft("RGB", (size, size))
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((size, size))
+            if img.mode in ("RGBA", "LA", "P"):
+                img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, "white")
+                background.paste(img, mask=img.getchannel("A"))
+                img = background
+            img.convert("RGB").save(out_name, "JPEG", quality=82, optimize=True)
+
+    def _render_pdf(self, source, size: int, out_name: str):
+        # First page only, rendered just large enough for the bucket
+        with tempfile.TemporaryDirectory(dir=self.root) as tmp:
+            subprocess.run(
+                ["pdftoppm", "-f", "1", "-l", "1", "-singlefile", "-png",
+                 "-scale-to", str(size), str(source), os.path.join(tmp, "page")],
+                check=True, capture_output=True, timeout=30,
+            )
+            self._render_image(os.path.join(tmp, "page.png"), size, out_name)
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, delta in deltas.items():
+                self._stats[key] += delta
+
+    def _scan(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for path in self.root.glob("*/*.jpg"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _added(self, nbytes: int):
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(size for _, size, _ in self._scan())
+            else:
+                self._bytes += nbytes
+            over = self._bytes > self.budget_bytes
+        if over:
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used derivatives until the cache fits its budget."""
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.budget_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._bytes = total
+            self._stats["evicted"] += evicted
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "bytes": self._bytes or 0, "budget_bytes": self.budget_bytes}
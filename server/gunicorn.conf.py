@@ -0,0 +1,48 @@
+"""Production WSGI settings.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Every setting can be overridden from the environment. The app is preloaded in
+the master, which runs the schema migrations once before forking workers.
+`kill -HUP <master>` restarts workers gracefully. Code changes need a full
+restart (or USR2 binary upgrade), because the app is preloaded.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "127.0.0.1:8000")
+
+# SQLite allows one writer at a time, so extra processes mainly help reads.
+# Threads keep long requests (uploads, /api/changes) from blocking a worker.
+workers = int(os.getenv("WEB_CONCURRENCY", min(multiprocessing.cpu_count() + 1, 8)))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+# Each /api/changes subscriber holds a thread; keep half of them for the API
+os.environ.setdefault("SSE_MAX_STREAMS", str(max(1, threads // 2)))
+
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# Recycle workers now and then so slow leaks cannot accumulate
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    from app import pool, prepare_database
+
+    prepare_database()
+    # SQLite connections must not cross fork(); workers open their own
+    pool.close_all()
+
+
+def post_fork(server, worker):
+    from app import pool
+
+    pool.close_all()
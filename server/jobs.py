@@ -0,0 +1,230 @@
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Retry delays grow 5s, 10s, 20s, ... up to JOB_MAX_BACKOFF
+JOB_BACKOFF_SECONDS = 5
+JOB_MAX_BACKOFF = 15 * 60
+# A job still "running" after this long belongs to a dead worker and is retried
+JOB_LEASE_SECONDS = 10 * 60
+
+
+class JobQueue:
+    """Persistent job queue in the `jobs` table, drained by worker threads.
+
+    enqueue() can take the caller's connection so a job commits atomically
+    with the write that needs it. Workers in any number of processes claim
+    jobs with a conditional UPDATE, so each job runs once at a time; failures
+    are retried with exponential backoff until `max_attempts`.
+    """
+
+    def __init__(self, pool, max_attempts: int = 5, poll_seconds: float = 1.0):
+        self.pool = pool
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self._handlers = {}
+        self._periodic = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+        self._stats = {}
+
+    def handler(self, kind: str):
+        def register(fn):
+            self._handlers[kind] = fn
+            return fn
+        return register
+
+    def every(self, kind: str, seconds: float):
+        """Keep one `kind` job scheduled every `seconds` (no payload)."""
+        self._periodic[kind] = seconds
+
+    def enqueue(self, kind: str, payload: dict | None = None, delay: float = 0, db=None) -> int:
+        """Add a job; with `db` it joins the caller's transaction (commit, then notify())."""
+        conn = db or self.pool.acquire()
+        try:
+            cur = conn.execute(
+                "INSERT INTO jobs (kind, payload, run_after, updated_at) VALUES (?, ?, ?, ?)",
+                (kind, json.dumps(payload or {}), time.time() + delay, time.time()),
+            )
+            if db is None:
+                conn.commit()
+        finally:
+            if db is None:
+                self.pool.release(conn)
+        if db is None:
+            self.notify()
+        return cur.lastrowid
+
+    def notify(self):
+        """Wake this process's idle workers (after committing new jobs)."""
+        self._wake.set()
+
+    # ------------------------
+    # Workers
+    # ------------------------
+    def start(self, workers: int):
+        """Start `workers` threads in this process (idempotent, fork-aware)."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid() or workers <= 0:
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self.work, name=f"jobs-{i}", daemon=True)
+                for i in range(workers)
+            ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def work(self):
+        """Worker loop: run due jobs, sleeping between polls, until stop()."""
+        while not self._stop.is_set():
+            try:
+                self._schedule_periodic()
+                ran = self.run_one()
+            except Exception:
+                logger.exception("job worker error")
+                ran = False
+            if not ran:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+    def _schedule_periodic(self):
+        if not self._periodic:
+            return
+        db = self.pool.acquire()
+        try:
+            for kind, seconds in self._periodic.items():
+                # Due when nothing of this kind is pending or finished recently
+                recent = db.execute(
+                    "SELECT 1 FROM jobs WHERE kind = ? AND "
+                    "(status IN ('queued', 'running') OR updated_at > ?) LIMIT 1",
+                    (kind, time.time() - seconds),
+                ).fetchone()
+                if recent:
+                    continue
+                db.execute("BEGIN IMMEDIATE")
+                recent = db.execute(
+                    "SELECT 1 FROM jobs WHERE kind = ? AND "
+                    "(status IN ('queued', 'running') OR updated_at > ?) LIMIT 1",
+                    (kind, time.time() - seconds),
+                ).fetchone()
+                if not recent:
+                    self.enqueue(kind, db=db)
+                db.commit()
+        finally:
+            self.pool.release(db)
+
+    def _claim(self, db):
+        now = time.time()
+        row = db.execute(
+            "SELECT id, kind, payload, attempts, status FROM jobs "
+            "WHERE (status = 'queued' AND run_after <= ?) OR (status = 'running' AND updated_at < ?) "
+            "ORDER BY run_after, id LIMIT 1",
+            (now, now - JOB_LEASE_SECONDS),
+        ).fetchone()
+        if not row:
+            return None
+        # Another worker may have claimed it since the SELECT
+        cur = db.execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? "
+            "WHERE id = ? AND status = ? AND attempts = ?",
+            (now, row["id"], row["status"], row["attempts"]),
+        )
+        db.commit()
+        return row if cur.rowcount == 1 else None
+
+    def run_one(self) -> bool:
+        """Claim and run one due job; False if none was due."""
+        db = self.pool.acquire()
+        try:
+            job = self._claim(db)
+            if job is None:
+                return False
+            kind, attempts = job["kind"], job["attempts"] + 1
+            started = time.perf_counter()
+            try:
+                handler = self._handlers[kind]
+                handler(json.loads(job["payload"]))
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if attempts >= self.max_attempts:
+                    db.execute(
+                        "UPDATE jobs SET status = 'failed', last_error = ?, updated_at = ? WHERE id = ?",
+                        (error, time.time(), job["id"]),
+                    )
+                    self._count(kind, "failed")
+                    logger.error("job %s #%s failed permanently: %s", kind, job["id"], error)
+                else:
+                    delay = min(JOB_BACKOFF_SECONDS * 2 ** (attempts - 1), JOB_MAX_BACKOFF)
+                    db.execute(
+                        "UPDATE jobs SET status = 'queued', last_error = ?, run_after = ?, updated_at = ? "
+                        "WHERE id = ?",
+                        (error, time.time() + delay, time.time(), job["id"]),
+                    )
+                    self._count(kind, "retried")
+                    logger.warning("job %s #%s failed (attempt %s), retrying in %ss: %s",
+                                   kind, job["id"], attempts, delay, error)
+            else:
+                db.execute(
+                    "UPDATE jobs SET status = 'done', last_error = NULL, updated_at = ? WHERE id = ?",
+                    (time.time(), job["id"]),
+                )
+                self._count(kind, "done")
+            db.commit()
+            self._count(kind, "seconds", time.perf_counter() - started)
+            return True
+        finally:
+            self.pool.release(db)
+
+    def run_pending(self) -> int:
+        """Run due jobs on the calling thread until none are left."""
+        count = 0
+        while self.run_one():
+            count += 1
+        return count
+
+    # ------------------------
+    # Stats
+    # ------------------------
+    def _count(self, kind: str, key: str, delta: float = 1):
+        with self._lock:
+            per_kind = self._stats.setdefault(kind, {"done": 0, "retried": 0, "failed": 0, "seconds": 0.0})
+            per_kind[key] += delta
+
+    def stats(self) -> dict:
+        """Per-kind outcomes in this process, plus queue depth by status."""
+        db = self.pool.acquire()
+        try:
+            depth = dict(db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        finally:
+            self.pool.release(db)
+        with self._lock:
+            return {"processed": {k: dict(v) for k, v in self._stats.items()}, "queue": depth}
+
+    def prune(self, older_than: float):
+        """Delete finished jobs last updated more than `older_than` seconds ago."""
+        db = self.pool.acquire()
+        try:
+            db.execute(
+                "DELETE FROM jobs WHERE status = 'done' AND updated_at < ?",
+                (time.time() - older_than,),
+            )
+            db.commit()
+        finally:
+            self.pool.release(db)
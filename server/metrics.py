@@ -0,0 +1,81 @@
+import threading
+
+# Request latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_str(labels: tuple) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metrics:
+    """Thread-safe counters, gauges and histograms rendered in Prometheus text format.
+
+    Values live in the process that recorded them; with several Gunicorn
+    workers each worker reports its own numbers and the scraper sums them.
+    """
+
+    def __init__(self, prefix: str = "taskon", buckets: tuple = DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._meta: dict[str, tuple[str, str]] = {}
+        self._values: dict[str, dict[tuple, float]] = {}
+        self._hists: dict[str, dict[tuple, list]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._meta[name] = (kind, help_text)
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values.setdefault(name, {})[key] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._hists.setdefault(name, {})
+            # [count per bucket..., +Inf count, sum]
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    hist[i] += 1
+            hist[-2] += 1
+            hist[-1] += value
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name in sorted(set(self._values) | set(self._hists)):
+                full = f"{self.prefix}_{name}"
+                kind, help_text = self._meta.get(name, ("untyped", ""))
+                if help_text:
+                    lines.append(f"# HELP {full} {help_text}")
+                lines.append(f"# TYPE {full} {kind}")
+                for key, value in sorted(self._values.get(name, {}).items()):
+                    lines.append(f"{full}{_label_str(key)} {_fmt(value)}")
+                for key, hist in sorted(self._hists.get(name, {}).items()):
+                    for bound, count in zip(self.buckets, hist):
+                        lines.append(f"{full}_bucket{_label_str(key + (('le', bound),))} {count}")
+                    lines.append(f"{full}_bucket{_label_str(key + (('le', '+Inf'),))} {hist[-2]}")
+                    lines.append(f"{full}_sum{_label_str(key)} {_fmt(hist[-1])}")
+                    lines.append(f"{full}_count{_label_str(key)} {hist[-2]}")
+        return "\n".join(lines) + "\n"
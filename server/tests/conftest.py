@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+
+# app.py reads its configuration at import time: point it at a scratch
+# database and upload folder before the first test imports it
+TEST_ROOT = tempfile.mkdtemp(prefix="taskon-tests-")
+os.environ["DB_PATH"] = os.path.join(TEST_ROOT, "todo.db")
+os.environ["UPLOAD_ROOT"] = os.path.join(TEST_ROOT, "uploaded_files")
+os.environ["JOB_WORKERS"] = "0"  # tests run jobs explicitly with jobs.run_pending()
+sys.path.insert(0, str(SERVER_DIR))
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import app, prepare_database
+
+    app.config["TESTING"] = True
+    prepare_database()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_list(client):
+    """Create a list and return its id."""
+    def make(name: str = "Test list") -> int:
+        resp = client.post("/api/lists", json={"name": name})
+        assert resp.status_code == 201
+        return resp.get_json()["id"]
+    return make
+
+
+@pytest.fixture
+def make_todos(client):
+    """Create `count` todos in a list (via /api/batch) and return their ids, top first."""
+    def make(list_id: int, count: int, title: str = "card") -> list[int]:
+        ops = [{"op": "create", "list_id": list_id, "title": f"{title} {i}"} for i in range(count)]
+        resp = client.post("/api/batch", json={"ops": ops})
+        assert resp.status_code == 200
+        return [t["id"] for t in client.get(f"/api/lists/{list_id}/todos").get_json()]
+    return make
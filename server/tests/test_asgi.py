@@ -0,0 +1,84 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+asgi = pytest.importorskip("asgi")
+
+
+def asgi_request(method, path, chunks=(), headers=(), query=b""):
+    """Drive asgi.application like a server would; returns (status, headers, body)."""
+    messages = [{"type": "http.request", "body": c, "more_body": True} for c in chunks]
+    messages.append({"type": "http.request", "body": b"", "more_body": False})
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()  # no disconnect: block until cancelled
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": method, "path": path, "query_string": query,
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers],
+        "http_version": "1.1", "scheme": "http",
+    }
+    asyncio.run(asgi.application(scope, receive, send))
+    start = next(m for m in sent if m["type"] == "http.response.start")
+    body = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    return start["status"], dict((k.decode(), v.decode()) for k, v in start["headers"]), body
+
+
+def test_chunked_request_body_reaches_flask(app):
+    # No Content-Length header, body split over several receive() messages
+    payload = json.dumps({"name": "via chunked ASGI"}).encode()
+    status, _, body = asgi_request(
+        "POST", "/api/lists", [payload[:5], payload[5:]],
+        headers=[("Content-Type", "application/json"), ("Transfer-Encoding", "chunked")],
+    )
+    assert status == 201
+    assert json.loads(body)["name"] == "via chunked ASGI"
+
+
+def test_chunked_upload_part(app):
+    status, _, body = asgi_request(
+        "POST", "/api/uploads", [json.dumps({"name": "notes.txt", "size": 6}).encode()],
+        headers=[("Content-Type", "application/json")],
+    )
+    assert status == 201, body
+    session = json.loads(body)["id"]
+    status, _, body = asgi_request(
+        "PUT", f"/api/uploads/{session}/parts/1", [b"abc", b"def"],
+        headers=[("Transfer-Encoding", "chunked")],
+    )
+    assert status == 200, body
+
+
+def test_bridge_applies_the_routes_own_body_limit(app, monkeypatch):
+    monkeypatch.setitem(app.config, "MAX_CONTENT_LENGTH", 64)
+    body = json.dumps({"type": "meta", "format": "taskon", "version": 1}).encode() + b"\n"
+    body += json.dumps({"type": "list", "id": 1, "name": "y" * 100}).encode() + b"\n"
+    status, _, resp = asgi_request(
+        "POST", "/api/import", [body], headers=[("Content-Type", "application/x-ndjson")],
+    )
+    assert status == 200, resp
+    # Other routes keep the global limit
+    status, _, _ = asgi_request(
+        "POST", "/api/lists", [json.dumps({"name": "z" * 100}).encode()],
+        headers=[("Content-Type", "application/json")],
+    )
+    assert status == 413
+
+
+
+def test_bridge_leaves_the_date_header_to_the_server(app, client):
+    stored = client.post("/api/files", data={"file": (io.BytesIO(bytes(range(256)) * 8), "dated.zip")},
+                         content_type="multipart/form-data").get_json()
+    # Werkzeug dates conditional responses; uvicorn adds its own Date as well
+    assert "Date" in client.get(f"/api/files/{stored['id']}").headers
+    status, headers, _ = asgi_request("GET", f"/api/files/{stored['id']}")
+    assert status == 200
+    assert "date" not in headers and "etag" in headers
@@ -0,0 +1,88 @@
+def _todos(client, list_id):
+    return {t["id"]: t for t in client.get(f"/api/lists/{list_id}/todos").get_json()}
+
+
+def test_batch_applies_ops_in_order(client, make_list, make_todos):
+    list_id = make_list()
+    other = make_list("Other")
+    a, b, c = make_todos(list_id, 3)
+    resp = client.post("/api/batch", json={"ops": [
+        {"op": "update", "id": a, "done": True},
+        {"op": "update", "id": b, "done": True},
+        {"op": "delete", "id": c},
+        {"op": "move", "id": b, "list_id": other},
+        {"op": "create", "list_id": list_id, "title": "new", "after_id": a},
+    ]})
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["ok"] is True
+    assert [r["op"] for r in body["results"]] == ["update", "update", "delete", "move", "create"]
+
+    todos = _todos(client, list_id)
+    new_id = body["results"][-1]["id"]
+    assert list(todos) == [a, new_id]
+    assert todos[a]["done"] == 1
+    assert list(_todos(client, other)) == [b]
+
+
+def test_failing_op_rolls_back_the_whole_batch(client, make_list, make_todos):
+    list_id = make_list()
+    a, b = make_todos(list_id, 2)
+    before = _todos(client, list_id)
+    resp = client.post("/api/batch", json={"ops": [
+        {"op": "update", "id": a, "title": "renamed"},
+        {"op": "delete", "id": b},
+        {"op": "create", "list_id": list_id, "title": "new"},
+        {"op": "update", "id": 10**9, "done": True},
+    ]})
+    assert resp.status_code == 400
+    body = resp.get_json()
+    assert body["ok"] is False
+    assert body["index"] == 3
+    assert _todos(client, list_id) == before
+
+
+def test_error_names_the_failing_op_inside_a_run(client, make_list, make_todos):
+    list_id = make_list()
+    ids = make_todos(list_id, 3)
+    ops = [{"op": "delete", "id": i} for i in ids]
+    ops.insert(2, {"op": "delete", "id": 10**9})
+    resp = client.post("/api/batch", json={"ops": ops})
+    assert resp.status_code == 400
+    assert resp.get_json()["index"] == 2
+    assert list(_todos(client, list_id)) == ids
+
+
+def test_invalid_batches_are_rejected(client, make_list, monkeypatch):
+    import app as app_module
+
+    list_id = make_list()
+    assert client.post("/api/batch", json={"ops": "nope"}).status_code == 400
+    resp = client.post("/api/batch", json={"ops": [{"op": "explode"}]})
+    assert resp.status_code == 400 and resp.get_json()["index"] == 0
+    resp = client.post("/api/batch", json={"ops": [{"op": "create", "list_id": list_id}]})
+    assert resp.status_code == 400 and resp.get_json()["index"] == 0
+
+    monkeypatch.setattr(app_module, "MAX_BATCH_OPS", 2)
+    ops = [{"op": "create", "list_id": list_id, "title": str(i)} for i in range(3)]
+    resp = client.post("/api/batch", json={"ops": ops})
+    assert resp.status_code == 400
+    assert "At most 2" in resp.get_json()["error"]
+    assert _todos(client, list_id) == {}
+
+
+def test_error_names_the_op_that_fails_validation_inside_a_run(client, make_list, make_todos):
+    list_id = make_list()
+    ids = make_todos(list_id, 3)
+    ops = [{"op": "update", "id": i, "title": f"renamed {i}"} for i in ids]
+    ops[2]["title"] = "   "
+    resp = client.post("/api/batch", json={"ops": ops})
+    assert resp.status_code == 400
+    assert resp.get_json()["index"] == 2
+    assert resp.get_json()["error"] == "Title is required"
+
+    ops = [{"op": "delete", "id": ids[0]}, {"op": "delete", "id": ids[1]}, {"op": "delete"}]
+    resp = client.post("/api/batch", json={"ops": ops})
+    assert resp.status_code == 400
+    assert resp.get_json() == {"ok": False, "error": "Missing field: id", "index": 2}
+    assert list(_todos(client, list_id)) == ids
@@ -0,0 +1,33 @@
+import json
+import subprocess
+import sys
+
+import bench
+from conftest import SERVER_DIR
+
+
+def test_in_process_run_completes_every_scenario(tmp_path):
+    out = tmp_path / "run.json"
+    proc = subprocess.run(
+        [sys.executable, "bench.py", "--todos", "60", "--iterations", "3", "--file-mb", "1", "--out", str(out)],
+        cwd=SERVER_DIR, capture_output=True, text=True, timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr
+    results = json.loads(out.read_text())
+    assert results["meta"]["todos"] == 60
+    offline = [s for s in bench.SCENARIOS if s not in bench.HTTP_ONLY]
+    assert list(results["results"]) == offline
+    for name, stats in results["results"].items():
+        assert "error" not in stats, (name, stats)
+        assert stats["p50_ms"] <= stats["p95_ms"]
+
+
+def test_compare_flags_p50_regressions_over_the_threshold():
+    baseline = {"results": {"board": {"p50_ms": 10.0}, "search": {"p50_ms": 10.0}, "new": {}}}
+    results = {"results": {
+        "board": {"p50_ms": 12.0},
+        "search": {"p50_ms": 13.0},
+        "new": {"p50_ms": 1.0},
+        "export": {"error": "boom"},
+    }}
+    assert bench.compare(results, baseline, threshold=0.25) == ["search"]
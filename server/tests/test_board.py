@@ -0,0 +1,28 @@
+def test_board_groups_todos_by_list(client, make_list, make_todos):
+    list_id = make_list("Board list")
+    ids = make_todos(list_id, 3)
+    board = client.get("/api/board").get_json()
+    assert any(l["id"] == list_id for l in board["lists"])
+    assert [t["id"] for t in board["todos"][str(list_id)]] == ids
+    assert [t["position"] for t in board["todos"][str(list_id)]] == [0, 1, 2]
+
+
+def test_unchanged_board_revalidates_with_304(client, make_list):
+    make_list()
+    first = client.get("/api/board")
+    etag = first.headers["ETag"]
+    again = client.get("/api/board", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+
+
+def test_any_write_changes_the_board_etag(client, make_list, make_todos):
+    list_id = make_list()
+    (todo_id,) = make_todos(list_id, 1)
+    etag = client.get("/api/board").headers["ETag"]
+    client.patch(f"/api/todos/{todo_id}", json={"done": True})
+    resp = client.get("/api/board", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+    assert resp.get_json()["revision"] > int(etag.strip('W/"').split("-")[1])
+
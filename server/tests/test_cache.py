@@ -0,0 +1,32 @@
+def _titles(resp):
+    return [t["title"] for t in resp.get_json()]
+
+
+def test_list_todos_are_cached_until_a_write(client, make_list, make_todos):
+    list_id = make_list()
+    make_todos(list_id, 2)
+
+    first = client.get(f"/api/lists/{list_id}/todos")
+    again = client.get(f"/api/lists/{list_id}/todos")
+    assert again.headers["X-Cache"] == "HIT"
+    assert again.data == first.data
+
+    client.post(f"/api/lists/{list_id}/todos", json={"title": "fresh"})
+    after = client.get(f"/api/lists/{list_id}/todos")
+    assert after.headers["X-Cache"] == "MISS"
+    assert "fresh" in _titles(after)
+
+
+def test_moving_a_card_invalidates_the_list_it_left(client, make_list, make_todos):
+    source, target = make_list("source"), make_list("target")
+    (todo_id,) = make_todos(source, 1, "mover")
+    # Warm both lists' entries
+    client.get(f"/api/lists/{source}/todos")
+    client.get(f"/api/lists/{target}/todos")
+
+    resp = client.post(f"/api/todos/{todo_id}/move", json={"list_id": target})
+    assert resp.status_code == 200
+
+    assert _titles(client.get(f"/api/lists/{source}/todos")) == []
+    assert _titles(client.get(f"/api/lists/{target}/todos")) == ["mover 0"]
+
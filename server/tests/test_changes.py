@@ -0,0 +1,93 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+
+def test_change_stream_resumes_after_last_event_id(app, client, make_list):
+    import app as app_module
+
+    app_module.change_feed.publish()
+    last = app_module.change_feed.latest_id()
+    make_list("streamed")
+    stream = client.get("/api/changes", headers={"Last-Event-ID": str(last)})
+    try:
+        chunks = iter(stream.response)
+        assert next(chunks).startswith(b"retry:")
+        event = next(chunks).decode()
+        assert f"id: {last + 1}\n" in event
+        data = json.loads(event.split("data: ", 1)[1])
+        assert (data["entity"], data["op"], data["data"]["name"]) == ("lists", "insert", "streamed")
+    finally:
+        stream.close()
+
+
+def test_change_stream_rejects_bad_last_event_id(client):
+    assert client.get("/api/changes", headers={"Last-Event-ID": "x"}).status_code == 400
+
+
+def test_wsgi_change_streams_are_capped(app, client, monkeypatch):
+    import app as app_module
+
+    monkeypatch.setattr(app_module, "sse_slots", threading.BoundedSemaphore(1))
+    first = client.get("/api/changes")
+    assert first.status_code == 200
+    second = client.get("/api/changes")
+    assert second.status_code == 503
+    assert second.headers["Retry-After"]
+    first.close()  # the slot is given back when the stream closes
+    third = client.get("/api/changes")
+    assert third.status_code == 200
+    third.close()
+
+
+def test_asgi_change_streams_do_not_hold_pool_threads(app, monkeypatch):
+    asgi = pytest.importorskip("asgi")
+    from concurrent.futures import ThreadPoolExecutor
+
+    # One thread for the Flask app: a stream that kept it would starve /api/health
+    monkeypatch.setattr(asgi, "executor", ThreadPoolExecutor(max_workers=1))
+
+    def scope(path, method="GET"):
+        return {"type": "http", "method": method, "path": path, "query_string": b"",
+                "headers": [], "http_version": "1.1", "scheme": "http"}
+
+    async def run():
+        sent = []
+        disconnect = asyncio.Event()
+
+        def stream_receive():
+            messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                await disconnect.wait()
+                return {"type": "http.disconnect"}
+            return receive
+
+        async def stream_send(message):
+            sent.append(message)
+
+        streams = [
+            asyncio.create_task(asgi.application(scope("/api/changes"), stream_receive(), stream_send))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0.2)
+
+        health = []
+
+        async def send(message):
+            health.append(message)
+
+        await asyncio.wait_for(asgi.application(scope("/api/health"), stream_receive(), send), timeout=5)
+        disconnect.set()
+        await asyncio.wait_for(asyncio.gather(*streams), timeout=5)
+        return sent, health
+
+    sent, health = asyncio.run(run())
+    assert health[0]["status"] == 200
+    starts = [m for m in sent if m["type"] == "http.response.start"]
+    assert [m["status"] for m in starts] == [200, 200, 200]
+    assert any(m.get("body", b"").startswith(b"retry:") for m in sent)
@@ -0,0 +1,116 @@
+import gzip
+import io
+
+from werkzeug.http import parse_accept_header
+
+import compression
+
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+def _big_list(client, make_list, make_todos, count=60):
+    list_id = make_list()
+    make_todos(list_id, count, title="a reasonably long card title to compress")
+    return list_id
+
+
+def test_compress_round_trips():
+    data = b"hello compression " * 200
+    for encoding in compression.ENCODINGS:
+        body = compression.compress(data, encoding)
+        streamed = b"".join(compression.compress_stream(iter([data[:100], data[100:]]), encoding))
+        assert len(body) < len(data)
+        if encoding == "gzip":
+            assert gzip.decompress(body) == gzip.decompress(streamed) == data
+    assert compression.compress(data, "gzip") == compression.compress(data, "gzip")  # mtime=0
+
+
+def test_negotiation_honours_q_values():
+    accept = parse_accept_header("gzip;q=1, identity;q=0.5, br;q=0, zstd;q=0")
+    assert compression.negotiate(accept) == "gzip"
+    assert compression.negotiate(parse_accept_header("deflate")) is None
+    assert compression.negotiate(None) is None
+
+
+def test_large_json_is_gzipped_and_small_is_not(client, make_list, make_todos):
+    list_id = _big_list(client, make_list, make_todos)
+    plain = client.get(f"/api/lists/{list_id}/todos")
+    assert "Content-Encoding" not in plain.headers
+    assert len(plain.data) >= 1024
+
+    resp = client.get(f"/api/lists/{list_id}/todos", headers=GZIP)
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert gzip.decompress(resp.data) == plain.data
+
+    small = client.get(f"/api/lists/{make_list()}/todos", headers=GZIP)
+    assert "Content-Encoding" not in small.headers
+    assert "Accept-Encoding" in small.headers["Vary"]
+
+
+def test_compression_can_be_left_to_the_proxy(client, make_list, make_todos, monkeypatch):
+    import app as app_module
+
+    list_id = _big_list(client, make_list, make_todos)
+    monkeypatch.setattr(app_module, "COMPRESS_RESPONSES", False)
+    resp = client.get(f"/api/lists/{list_id}/todos", headers=GZIP)
+    assert "Content-Encoding" not in resp.headers
+    assert resp.get_json()
+
+
+def test_cached_compressed_variant_is_invalidated_by_writes(client, make_list, make_todos):
+    list_id = _big_list(client, make_list, make_todos)
+    url = f"/api/lists/{list_id}/todos"
+    client.get(url, headers=GZIP)
+    hit = client.get(url, headers=GZIP)
+    assert hit.headers["X-Cache"] == "HIT"
+    todo_id = client.get(url).get_json()[0]["id"]
+
+    client.patch(f"/api/todos/{todo_id}", json={"title": "renamed after caching"})
+    resp = client.get(url, headers=GZIP)
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert b"renamed after caching" in gzip.decompress(resp.data)
+
+
+def test_streamed_todos_are_compressed_incrementally(client, make_list, make_todos):
+    _big_list(client, make_list, make_todos)
+    resp = client.get("/api/todos", headers=GZIP)
+    assert resp.is_streamed
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(resp.data) == client.get("/api/todos").data
+
+
+def test_compressed_board_still_revalidates(client, make_list, make_todos):
+    _big_list(client, make_list, make_todos)
+    first = client.get("/api/board", headers=GZIP)
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert first.headers["ETag"].startswith('W/"')
+    again = client.get("/api/board", headers={**GZIP, "If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_stored_compressed_blob_downloads_either_way(client, monkeypatch):
+    import app as app_module
+
+    monkeypatch.setattr(app_module, "STORE_COMPRESSED", True)
+    text = b"line of very compressible notes\n" * 2000
+    stored = client.post("/api/files", data={"file": (io.BytesIO(text), "notes.txt")},
+                         content_type="multipart/form-data").get_json()
+    app_module.jobs.run_pending()
+    db = app_module.pool.acquire()
+    try:
+        row = db.execute("SELECT path, encoding FROM files WHERE id = ?", (stored["id"],)).fetchone()
+    finally:
+        app_module.pool.release(db)
+    assert row["encoding"] == "gzip" and row["path"].endswith(".gz")
+
+    url = f"/api/files/{stored['id']}"
+    passthrough = client.get(url, headers=GZIP)
+    assert passthrough.headers["Content-Encoding"] == "gzip"
+    assert passthrough.headers["ETag"] == f'"{stored["checksum"]}.gz"'
+    assert gzip.decompress(passthrough.data) == text
+
+    plain = client.get(url)
+    assert "Content-Encoding" not in plain.headers
+    assert plain.headers["Content-Length"] == str(len(text))
+    assert plain.data == text
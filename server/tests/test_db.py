@@ -0,0 +1,50 @@
+from db import ConnectionPool
+
+
+def test_pool_reuses_connections_with_pragmas_applied(tmp_path):
+    pool = ConnectionPool(tmp_path / "pool.db", max_idle=2)
+    conn = pool.acquire()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+    pool.release(conn)
+    assert pool.acquire() is conn
+    stats = pool.stats()
+    assert (stats["created"], stats["reused"], stats["in_use"]) == (1, 1, 1)
+    pool.release(conn)
+    pool.close_all()
+
+
+def test_release_rolls_back_open_transactions(tmp_path):
+    pool = ConnectionPool(tmp_path / "pool.db")
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (x)")
+    conn.commit()
+    conn.execute("INSERT INTO t VALUES (1)")
+    pool.release(conn)  # a request that failed before committing
+    conn = pool.acquire()
+    assert not conn.in_transaction
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    pool.release(conn)
+    pool.close_all()
+
+
+def test_pool_keeps_at_most_max_idle_connections(tmp_path):
+    pool = ConnectionPool(tmp_path / "pool.db", max_idle=1)
+    conns = [pool.acquire() for _ in range(3)]
+    for conn in conns:
+        pool.release(conn)
+    stats = pool.stats()
+    assert (stats["idle"], stats["discarded"], stats["in_use"]) == (1, 2, 0)
+    pool.close_all()
+
+
+def test_request_connections_are_returned_to_the_pool(client):
+    import app as app_module
+
+    client.get("/api/lists")
+    in_use = app_module.pool.stats()["in_use"]
+    for _ in range(5):
+        assert client.get("/api/lists").status_code == 200
+    assert app_module.pool.stats()["in_use"] == in_use
+    assert client.get("/api/debug/pool").get_json()["reused"] > 0
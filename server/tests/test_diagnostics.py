@@ -0,0 +1,44 @@
+import pstats
+
+import pytest
+
+
+@pytest.fixture
+def app_module():
+    import app as app_module
+
+    app_module.slow_queries.clear()
+    yield app_module
+    app_module.slow_queries.clear()
+
+
+def test_slow_queries_are_logged_with_their_plan(client, make_list, make_todos, app_module, monkeypatch):
+    list_id = make_list()
+    client.get(f"/api/lists/{list_id}/todos")
+    assert client.get("/api/debug/slow-queries").get_json() == []
+
+    monkeypatch.setattr(app_module, "SLOW_QUERY_MS", 0.0)
+    make_todos(list_id, 2)  # also drops the cached list so the GET below queries
+    assert client.get(f"/api/lists/{list_id}/todos").status_code == 200
+    entries = client.get("/api/debug/slow-queries").get_json()
+    entry = next(e for e in entries if e["sql"] == " ".join(app_module.LIST_TODOS_SQL.split()))
+    assert entry["route"] == "/api/lists/<int:list_id>/todos"
+    assert str(list_id) in entry["params"]
+    assert any("idx_todos_list_rank" in step for step in entry["plan"])
+    assert "BEGIN" not in {e["sql"].split()[0] for e in entries}
+
+
+def test_profile_dump_on_request(client, make_list, app_module, monkeypatch, tmp_path):
+    list_id = make_list()
+    monkeypatch.setattr(app_module, "PROFILE_DIR", tmp_path)
+
+    assert "X-Profile-File" not in client.get(f"/api/lists/{list_id}/todos").headers
+    resp = client.get(f"/api/lists/{list_id}/todos", headers={"X-Profile": "1"})
+    name = resp.headers["X-Profile-File"]
+    assert name.endswith(".prof") and "GET-api_lists_int_list_id_todos" in name
+    stats = pstats.Stats(str(tmp_path / name))
+    assert any(func[2] == "list_todos_in_list" for func in stats.stats)
+
+    monkeypatch.setattr(app_module, "PROFILE_ALL", True)
+    assert "X-Profile-File" in client.get("/api/lists").headers
+    assert len(list(tmp_path.glob("*.prof"))) == 2
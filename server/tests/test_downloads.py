@@ -0,0 +1,64 @@
+import io
+
+import pytest
+
+BODY = bytes(range(256)) * 40  # binary, so no at-rest or transfer compression applies
+
+
+@pytest.fixture
+def stored(client):
+    resp = client.post("/api/files", data={"file": (io.BytesIO(BODY), "data.zip")},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 201, resp.get_json()
+    return resp.get_json()
+
+
+def test_full_download_carries_checksum_etag(client, stored):
+    resp = client.get(f"/api/files/{stored['id']}")
+    assert resp.status_code == 200
+    assert resp.data == BODY
+    assert resp.headers["Accept-Ranges"] == "bytes"
+    assert resp.get_etag()[0] == stored["checksum"]
+    assert "attachment" in resp.headers["Content-Disposition"]
+
+    again = client.get(f"/api/files/{stored['id']}", headers={"If-None-Match": f'"{stored["checksum"]}"'})
+    assert again.status_code == 304
+
+
+def test_range_requests(client, stored):
+    resp = client.get(f"/api/files/{stored['id']}", headers={"Range": "bytes=100-199"})
+    assert resp.status_code == 206
+    assert resp.data == BODY[100:200]
+    assert resp.headers["Content-Range"] == f"bytes 100-199/{len(BODY)}"
+
+    tail = client.get(f"/api/files/{stored['id']}", headers={"Range": "bytes=-10"})
+    assert tail.data == BODY[-10:]
+
+    unsatisfiable = client.get(f"/api/files/{stored['id']}", headers={"Range": f"bytes={len(BODY)}-"})
+    assert unsatisfiable.status_code == 416
+
+
+def test_if_range_with_stale_etag_sends_the_whole_file(client, stored):
+    resp = client.get(f"/api/files/{stored['id']}",
+                      headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert resp.status_code == 200
+    assert resp.data == BODY
+
+
+@pytest.mark.parametrize("mode, header", [("x-accel", "X-Accel-Redirect"), ("x-sendfile", "X-Sendfile")])
+def test_offloaded_downloads_send_no_body(client, stored, monkeypatch, mode, header):
+    import app as app_module
+
+    monkeypatch.setattr(app_module, "FILE_SERVE_MODE", mode)
+    resp = client.get(f"/api/files/{stored['id']}")
+    assert resp.status_code == 200
+    assert resp.data == b""
+    checksum = stored["checksum"]
+    if mode == "x-accel":
+        assert resp.headers[header] == f"{app_module.X_ACCEL_PREFIX}{checksum[:2]}/{checksum}"
+    else:
+        assert resp.headers[header] == str(app_module.blob_path(checksum))
+
+
+def test_missing_file_is_404(client):
+    assert client.get("/api/files/999999999").status_code == 404
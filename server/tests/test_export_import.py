@@ -0,0 +1,80 @@
+import io
+import json
+import tarfile
+
+META = {"type": "meta", "format": "taskon", "version": 1}
+
+
+def _ndjson(*records):
+    return b"".join(json.dumps(r).encode() + b"\n" for r in records)
+
+
+def test_export_import_round_trip(client, make_list, make_todos):
+    list_id = make_list("Round trip")
+    make_todos(list_id, 3, "exported")
+    export = client.get("/api/export")
+    assert export.status_code == 200
+    lines = [json.loads(line) for line in export.data.splitlines()]
+    assert lines[0]["type"] == "meta"
+    before = sum(1 for r in lines if r["type"] == "todo")
+
+    resp = client.post("/api/import", data=export.data, content_type="application/x-ndjson")
+    assert resp.status_code == 200, resp.get_json()
+    assert resp.get_json()["todos"] == before
+
+    after = [json.loads(line) for line in client.get("/api/export").data.splitlines()]
+    titles = [r["title"] for r in after if r["type"] == "todo"]
+    assert titles.count("exported 0") == 2  # the original and the imported copy
+    assert sum(1 for r in after if r["type"] == "list" and r["name"] == "Round trip") == 2
+
+
+def test_tar_import_requires_the_workspace_member(client):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        info = tarfile.TarInfo("readme.txt")
+        info.size = 2
+        tar.addfile(info, io.BytesIO(b"hi"))
+    resp = client.post("/api/import", data=buf.getvalue(), content_type="application/x-tar")
+    assert resp.status_code == 400
+
+
+def test_import_rejects_empty_body(client):
+    resp = client.post("/api/import", data=b"", content_type="application/x-ndjson")
+    assert resp.status_code == 400
+
+
+def test_import_rejects_records_without_meta_header(client):
+    body = _ndjson({"type": "list", "id": 1, "name": "No header"})
+    resp = client.post("/api/import", data=body, content_type="application/x-ndjson")
+    assert resp.status_code == 400
+    assert resp.get_json()["imported"]["lists"] == 0
+
+
+def test_import_rejects_foreign_meta_header(client):
+    body = _ndjson({"type": "meta", "format": "other", "version": 1})
+    resp = client.post("/api/import", data=body, content_type="application/x-ndjson")
+    assert resp.status_code == 400
+
+
+def test_import_accepts_bodies_over_the_upload_limit(app, client, monkeypatch):
+    # A tiny global limit stands in for a > 50 MB export
+    monkeypatch.setitem(app.config, "MAX_CONTENT_LENGTH", 64)
+    body = _ndjson(META, {"type": "list", "id": 1, "name": "x" * 100})
+    resp = client.post("/api/import", data=body, content_type="application/x-ndjson")
+    assert resp.status_code == 200, resp.get_json()
+    assert resp.get_json()["lists"] == 1
+
+
+def test_orphan_todo_recreates_a_deleted_inbox(client):
+    inbox = next((l for l in client.get("/api/lists").get_json() if l["name"] == "Inbox"), None)
+    if inbox is not None:
+        assert client.delete(f"/api/lists/{inbox['id']}").status_code == 204
+
+    body = _ndjson(META, {"type": "todo", "id": 1, "list_id": 999, "title": "orphan card"})
+    resp = client.post("/api/import", data=body, content_type="application/x-ndjson")
+    assert resp.status_code == 200, resp.get_json()
+    assert resp.get_json()["lists"] == 1 and resp.get_json()["todos"] == 1
+
+    inbox = next(l for l in client.get("/api/lists").get_json() if l["name"] == "Inbox")
+    titles = [t["title"] for t in client.get(f"/api/lists/{inbox['id']}/todos").get_json()]
+    assert titles == ["orphan card"]
@@ -0,0 +1,63 @@
+import datetime
+import json
+import sqlite3
+
+import pytest
+
+import fastjson
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def provider(request, app, monkeypatch):
+    if request.param == "orjson":
+        if fastjson.orjson is None:
+            pytest.skip("orjson not installed")
+    else:
+        monkeypatch.setattr(fastjson, "orjson", None)
+    return fastjson.FastJSONProvider(app)
+
+
+@pytest.fixture
+def rows():
+    db = sqlite3.connect(":memory:")
+    db.row_factory = sqlite3.Row
+    db.execute("CREATE TABLE t (id INTEGER, title TEXT, done INTEGER)")
+    db.executemany("INSERT INTO t VALUES (?, ?, ?)", [(i, f"ä {i}", i % 2) for i in range(7)])
+    yield db
+    db.close()
+
+
+def test_dumps_matches_the_stdlib_encoding(provider, rows):
+    row = rows.execute("SELECT id, title FROM t WHERE id = 3").fetchone()
+    when = datetime.datetime(2024, 5, 1, 12, 0, tzinfo=datetime.timezone.utc)
+    obj = {"row": row, "ids": {1: "one"}, "when": when}
+    assert json.loads(provider.dumps_bytes(obj)) == {
+        "row": {"id": 3, "title": "ä 3"},
+        "ids": {"1": "one"},
+        "when": "Wed, 01 May 2024 12:00:00 GMT",
+    }
+    assert provider.loads(provider.dumps({"a": [1, 2]})) == {"a": [1, 2]}
+
+
+def test_stream_array_batches_and_projects(provider, rows):
+    expected = [{"title": f"ä {i}", "id": i} for i in range(7)]
+    chunks = list(provider.stream_array(rows.execute("SELECT * FROM t ORDER BY id"), ("title", "id"), batch_size=3))
+    assert len(chunks) == 5  # "[", three batches, "]"
+    assert json.loads(b"".join(chunks)) == expected
+    assert list(json.loads(b"".join(chunks))[0]) == ["title", "id"]
+    assert provider.encode_rows(rows.execute("SELECT * FROM t WHERE id < 0")) == b"[]"
+
+
+def test_stream_ndjson_writes_one_object_per_line(provider, rows):
+    body = b"".join(provider.stream_ndjson(rows.execute("SELECT id, done FROM t ORDER BY id"), batch_size=4))
+    assert [json.loads(line) for line in body.splitlines()] == [{"id": i, "done": i % 2} for i in range(7)]
+
+
+def test_unbounded_todos_are_streamed_in_board_order(client, make_list, make_todos):
+    list_id = make_list()
+    ids = make_todos(list_id, 30)
+    resp = client.get("/api/todos", query_string={"fields": "id,list_id"})
+    assert resp.is_streamed
+    todos = [t for t in resp.get_json() if t["list_id"] == list_id]
+    assert todos == [{"id": i, "list_id": list_id} for i in ids]
+    assert client.get("/api/todos", query_string={"fields": "id,nope"}).status_code == 400
@@ -0,0 +1,38 @@
+import os
+import runpy
+
+from conftest import SERVER_DIR
+
+CONF = str(SERVER_DIR / "gunicorn.conf.py")
+
+
+def test_settings_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    monkeypatch.setenv("GUNICORN_THREADS", "6")
+    monkeypatch.setenv("GUNICORN_MAX_REQUESTS", "500")
+    monkeypatch.delenv("SSE_MAX_STREAMS", raising=False)
+    conf = runpy.run_path(CONF)
+    assert (conf["workers"], conf["threads"], conf["worker_class"]) == (3, 6, "gthread")
+    assert conf["preload_app"] is True
+    assert conf["max_requests_jitter"] == 50
+    # Half of each worker's threads may hold /api/changes streams
+    assert os.environ["SSE_MAX_STREAMS"] == "3"
+
+
+def test_explicit_sse_limit_is_kept(monkeypatch):
+    monkeypatch.setenv("GUNICORN_THREADS", "8")
+    monkeypatch.setenv("SSE_MAX_STREAMS", "1")
+    runpy.run_path(CONF)
+    assert os.environ["SSE_MAX_STREAMS"] == "1"
+
+
+def test_master_migrates_and_leaves_no_connections_to_fork(app, monkeypatch):
+    import app as app_module
+
+    monkeypatch.delenv("SSE_MAX_STREAMS", raising=False)
+    conf = runpy.run_path(CONF)
+    conf["on_starting"](None)
+    assert app_module.pool.stats()["idle"] == 0
+    app_module.pool.release(app_module.pool.acquire())
+    conf["post_fork"](None, None)
+    assert app_module.pool.stats()["idle"] == 0
@@ -0,0 +1,125 @@
+import io
+import os
+import time
+import uuid
+from pathlib import Path
+
+import pytest
+
+import jobs as jobs_module
+
+
+@pytest.fixture
+def app_module(app):
+    import app as app_module
+
+    app_module.jobs.run_pending()  # leftovers from uploads in earlier tests
+    return app_module
+
+
+def _job(app_module, job_id):
+    db = app_module.pool.acquire()
+    try:
+        return dict(db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+    finally:
+        app_module.pool.release(db)
+
+
+def test_failed_jobs_are_retried_with_backoff(app_module, monkeypatch):
+    queue = app_module.jobs
+    calls = []
+
+    def flaky(payload):
+        calls.append(payload)
+        if len(calls) < 3:
+            raise OSError("disk busy")
+
+    monkeypatch.setitem(queue._handlers, "test_flaky", flaky)
+    job_id = queue.enqueue("test_flaky", {"n": 1})
+    assert queue.run_one() is True
+    job = _job(app_module, job_id)
+    assert job["status"] == "queued" and job["attempts"] == 1
+    assert job["last_error"] == "OSError: disk busy"
+    assert job["run_after"] >= time.time() + jobs_module.JOB_BACKOFF_SECONDS - 1
+    assert queue.run_one() is False  # not due yet
+
+    monkeypatch.setattr(jobs_module, "JOB_BACKOFF_SECONDS", 0)
+    db = app_module.pool.acquire()
+    try:
+        db.execute("UPDATE jobs SET run_after = 0 WHERE id = ?", (job_id,))
+        db.commit()
+    finally:
+        app_module.pool.release(db)
+    assert queue.run_pending() == 2
+    job = _job(app_module, job_id)
+    assert job["status"] == "done" and job["attempts"] == 3 and job["last_error"] is None
+    assert calls == [{"n": 1}] * 3
+    assert queue.stats()["processed"]["test_flaky"]["retried"] >= 2
+
+
+def test_jobs_fail_permanently_after_max_attempts(app_module, monkeypatch):
+    queue = app_module.jobs
+    monkeypatch.setattr(jobs_module, "JOB_BACKOFF_SECONDS", 0)
+    monkeypatch.setitem(queue._handlers, "test_broken", lambda payload: 1 / 0)
+    job_id = queue.enqueue("test_broken")
+    assert queue.run_pending() == queue.max_attempts
+    job = _job(app_module, job_id)
+    assert job["status"] == "failed" and job["attempts"] == queue.max_attempts
+    assert job["last_error"].startswith("ZeroDivisionError")
+
+
+def test_enqueue_joins_the_callers_transaction(app_module):
+    db = app_module.pool.acquire()
+    try:
+        db.execute("BEGIN IMMEDIATE")
+        app_module.jobs.enqueue("test_never", db=db)
+        db.rollback()
+        assert db.execute("SELECT COUNT(*) FROM jobs WHERE kind = 'test_never'").fetchone()[0] == 0
+    finally:
+        app_module.pool.release(db)
+
+
+def test_deleting_a_file_removes_its_blob_in_a_job(client, app_module):
+    body = uuid.uuid4().bytes * 64
+    stored = client.post("/api/files", data={"file": (io.BytesIO(body), "blob.zip")},
+                         content_type="multipart/form-data").get_json()
+    app_module.jobs.run_pending()
+    db = app_module.pool.acquire()
+    try:
+        path = Path(db.execute("SELECT path FROM files WHERE id = ?", (stored["id"],)).fetchone()[0])
+    finally:
+        app_module.pool.release(db)
+    assert path.exists()
+
+    assert client.delete(f"/api/files/{stored['id']}").status_code == 204
+    assert path.exists()  # the request only queues the delete
+    app_module.jobs.run_pending()
+    assert not path.exists()
+
+
+def test_gc_sweeps_only_old_unreferenced_blobs(client, app_module):
+    body = uuid.uuid4().bytes * 64
+    stored = client.post("/api/files", data={"file": (io.BytesIO(body), "live.zip")},
+                         content_type="multipart/form-data").get_json()
+    app_module.jobs.run_pending()
+    db = app_module.pool.acquire()
+    try:
+        live = Path(db.execute("SELECT path FROM files WHERE id = ?", (stored["id"],)).fetchone()[0])
+    finally:
+        app_module.pool.release(db)
+
+    old = time.time() - app_module.GC_GRACE_SECONDS - 60
+    orphan = app_module.UPLOAD_DIR / "orphan.bin"
+    fresh = app_module.UPLOAD_DIR / "in-flight.bin"
+    stale_session = app_module.SESSION_DIR / "not-a-session"
+    for path in (orphan, fresh):
+        path.write_bytes(b"x")
+    stale_session.mkdir()
+    for path in (orphan, stale_session, live):
+        os.utime(path, (old, old))
+
+    app_module.jobs.enqueue("gc")
+    app_module.jobs.run_pending()
+    assert live.exists() and fresh.exists()
+    assert not orphan.exists() and not stale_session.exists()
+    fresh.unlink()
@@ -0,0 +1,64 @@
+import re
+
+from metrics import Metrics
+
+
+def _sample(text: str, series: str) -> float:
+    """Value of the exposition line starting with `series` (name plus labels)."""
+    for line in text.splitlines():
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{series} not in metrics output")
+
+
+def test_render_counters_and_histograms():
+    m = Metrics(prefix="t", buckets=(0.1, 1.0))
+    m.describe("hits_total", "counter", "Hits.")
+    m.describe("latency_seconds", "histogram", "Latency.")
+    m.inc("hits_total", route="/a")
+    m.inc("hits_total", 2, route="/a")
+    m.inc("hits_total", route='say "hi"')
+    m.observe("latency_seconds", 0.05)
+    m.observe("latency_seconds", 0.5)
+    m.observe("latency_seconds", 3)
+
+    text = m.render()
+    assert "# HELP t_hits_total Hits.\n# TYPE t_hits_total counter" in text
+    assert _sample(text, 't_hits_total{route="/a"}') == 3
+    assert _sample(text, 't_hits_total{route="say \\"hi\\""}') == 1
+    assert _sample(text, 't_latency_seconds_bucket{le="0.1"}') == 1
+    assert _sample(text, 't_latency_seconds_bucket{le="1.0"}') == 2
+    assert _sample(text, 't_latency_seconds_bucket{le="+Inf"}') == 3
+    assert _sample(text, "t_latency_seconds_count") == 3
+    assert _sample(text, "t_latency_seconds_sum") == 3.55
+
+
+def test_metrics_endpoint_counts_requests_and_queries(client, make_list):
+    list_id = make_list()
+    before = client.get("/api/metrics").get_data(as_text=True)
+    route = 'route="/api/lists/<int:list_id>/todos"'
+    try:
+        seen = _sample(before, f'taskon_requests_total{{method="GET",{route},status="200"}}')
+    except AssertionError:
+        seen = 0
+
+    for _ in range(3):
+        assert client.get(f"/api/lists/{list_id}/todos").status_code == 200
+    resp = client.get("/api/metrics")
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/plain"
+    text = resp.get_data(as_text=True)
+    assert _sample(text, f'taskon_requests_total{{method="GET",{route},status="200"}}') == seen + 3
+    assert _sample(text, f'taskon_request_duration_seconds_count{{method="GET",{route}}}') >= 3
+    assert _sample(text, f"taskon_sql_queries_total{{{route}}}") > 0
+    assert re.search(r'^taskon_db_pool\{stat="checkouts"\} \d+$', text, re.M)
+
+
+def test_server_timing_header(client, make_list, monkeypatch):
+    import app as app_module
+
+    list_id = make_list()
+    assert "Server-Timing" not in client.get(f"/api/lists/{list_id}/todos").headers
+    monkeypatch.setattr(app_module, "SERVER_TIMING", True)
+    header = client.get(f"/api/lists/{list_id}/todos").headers["Server-Timing"]
+    assert re.fullmatch(r'db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+', header)
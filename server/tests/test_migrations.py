@@ -0,0 +1,57 @@
+import sqlite3
+import subprocess
+import sys
+
+from conftest import SERVER_DIR
+
+
+def _migrate_in_subprocess(tmp_path):
+    env = {
+        "DB_PATH": str(tmp_path / "todo.db"),
+        "UPLOAD_ROOT": str(tmp_path / "uploaded_files"),
+        "JOB_WORKERS": "0",
+        "PATH": "/usr/bin:/bin",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-c", "from app import init_db; init_db()"],
+        cwd=SERVER_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+
+
+def test_concurrent_first_start_applies_each_migration_once(tmp_path):
+    from app import MIGRATIONS
+
+    procs = [_migrate_in_subprocess(tmp_path) for _ in range(4)]
+    for proc in procs:
+        _, err = proc.communicate(timeout=120)
+        assert proc.returncode == 0, err.decode()
+
+    db = sqlite3.connect(tmp_path / "todo.db")
+    assert db.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    # Default lists are created once, not once per process
+    assert db.execute("SELECT COUNT(*) FROM lists WHERE name = 'Inbox'").fetchone()[0] == 1
+
+
+def test_migrations_are_a_no_op_when_up_to_date(app):
+    from app import MIGRATIONS, init_db, pool
+
+    assert init_db() == len(MIGRATIONS)
+    assert init_db() == len(MIGRATIONS)
+    db = pool.acquire()
+    try:
+        assert db.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    finally:
+        pool.release(db)
+
+
+def test_add_file_encoding_is_idempotent(app):
+    from app import add_file_encoding, pool
+
+    db = pool.acquire()
+    try:
+        add_file_encoding(db)  # column already exists: must not raise
+        cols = [r[1] for r in db.execute("PRAGMA table_info(files)")]
+        assert cols.count("encoding") == 1
+        db.rollback()
+    finally:
+        pool.release(db)
@@ -0,0 +1,121 @@
+def _order(client, list_id):
+    return [t["id"] for t in client.get(f"/api/lists/{list_id}/todos").get_json()]
+
+
+def _create(client, list_id, title, after_id=None):
+    body = {"title": title, **({"after_id": after_id} if after_id is not None else {})}
+    resp = client.post(f"/api/lists/{list_id}/todos", json=body)
+    assert resp.status_code == 201, resp.get_json()
+    return resp.get_json()
+
+
+def test_new_todos_go_on_top(client, make_list):
+    list_id = make_list()
+    first = _create(client, list_id, "first")
+    second = _create(client, list_id, "second")
+    assert second["position"] == 0
+    assert _order(client, list_id) == [second["id"], first["id"]]
+
+
+def test_insert_after_a_card_writes_only_the_new_row(client, make_list, make_todos):
+    import app as app_module
+
+    list_id = make_list()
+    top, middle, bottom = make_todos(list_id, 3)
+    db = app_module.pool.acquire()
+    try:
+        before = dict(db.execute("SELECT id, rank FROM todos WHERE list_id = ?", (list_id,)).fetchall())
+    finally:
+        app_module.pool.release(db)
+
+    new = _create(client, list_id, "between", after_id=top)
+    assert new["position"] == 1
+    assert _order(client, list_id) == [top, new["id"], middle, bottom]
+    db = app_module.pool.acquire()
+    try:
+        after = dict(db.execute("SELECT id, rank FROM todos WHERE list_id = ?", (list_id,)).fetchall())
+    finally:
+        app_module.pool.release(db)
+    assert {k: v for k, v in after.items() if k != new["id"]} == before
+
+
+def test_exhausted_rank_gap_rebalances_the_list(client, make_list, monkeypatch):
+    import app as app_module
+
+    monkeypatch.setattr(app_module, "RANK_GAP", 4)
+    list_id = make_list()
+    anchor = _create(client, list_id, "anchor")["id"]
+    tail = _create(client, list_id, "tail", after_id=anchor)["id"]
+    expected = [anchor, tail]
+    # Repeated inserts at the same spot halve the gap until it runs out
+    for i in range(6):
+        new = _create(client, list_id, f"squeezed {i}", after_id=anchor)["id"]
+        expected.insert(1, new)
+    assert _order(client, list_id) == expected
+
+
+def test_insert_after_a_card_from_another_list_is_rejected(client, make_list, make_todos):
+    (foreign,) = make_todos(make_list("other"), 1)
+    list_id = make_list()
+    resp = client.post(f"/api/lists/{list_id}/todos", json={"title": "x", "after_id": foreign})
+    assert resp.status_code == 400
+
+
+def test_move_between_neighbours_and_across_lists(client, make_list, make_todos):
+    source, target = make_list("from"), make_list("to")
+    a, b, c = make_todos(source, 3)
+    x, y = make_todos(target, 2)
+
+    resp = client.post(f"/api/todos/{c}/move", json={"after_id": a})
+    assert resp.status_code == 200
+    assert resp.get_json()["position"] == 1
+    assert _order(client, source) == [a, c, b]
+
+    resp = client.post(f"/api/todos/{a}/move", json={"list_id": target, "before_id": y})
+    assert resp.status_code == 200
+    assert resp.get_json()["list_id"] == target
+    assert _order(client, source) == [c, b]
+    assert _order(client, target) == [x, a, y]
+
+
+def test_move_validates_its_anchor(client, make_list, make_todos):
+    list_id = make_list()
+    a, b = make_todos(list_id, 2)
+    assert client.post(f"/api/todos/{a}/move", json={"after_id": a}).status_code == 400
+    assert client.post(f"/api/todos/{a}/move", json={"after_id": b, "before_id": b}).status_code == 400
+    assert client.post(f"/api/todos/{a}/move", json={"list_id": 10 ** 9}).status_code == 404
+    assert client.post(f"/api/todos/{10 ** 9}/move", json={}).status_code == 404
+
+
+def test_reorder_writes_only_cards_whose_rank_changes(client, make_list, make_todos):
+    import app as app_module
+
+    list_id = make_list()
+    ids = make_todos(list_id, 5)
+    # Respace the list, then swap the last two cards
+    assert client.post(f"/api/lists/{list_id}/todos/reorder", json={"order": ids}).status_code == 200
+    changes_before = _latest_change(app_module)
+    swapped = ids[:3] + [ids[4], ids[3]]
+    resp = client.post(f"/api/lists/{list_id}/todos/reorder", json={"order": swapped})
+    assert resp.status_code == 200
+    assert _order(client, list_id) == swapped
+    # One change-log row per UPDATE: only the two moved cards were written
+    assert _latest_change(app_module) - changes_before == 2
+
+
+def test_reorder_ignores_foreign_ids_and_keeps_missing_cards(client, make_list, make_todos):
+    (foreign,) = make_todos(make_list("other"), 1)
+    list_id = make_list()
+    a, b, c = make_todos(list_id, 3)
+    resp = client.post(f"/api/lists/{list_id}/todos/reorder", json={"order": [c, foreign, a]})
+    assert resp.status_code == 200
+    assert _order(client, list_id) == [c, a, b]
+    assert client.post(f"/api/lists/{list_id}/todos/reorder", json={"order": "x"}).status_code == 400
+
+
+def _latest_change(app_module) -> int:
+    db = app_module.pool.acquire()
+    try:
+        return db.execute("SELECT COALESCE(MAX(id), 0) FROM changes").fetchone()[0]
+    finally:
+        app_module.pool.release(db)
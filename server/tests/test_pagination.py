@@ -0,0 +1,69 @@
+import re
+
+import pytest
+
+
+def _pages(client, url, **params):
+    items, cursor = [], None
+    while True:
+        resp = client.get(url, query_string={**params, **({"cursor": cursor} if cursor else {})})
+        assert resp.status_code == 200, resp.get_json()
+        items += resp.get_json()
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            return items
+
+
+def test_keyset_pages_cover_a_list_in_board_order(client, make_list, make_todos):
+    list_id = make_list()
+    ids = make_todos(list_id, 25)
+    paged = _pages(client, "/api/todos", list_id=list_id, limit=7, fields="id,position")
+    assert [t["id"] for t in paged] == ids
+    assert [t["position"] for t in paged] == list(range(25))
+
+
+def test_positions_with_done_filter_count_the_whole_list(app, client, make_list, make_todos, monkeypatch):
+    import app as app_module
+
+    list_id = make_list()
+    ids = make_todos(list_id, 12)
+    for todo_id in ids[::3]:
+        client.patch(f"/api/todos/{todo_id}", json={"done": True})
+
+    monkeypatch.setattr(app_module, "SERVER_TIMING", True)
+    resp = client.get("/api/todos", query_string={"list_id": list_id, "done": 0, "limit": 100,
+                                                    "fields": "id,position"})
+    expected = [{"id": i, "position": p} for p, i in enumerate(ids) if p % 3]
+    assert resp.get_json() == expected
+    # One statement for the page, not one per row
+    queries = int(re.search(r'"(\d+) queries"', resp.headers["Server-Timing"]).group(1))
+    assert queries <= 2
+
+
+def test_positions_across_lists_and_pages(client, make_list, make_todos):
+    first, second = make_list("a"), make_list("b")
+    make_todos(first, 4)
+    make_todos(second, 5)
+    everything = _pages(client, "/api/todos", limit=3, fields="id,list_id,position")
+    mine = [t for t in everything if t["list_id"] in (first, second)]
+    assert [t["position"] for t in mine] == [0, 1, 2, 3, 0, 1, 2, 3, 4]
+
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get("/api/todos", query_string={"limit": 5, "cursor": "nope"}).status_code == 400
+
+
+@pytest.mark.parametrize("url, key", [
+    ("/api/todos", [{}, [], 1]),
+    ("/api/todos", [1, 2, "3"]),
+    ("/api/todos", [1, 2, True]),
+    ("/api/files", [["2024-01-01"], 1]),
+    ("/api/files", ["2024-01-01", 1.5]),
+])
+def test_cursor_with_wrong_element_types_is_rejected(client, url, key):
+    import app as app_module
+
+    cursor = app_module.encode_cursor(*key)
+    resp = client.get(url, query_string={"limit": 5, "cursor": cursor})
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "Invalid cursor"
@@ -0,0 +1,44 @@
+def _statements(db, run, monkeypatch):
+    """SQL text (unbound) of every statement run() executes on `db`."""
+    seen = []
+    execute = type(db).execute
+
+    def recording(self, sql, *args):
+        if self is db:
+            seen.append(sql)
+        return execute(self, sql, *args)
+
+    with monkeypatch.context() as m:
+        m.setattr(type(db), "execute", recording)
+        run()
+    return seen
+
+
+def test_hot_queries_use_indexes(app):
+    from app import full_scans, pool
+
+    db = pool.acquire()
+    try:
+        assert full_scans(db) == []
+    finally:
+        pool.release(db)
+
+
+def test_hot_queries_are_the_statements_handlers_run(app, client, make_list, make_todos, monkeypatch):
+    import app as app_module
+
+    list_id = make_list()
+    first, second = make_todos(list_id, 2)
+    hot = {sql for sql, _ in app_module.HOT_QUERIES}
+    db = app_module.pool.acquire()
+    try:
+        ran = _statements(db, lambda: (
+            app_module.fetch_todo(db, first),
+            app_module.rank_for_insert(db, list_id, after_id=first),
+            app_module.rank_for_insert(db, list_id, before_id=second),
+            app_module.rank_for_insert(db, list_id),
+            app_module.fetch_list_id(db, "Inbox"),
+        ), monkeypatch)
+    finally:
+        app_module.pool.release(db)
+    assert ran and set(ran) <= hot, set(ran) - hot
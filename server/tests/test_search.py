@@ -0,0 +1,107 @@
+import io
+
+import pytest
+
+
+def _search(client, **params):
+    resp = client.get("/api/search", query_string=params)
+    assert resp.status_code == 200, resp.get_json()
+    return resp
+
+
+def _all_pages(client, **params):
+    items, cursor = [], None
+    while True:
+        resp = _search(client, **params, **({"cursor": cursor} if cursor else {}))
+        items += resp.get_json()
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            return items
+
+
+def test_search_matches_word_prefixes(client, make_list, make_todos):
+    list_id = make_list()
+    make_todos(list_id, 2, "quarterly report")
+    hits = _search(client, q="quart rep", type="todo").get_json()
+    assert {h["title"] for h in hits} == {"quarterly report 0", "quarterly report 1"}
+    assert all(h["list_id"] == list_id for h in hits)
+
+
+def test_search_requires_a_query(client):
+    assert client.get("/api/search", query_string={"q": " !"}).status_code == 400
+
+
+@pytest.fixture
+def small_window(monkeypatch):
+    import app as app_module
+
+    monkeypatch.setattr(app_module, "SEARCH_RANK_WINDOW", 5)
+
+
+def test_truncated_search_is_flagged_and_pages_are_stable(client, make_list, make_todos, small_window):
+    list_id = make_list()
+    ids = sorted(make_todos(list_id, 8, "haystackword"))
+    window = set(ids[-5:])
+
+    first = _search(client, q="haystackword", type="todo", limit=2)
+    assert first.headers["X-Search-Truncated"] == "1"
+    # The newest matches come ranked, then the older ones unranked, newest first
+    hits = _all_pages(client, q="haystackword", type="todo", limit=2)
+    assert {h["id"] for h in hits[:5]} == window
+    assert all(h["score"] is not None for h in hits[:5])
+    assert [h["id"] for h in hits[5:]] == ids[2::-1]
+    assert all(h["score"] is None for h in hits[5:])
+
+    # A cursor keeps the window it was issued with: newer matches may join the
+    # remaining pages, but the window doesn't slide past the older ones
+    seen = {h["id"] for h in first.get_json()}
+    cursor = first.headers["X-Next-Cursor"]
+    # Same title length as the others, so bm25 scores of the older cards only
+    # move towards zero and stay after the cursor
+    late = set(make_todos(list_id, 3, "haystackword")) - set(ids)
+    while cursor:
+        resp = _search(client, q="haystackword", type="todo", limit=2, cursor=cursor)
+        seen |= {h["id"] for h in resp.get_json()}
+        cursor = resp.headers.get("X-Next-Cursor")
+    assert set(ids) <= seen <= set(ids) | late
+
+
+def test_unranked_tail_pages_across_todos_and_files(client, make_list, make_todos, small_window):
+    list_id = make_list()
+    todo_ids = make_todos(list_id, 7, "tailword")
+    file_ids = []
+    for i in range(7):
+        resp = client.post("/api/files", data={"file": (io.BytesIO(b"%d" % i * 50), f"tailword{i}.txt")},
+                           content_type="multipart/form-data")
+        file_ids.append(resp.get_json()["id"])
+    hits = _all_pages(client, q="tailword", limit=3)
+    assert sorted((h["type"], h["id"]) for h in hits) == sorted(
+        [("todo", i) for i in todo_ids] + [("file", i) for i in file_ids]
+    )
+    assert len(hits) == len(set((h["type"], h["id"]) for h in hits))
+
+
+def test_filtered_search_ranks_every_match(client, make_list, make_todos, small_window):
+    list_id = make_list()
+    ids = make_todos(list_id, 8, "needleword")
+    resp = _search(client, q="needleword", list_id=list_id, limit=100)
+    assert "X-Search-Truncated" not in resp.headers
+    assert {h["id"] for h in _all_pages(client, q="needleword", list_id=list_id, limit=3)} == set(ids)
+
+
+def test_search_rejects_foreign_cursor(client):
+    assert client.get("/api/search", query_string={"q": "x", "cursor": "bm90LWpzb24"}).status_code == 400
+
+
+@pytest.mark.parametrize("key", [
+    [{}, [], 1, 0, 0],
+    [-1.5, "todo", 3, [], 0],
+    [-1.5, 7, 3, 0, 0],
+    [None, "todo", "3", 5, 0],
+])
+def test_search_rejects_cursor_with_wrong_element_types(client, key):
+    import app as app_module
+
+    resp = client.get("/api/search", query_string={"q": "x", "cursor": app_module.encode_cursor(*key)})
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "Invalid cursor"
@@ -0,0 +1,31 @@
+import io
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _png(width=600, height=400) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def test_thumbnail_is_rendered_within_its_size_bucket(client):
+    resp = client.post("/api/files", data={"file": (io.BytesIO(_png()), "photo.png")},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 201
+    checksum = resp.get_json()["checksum"]
+
+    thumb = client.get(f"/api/thumbnails/{checksum}/256")
+    assert thumb.status_code == 200
+    assert thumb.mimetype == "image/jpeg"
+    assert "immutable" in thumb.headers["Cache-Control"]
+    assert max(Image.open(io.BytesIO(thumb.data)).size) <= 256
+
+    again = client.get(f"/api/thumbnails/{checksum}/256", headers={"If-None-Match": thumb.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_thumbnail_of_unknown_checksum_is_404(client):
+    assert client.get(f"/api/thumbnails/{'0' * 64}/256").status_code == 404
@@ -0,0 +1,65 @@
+import hashlib
+
+
+def _session(client, name="notes.txt", **extra):
+    resp = client.post("/api/uploads", json={"name": name, **extra})
+    assert resp.status_code == 201, resp.get_json()
+    return resp.get_json()["id"]
+
+
+def _put(client, session_id, number, data, **headers):
+    return client.put(f"/api/uploads/{session_id}/parts/{number}", data=data, headers=headers)
+
+
+def test_parts_can_arrive_out_of_order_and_be_resent(client):
+    parts = [b"first part\n" * 50, b"second part\n" * 50, b"third\n"]
+    body = b"".join(parts)
+    session_id = _session(client, size=len(body), checksum=hashlib.sha256(body).hexdigest())
+
+    assert _put(client, session_id, 3, parts[2]).status_code == 200
+    assert _put(client, session_id, 1, b"garbage").status_code == 200
+    assert _put(client, session_id, 1, parts[0]).status_code == 200  # replaces the first try
+    assert _put(client, session_id, 2, parts[1]).status_code == 200
+
+    status = client.get(f"/api/uploads/{session_id}").get_json()
+    assert [p["number"] for p in status["parts"]] == [1, 2, 3]
+
+    done = client.post(f"/api/uploads/{session_id}/complete")
+    assert done.status_code == 201, done.get_json()
+    file_id = done.get_json()["id"]
+    assert client.get(f"/api/files/{file_id}").data == body
+    # The session is gone once completed
+    assert client.get(f"/api/uploads/{session_id}").status_code == 404
+
+
+def test_complete_reports_missing_parts(client):
+    session_id = _session(client)
+    _put(client, session_id, 1, b"a")
+    _put(client, session_id, 3, b"c")
+    resp = client.post(f"/api/uploads/{session_id}/complete")
+    assert resp.status_code == 400
+    assert resp.get_json()["missing"] == [2]
+
+
+def test_declared_checksum_and_part_checksums_are_verified(client):
+    session_id = _session(client, checksum="0" * 64)
+    bad = _put(client, session_id, 1, b"data", **{"X-Part-Checksum": "f" * 64})
+    assert bad.status_code == 400
+    assert _put(client, session_id, 1, b"data",
+                **{"X-Part-Checksum": hashlib.sha256(b"data").hexdigest()}).status_code == 200
+    resp = client.post(f"/api/uploads/{session_id}/complete")
+    assert resp.status_code == 400
+    assert resp.get_json()["checksum"] == hashlib.sha256(b"data").hexdigest()
+
+
+def test_abort_drops_the_session(client):
+    session_id = _session(client)
+    _put(client, session_id, 1, b"partial")
+    assert client.delete(f"/api/uploads/{session_id}").status_code == 204
+    assert client.get(f"/api/uploads/{session_id}").status_code == 404
+    assert _put(client, session_id, 2, b"late").status_code == 404
+
+
+def test_session_rejects_disallowed_names(client):
+    assert client.post("/api/uploads", json={"name": "run.exe"}).status_code == 415
+    assert client.post("/api/uploads", json={"name": ""}).status_code == 400
@@ -0,0 +1,141 @@
+import hashlib
+import io
+import subprocess
+import sys
+import textwrap
+
+from conftest import SERVER_DIR
+
+UPLOAD_MB = 200
+
+# Runs in a fresh interpreter so ru_maxrss reflects only this upload
+RSS_SCRIPT = textwrap.dedent("""
+    import resource, sys
+    from app import app, prepare_database
+
+    prepare_database()
+    app.config["MAX_CONTENT_LENGTH"] = 1024 ** 3
+    client = app.test_client()
+    client.get("/api/health")  # warm up imports and the pool
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with open(sys.argv[1], "rb") as f:
+        resp = client.post("/api/files", data={"file": (f, "big.txt", "text/plain")},
+                           content_type="multipart/form-data")
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(resp.status_code, resp.get_json()["checksum"], (after - before) // 1024)
+""")
+
+
+def test_large_upload_keeps_peak_rss_bounded(tmp_path):
+    source = tmp_path / "big.txt"
+    digest = hashlib.sha256()
+    block = (b"0123456789abcdef" * 64 + b"\n") * 1024
+    with open(source, "wb") as f:
+        written = 0
+        while written < UPLOAD_MB * 1024 * 1024:
+            f.write(block)
+            digest.update(block)
+            written += len(block)
+
+    env = {
+        "DB_PATH": str(tmp_path / "todo.db"),
+        "UPLOAD_ROOT": str(tmp_path / "uploaded_files"),
+        "JOB_WORKERS": "0",
+        "PATH": "/usr/bin:/bin",
+        "TMPDIR": str(tmp_path),
+    }
+    proc = subprocess.run(
+        [sys.executable, "-c", RSS_SCRIPT, str(source)],
+        cwd=SERVER_DIR, env=env, capture_output=True, text=True, timeout=300,
+    )
+    assert proc.returncode == 0, proc.stderr
+    status, checksum, growth_mb = proc.stdout.split()
+    assert status == "201"
+    assert checksum == digest.hexdigest()
+    # Chunked streaming: memory grows by buffers, not by the size of the upload
+    assert int(growth_mb) < 64, f"peak RSS grew by {growth_mb} MB for a {UPLOAD_MB} MB upload"
+
+
+def test_upload_rejects_empty_file(client):
+    resp = client.post("/api/files", data={"file": (io.BytesIO(b""), "empty.txt")},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 400
+
+
+def test_identical_uploads_share_one_blob(client):
+    body = b"same bytes" * 100
+    ids = []
+    for name in ("a.txt", "b.txt"):
+        resp = client.post("/api/files", data={"file": (io.BytesIO(body), name)},
+                           content_type="multipart/form-data")
+        assert resp.status_code == 201
+        ids.append(resp.get_json()["checksum"])
+    assert ids[0] == ids[1] == hashlib.sha256(body).hexdigest()
+    probe = client.get(f"/api/files/by-checksum/{ids[0]}")
+    assert probe.status_code == 200
+
+
+def test_checksum_probe(client):
+    body = b"probe me" * 64
+    checksum = hashlib.sha256(body).hexdigest()
+    assert client.get(f"/api/files/by-checksum/{checksum}").status_code == 404
+    assert client.get("/api/files/by-checksum/not-a-hash").status_code == 400
+
+    client.post("/api/files", data={"file": (io.BytesIO(body), "probe.txt")},
+                content_type="multipart/form-data")
+    probe = client.get(f"/api/files/by-checksum/{checksum.upper()}")
+    assert probe.status_code == 200
+    assert (probe.get_json()["checksum"], probe.get_json()["size"]) == (checksum, len(body))
+
+
+def test_blob_is_stored_once_under_its_checksum(client):
+    import app as app_module
+
+    body = b"stored once" * 64
+    checksum = hashlib.sha256(body).hexdigest()
+    for name in ("one.txt", "two.txt"):
+        client.post("/api/files", data={"file": (io.BytesIO(body), name)},
+                    content_type="multipart/form-data")
+    blob = app_module.blob_path(checksum)
+    assert blob.read_bytes() == body
+    assert [p.name for p in blob.parent.iterdir() if p.name.startswith(checksum)] == [checksum]
+
+    # A resumable upload of the same bytes resolves to the existing file
+    session = client.post("/api/uploads", json={"name": "three.txt"}).get_json()["id"]
+    client.put(f"/api/uploads/{session}/parts/1", data=body)
+    done = client.post(f"/api/uploads/{session}/complete").get_json()
+    assert done["id"] == client.get(f"/api/files/by-checksum/{checksum}").get_json()["id"]
+
+
+def test_duplicate_upload_returns_the_stored_file(client):
+    import app as app_module
+
+    def processing_jobs(file_id):
+        db = app_module.pool.acquire()
+        try:
+            return db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE json_extract(payload, '$.file_id') = ?", (file_id,)
+            ).fetchone()[0]
+        finally:
+            app_module.pool.release(db)
+
+    body = b"uploaded twice" * 64
+    first = client.post("/api/files", data={"file": (io.BytesIO(body), "original.txt")},
+                        content_type="multipart/form-data").get_json()
+    queued = processing_jobs(first["id"])
+    assert queued > 0
+
+    again = client.post("/api/files", data={"file": (io.BytesIO(body), "copy.txt")},
+                        content_type="multipart/form-data")
+    assert again.status_code == 201
+    stored = next(f for f in client.get("/api/files").get_json() if f["id"] == first["id"])
+    assert {k: again.get_json()[k] for k in ("id", "name", "mime", "size", "checksum")} == {
+        k: stored[k] for k in ("id", "name", "mime", "size", "checksum")
+    }
+    assert again.get_json()["name"] == "original.txt"
+
+    session = client.post("/api/uploads", json={"name": "session-copy.txt"}).get_json()["id"]
+    client.put(f"/api/uploads/{session}/parts/1", data=body)
+    done = client.post(f"/api/uploads/{session}/complete").get_json()
+    assert (done["id"], done["name"]) == (first["id"], "original.txt")
+    assert processing_jobs(first["id"]) == queued